@@ -43,13 +43,22 @@ pygimplib.init()
 from export_layers.pygimplib import pgitemtree
 
 from export_layers import exportlayers
-from export_layers import gui_plugin
 from export_layers import settings_plugin
 
 #===============================================================================
 
+_settings = None
 
-settings = settings_plugin.create_settings()
+
+def _get_settings():
+  global _settings
+  
+  # Settings are created only when needed, i.e. when installing or running a
+  # procedure, rather than on each import of the plug-in.
+  if _settings is None:
+    _settings = settings_plugin.create_settings()
+  
+  return _settings
 
 
 @pygimplib.plugin(
@@ -59,9 +68,11 @@ settings = settings_plugin.create_settings()
   date="2013-2016",
   menu_name=_("E_xport Layers..."),
   menu_path="<Image>/File/Export",
-  parameters=[settings['special'], settings['main']]
+  parameters=lambda: [_get_settings()['special'], _get_settings()['main']]
 )
 def plug_in_export_layers(run_mode, image, *args):
+  settings = _get_settings()
+  
   settings['special/run_mode'].set_value(run_mode)
   settings['special/image'].set_value(image)
   
@@ -69,11 +80,11 @@ def plug_in_export_layers(run_mode, image, *args):
   _setup_settings_additional(settings, layer_tree)
   
   if run_mode == gimpenums.RUN_INTERACTIVE:
-    _run_export_layers_interactive(layer_tree)
+    _run_export_layers_interactive(settings, layer_tree)
   elif run_mode == gimpenums.RUN_WITH_LAST_VALS:
-    _run_with_last_vals(layer_tree)
+    _run_with_last_vals(settings, layer_tree)
   else:
-    _run_noninteractive(layer_tree, args)
+    _run_noninteractive(settings, layer_tree, args)
 
 
 @pygimplib.plugin(
@@ -85,20 +96,22 @@ def plug_in_export_layers(run_mode, image, *args):
   date="2013-2016",
   menu_name=_("E_xport Layers (repeat)"),
   menu_path="<Image>/File/Export",
-  parameters=[settings['special']]
+  parameters=lambda: [_get_settings()['special']]
 )
 def plug_in_export_layers_repeat(run_mode, image):
+  settings = _get_settings()
+  
   layer_tree = pgitemtree.LayerTree(image, name=pygimplib.config.SOURCE_PERSISTENT_NAME, is_filtered=True)
   _setup_settings_additional(settings, layer_tree)
   
   if run_mode == gimpenums.RUN_INTERACTIVE:
     settings['special/first_plugin_run'].load()
     if settings['special/first_plugin_run'].value:
-      _run_export_layers_interactive(layer_tree)
+      _run_export_layers_interactive(settings, layer_tree)
     else:
-      _run_export_layers_repeat_interactive(layer_tree)
+      _run_export_layers_repeat_interactive(settings, layer_tree)
   else:
-    _run_with_last_vals(layer_tree)
+    _run_with_last_vals(settings, layer_tree)
 
 
 def _setup_settings_additional(settings, layer_tree):
@@ -108,7 +121,7 @@ def _setup_settings_additional(settings, layer_tree):
     settings_plugin.convert_set_of_layer_names_to_ids, [layer_tree])
 
 
-def _run_noninteractive(layer_tree, args):
+def _run_noninteractive(settings, layer_tree, args):
   main_settings = [setting for setting in settings['main'].iterate_all() if setting.can_be_registered_to_pdb()]
   
   for setting, arg in zip(main_settings, args):
@@ -116,30 +129,41 @@ def _run_noninteractive(layer_tree, args):
       arg = arg.decode()
     setting.set_value(arg)
   
-  _run_plugin_noninteractive(gimpenums.RUN_NONINTERACTIVE, layer_tree)
+  _run_plugin_noninteractive(settings, gimpenums.RUN_NONINTERACTIVE, layer_tree)
 
 
-def _run_with_last_vals(layer_tree):
+def _run_with_last_vals(settings, layer_tree):
   settings['main'].load()
   
-  _run_plugin_noninteractive(gimpenums.RUN_WITH_LAST_VALS, layer_tree)
+  _run_plugin_noninteractive(settings, gimpenums.RUN_WITH_LAST_VALS, layer_tree)
 
 
-def _run_export_layers_interactive(layer_tree):
+def _run_export_layers_interactive(settings, layer_tree):
+  # GUI modules are imported only here to speed up non-interactive runs.
+  from export_layers import gui_plugin
+  
   gui_plugin.export_layers_gui(layer_tree, settings)
 
 
-def _run_export_layers_repeat_interactive(layer_tree):
+def _run_export_layers_repeat_interactive(settings, layer_tree):
+  from export_layers import gui_plugin
+  
   gui_plugin.export_layers_repeat_gui(layer_tree, settings)
 
 
-def _run_plugin_noninteractive(run_mode, layer_tree):
+def _run_plugin_noninteractive(settings, run_mode, layer_tree):
   layer_exporter = exportlayers.LayerExporter(run_mode, layer_tree.image, settings['main'])
   
   try:
     layer_exporter.export_layers(layer_tree=layer_tree)
   except exportlayers.ExportLayersCancelError:
     pass
+  else:
+    # There is no GUI to display the number of deduplicated layers in.
+    if layer_exporter.num_deduplicated_layers > 0:
+      print(
+        _("{0} layer(s) with contents identical to a previously exported layer copied").format(
+          layer_exporter.num_deduplicated_layers))
 
 
 #===============================================================================
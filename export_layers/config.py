@@ -36,6 +36,10 @@ pygimplib.config.PLUGIN_NAME = "export_layers"
 
 pygimplib.config.LOG_MODE = pygimplib.constants.LOG_EXCEPTIONS_ONLY
 
+# Profile each procedure run and write the results to the plug-in log directory.
+# Can be overridden by the `PYGIMPLIB_PROFILE_MODE` environment variable.
+pygimplib.config.PROFILE_MODE = pygimplib.constants.PROFILE_NONE
+
 pygimplib.config.PLUGIN_TITLE = lambda: _("Export Layers")
 pygimplib.config.PLUGIN_VERSION = "2.5"
 pygimplib.config.BUG_REPORT_URI_LIST = [
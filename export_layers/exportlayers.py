@@ -35,7 +35,11 @@ import collections
 import contextlib
 import datetime
 import functools
+import hashlib
+import json
 import os
+import shutil
+import time
 
 import gimp
 import gimpenums
@@ -50,8 +54,10 @@ from export_layers.pygimplib import pgfileformats
 from export_layers.pygimplib import pgitemtree
 from export_layers.pygimplib import pgpath
 from export_layers.pygimplib import pgpdb
+from export_layers.pygimplib import pgprofiling
 from export_layers.pygimplib import pgutils
 from export_layers.pygimplib import progress
+from export_layers.pygimplib import rectpacking
 
 #===============================================================================
 
@@ -167,6 +173,8 @@ class LayerExporter(object):
   This class exports layers as separate images. Additional operations include:
   * layer processing - resizing/cropping, inserting back/foreground, merging
   * layer name processing - validation, file extension manipulation
+  * atlas export - packing all layers into one or more images (sprite sheets)
+    accompanied by a JSON file describing the position of each layer
   
   Attributes:
   
@@ -188,7 +196,7 @@ class LayerExporter(object):
     layers exported. If no progress update is desired, pass None.
   
   * `should_stop` - Can be used to stop the export prematurely. If True,
-    the export is stopped after exporting the currently processed layer.
+    the export is stopped after processing or exporting the current layer.
   
   * `layer_tree` - `LayerTree` instance containing layers to be exported.
     Defaults to None if no export has been performed yet.
@@ -196,6 +204,22 @@ class LayerExporter(object):
   * `exported_layers` - List of layers that were successfully exported. Does not
     include skipped layers (when files with the same names already exist).
   
+  * `kept_image_copy` - Image copy containing the exported layers if the last
+    export finished and `keep_exported_layers` was True (see `export_layers`),
+    None otherwise.
+  
+  * `manifest_filename` - Path to the export manifest written during the last
+    export, or None if no manifest was written. The manifest is written if the
+    `more_operations/write_manifest` setting is enabled and contains one JSON
+    object per line for each exported file, including the hash of the exported
+    contents.
+  
+  * `num_deduplicated_layers` - Number of exported layers whose contents were
+    identical to a previously exported layer. Instead of saving these layers
+    again, the file of the previously exported layer was copied. If any layers
+    were deduplicated, the number is displayed by `progress_updater` after the
+    export.
+  
   * `export_context_manager` - Context manager that wraps exporting a single
     layer. This can be used to perform GUI updates before and after export.
     Required parameters: current run mode, current image, layer to export,
@@ -237,12 +261,16 @@ class LayerExporter(object):
     self.should_stop = False
     
     self._exported_layers = []
+    self._num_deduplicated_layers = 0
+    self._manifest_filename = None
+    self._kept_image_copy = None
     
     self._operations = {
       'layer_contents': [self._setup, self._cleanup, self._process_layer, self._postprocess_layer],
       'layer_name': [self._preprocess_layer_name, self._preprocess_empty_group_name, self._process_layer_name],
       '_postprocess_layer_name': [self._postprocess_layer_name],
-      'export': [self._make_dirs, self._export]
+      'export': [
+        self._make_dirs, self._export, self._add_layer_to_atlas, self._export_atlas, self._open_manifest]
     }
     
     self._operations_functions = {}
@@ -258,11 +286,33 @@ class LayerExporter(object):
   def exported_layers(self):
     return self._exported_layers
   
+  @property
+  def kept_image_copy(self):
+    return self._kept_image_copy
+  
+  @property
+  def manifest_filename(self):
+    return self._manifest_filename
+  
+  @property
+  def num_deduplicated_layers(self):
+    return self._num_deduplicated_layers
+  
   def export_layers(self, operations=None, layer_tree=None, keep_exported_layers=False,
                     on_after_create_image_copy_func=None, on_after_insert_layer_func=None):
     """
     Export layers as separate images from the specified image.
     
+    The `file_extension` setting may contain multiple file extensions separated
+    by commas (e.g. "png, jpg"). Each layer is then processed only once and
+    saved in each file format. The first file extension is the default file
+    extension.
+    
+    If the `scales/scale_factors` setting contains scale factors separated by
+    commas (e.g. "1, 0.5, 0.25"), each processed layer is saved once per scale
+    factor. Smaller images are obtained by progressively downscaling the
+    previous (larger) image.
+    
     `operations` is a list of tags that constraints the execution of the export.
     Multiple tags can be specified. The following tags are supported:
     
@@ -280,7 +330,10 @@ class LayerExporter(object):
     
     If `layer_tree` is not None, use an existing instance of
     `pgitemtree.LayerTree` instead of creating a new one. If the instance had
-    filters set, they will be reset.
+    filters set, they will be reset. Names of layers already processed with the
+    instance are kept unless reset (see `pgitemtree.ItemTree.reset_item_elements`),
+    allowing to compute names only for a subset of layers if layer groups are
+    treated as folders.
     
     A copy of the image and the layers to be exported are created so that the
     original image and its soon-to-be exported layers are left intact. The
@@ -296,21 +349,58 @@ class LayerExporter(object):
     (`on_after_insert_layer_func`, takes the layer as its only argument).
     """
     
-    self._init_attributes(
-      operations, layer_tree, keep_exported_layers, on_after_create_image_copy_func, on_after_insert_layer_func)
-    self._preprocess_layers()
+    for _unused in self.export_layers_in_steps(
+          operations, layer_tree, keep_exported_layers, on_after_create_image_copy_func,
+          on_after_insert_layer_func):
+      pass
     
-    exception_occurred = False
+    return self._kept_image_copy
+  
+  def export_layers_in_steps(self, operations=None, layer_tree=None, keep_exported_layers=False,
+                             on_after_create_image_copy_func=None, on_after_insert_layer_func=None):
+    """
+    Export layers like `export_layers`, one step per iteration. This method is a
+    generator, allowing the caller to perform other work between steps, such as
+    processing GUI events.
     
-    self._setup()
-    try:
-      self._export_layers()
-    except Exception:
-      exception_occurred = True
-      raise
-    finally:
-      self._cleanup(exception_occurred)
+    A step is either processing a single layer, exporting a single processed
+    layer or exporting a single atlas image.
+    
+    If the generator is closed before the export is finished, the export is
+    stopped and the image copy is destroyed, as if an exception was raised.
+    The image copy to keep (if `keep_exported_layers` is True) is available in
+    `kept_image_copy` after the generator is exhausted.
+    """
     
+    with pgprofiling.trace_memory("LayerExporter.export_layers"):
+      self._init_attributes(
+        operations, layer_tree, keep_exported_layers, on_after_create_image_copy_func, on_after_insert_layer_func)
+      self._preprocess_layers()
+      
+      exception_occurred = False
+      
+      self._setup()
+      try:
+        self._open_manifest()
+        for _unused in self._export_layers():
+          yield
+      except (Exception, GeneratorExit):
+        exception_occurred = True
+        raise
+      finally:
+        self._close_manifest()
+        self._cleanup(exception_occurred)
+        self.progress_updater.flush()
+      
+      self._kept_image_copy = self._get_image_copy_to_keep()
+      
+      if self._num_deduplicated_layers > 0:
+        self.progress_updater.update_text(
+          _("{0} layer(s) with contents identical to a previously exported layer copied").format(
+            self._num_deduplicated_layers))
+        self.progress_updater.flush()
+  
+  def _get_image_copy_to_keep(self):
     if self._keep_exported_layers:
       if self._use_another_image_copy:
         return self._another_image_copy
@@ -375,8 +465,13 @@ class LayerExporter(object):
     self.should_stop = False
     
     self._exported_layers = []
+    self._num_deduplicated_layers = 0
+    self._manifest_filename = None
+    self._manifest_file = None
+    self._kept_image_copy = None
     
     self._current_layer_elem = None
+    self._current_layer_start_time = None
     self._current_file_extension = None
     
     self._output_directory = self.export_settings['output_directory'].value
@@ -389,15 +484,41 @@ class LayerExporter(object):
     self._use_another_image_copy = False
     self._another_image_copy = None
     
+    self._export_as_atlas = self.export_settings['more_operations/export_as_atlas'].value
+    # Image holding processed layers until they are packed into atlas images
+    self._atlas_image = None
+    # List of (_ItemTreeElement, layer in `_atlas_image`) tuples
+    self._atlas_layers = []
+    
+    self._deduplicate_layers = self.export_settings['more_operations/deduplicate_layers'].value
+    # key: hash of layer contents and file extension; value: output filename
+    self._exported_filenames_by_hash = {}
+    # key: layer ID; value: hash of layer contents. Only layers of the layer
+    # currently being exported (one per scale) are stored.
+    self._layer_pixel_hashes = {}
+    
     self.progress_updater.reset()
     
     self._file_extension_properties = self._prefill_file_extension_properties()
-    self._default_file_extension = self.export_settings['file_extension'].value.lstrip(".").lower()
+    self._file_extensions = self._get_file_extensions(self.export_settings['file_extension'].value)
+    self._default_file_extension = self._file_extensions[0]
     self._file_extension_to_assign = self._default_file_extension
-    self._file_export_func = pgfileformats.get_save_procedure(self._default_file_extension)
+    self._file_export_func = self._get_file_export_func(self._default_file_extension)
     self._current_layer_export_status = ExportStatuses.NOT_EXPORTED_YET
     self._current_overwrite_mode = None
     
+    if not operations or 'export' in operations:
+      self._scales = self._get_scales(self.export_settings['scales/scale_factors'].value)
+    else:
+      self._scales = []
+    
+    # Check the format of names of scaled images before exporting any layer.
+    for scale_index, scale in enumerate(self._scales):
+      self._get_scaled_name(scale, scale_index)
+    
+    if self._export_as_atlas and (not operations or 'export' in operations):
+      self._check_atlas_export_settings()
+    
     if self.export_settings['layer_filename_pattern'].value:
       pattern = self.export_settings['layer_filename_pattern'].value
     else:
@@ -409,6 +530,48 @@ class LayerExporter(object):
     # key: _ItemTreeElement parent ID (None for root); value: list of pattern number generators
     self._pattern_number_filename_generators = {None: self._filename_pattern_generator.get_number_generators()}
   
+  def _get_file_extensions(self, file_extensions_str):
+    file_extensions = []
+    for file_extension in file_extensions_str.split(","):
+      file_extension = file_extension.strip().lstrip(".").lower()
+      if file_extension and file_extension not in file_extensions:
+        file_extensions.append(file_extension)
+    
+    return file_extensions if file_extensions else [""]
+  
+  def _get_scales(self, scales_str):
+    scales = set()
+    for scale_str in scales_str.split(","):
+      scale_str = scale_str.strip()
+      if not scale_str:
+        continue
+      
+      try:
+        scale = float(scale_str)
+      except ValueError:
+        scale = None
+      
+      if scale is None or scale <= 0.0:
+        raise ExportLayersError(_("Invalid scale factor: \"{0}\"").format(scale_str))
+      
+      scales.add(scale)
+    
+    return sorted(scales, reverse=True)
+  
+  def _check_atlas_export_settings(self):
+    if len(self._file_extensions) > 1:
+      raise ExportLayersError(
+        _("Layers exported as an atlas cannot be saved in multiple file formats."),
+        None, self._default_file_extension)
+    
+    if self._scales:
+      raise ExportLayersError(
+        _("Layers exported as an atlas cannot be saved in multiple scales."), None, self._default_file_extension)
+    
+    if self._deduplicate_layers:
+      raise ExportLayersError(
+        _("Layers exported as an atlas cannot be deduplicated."), None, self._default_file_extension)
+  
   def _enable_disable_operations(self, operations_tags):
     for functions in self._operations.values():
       for function in functions:
@@ -565,26 +728,43 @@ class LayerExporter(object):
       self._current_file_extension = layer_elem.get_file_extension()
       
       if layer_elem.item_type in (layer_elem.ITEM, layer_elem.NONEMPTY_GROUP):
-        self._process_and_export_item(layer_elem)
+        for _unused in self._process_and_export_item(layer_elem):
+          yield
       elif layer_elem.item_type == layer_elem.EMPTY_GROUP:
         self._process_and_export_empty_group(layer_elem)
       else:
         raise ValueError(
           "invalid/unsupported item type '{0}' of _ItemTreeElement '{1}'".format(
             layer_elem.item_type, layer_elem.name))
+      
+      yield
+    
+    if self._export_as_atlas:
+      # If the 'export' operation is disabled, `_export_atlas` returns None.
+      for _unused in self._export_atlas() or []:
+        yield
   
   def _process_and_export_item(self, layer_elem):
+    self._current_layer_start_time = time.time()
+    
     layer = layer_elem.item
     layer_copy = self._process_layer(layer_elem, self._image_copy, layer)
+    
+    yield
+    
+    if self.should_stop:
+      self._postprocess_layer(self._image_copy, layer_copy)
+      raise ExportLayersCancelError("export stopped by user")
+    
     self._preprocess_layer_name(layer_elem)
     self._export_layer(layer_elem, self._image_copy, layer_copy)
     self._postprocess_layer(self._image_copy, layer_copy)
     self._postprocess_layer_name(layer_elem)
     self.progress_updater.update_tasks()
     
-    if self._current_overwrite_mode != overwrite.OverwriteModes.SKIP:
+    # Layers exported as an atlas are recorded once the atlas is saved.
+    if not self._export_as_atlas and self._current_overwrite_mode != overwrite.OverwriteModes.SKIP:
       self._exported_layers.append(layer)
-      self._file_extension_properties[self._file_extension_to_assign].processed_count += 1
   
   def _process_and_export_empty_group(self, layer_elem):
     self._preprocess_empty_group_name(layer_elem)
@@ -624,6 +804,10 @@ class LayerExporter(object):
       if tagged_layer_copy is not None:
         pdb.gimp_item_delete(tagged_layer_copy)
     
+    if self._atlas_image is not None:
+      pdb.gimp_image_delete(self._atlas_image)
+      self._atlas_image = None
+    
     pdb.gimp_context_pop()
   
   def _copy_non_modifying_parasites(self, src_image, dest_image):
@@ -653,7 +837,8 @@ class LayerExporter(object):
     if self.export_settings['more_operations/inherit_transparency_from_groups'].value:
       layer_copy.opacity = 100.0 * functools.reduce(
         lambda layer1_opacity, layer2_opacity: layer1_opacity * layer2_opacity,
-        [parent.item.opacity / 100.0 for parent in layer_elem.parents] + [layer_elem.item.opacity / 100.0])
+        [parent.attributes["opacity"] / 100.0 for parent in layer_elem.parents]
+        + [layer_elem.attributes["opacity"] / 100.0])
     
     image.active_layer = layer_copy
     
@@ -741,8 +926,10 @@ class LayerExporter(object):
     return layer
   
   def _preprocess_layer_name(self, layer_elem):
-    self._rename_layer_by_pattern(layer_elem)
-    self._set_file_extension(layer_elem)
+    # Names processed during a previous export and not reset since are kept.
+    if not self._layer_tree.is_name_uniquified(layer_elem):
+      self._rename_layer_by_pattern(layer_elem)
+      self._set_file_extension(layer_elem)
     self._layer_tree.validate_name(layer_elem)
   
   def _preprocess_empty_group_name(self, layer_elem):
@@ -796,6 +983,11 @@ class LayerExporter(object):
   
   def _export_layer(self, layer_elem, image, layer):
     self._process_layer_name(layer_elem)
+    
+    if self._export_as_atlas:
+      self._add_layer_to_atlas(layer_elem, image, layer)
+      return
+    
     self._export(layer_elem, image, layer)
     
     if self._current_layer_export_status == ExportStatuses.USE_DEFAULT_FILE_EXTENSION:
@@ -806,6 +998,120 @@ class LayerExporter(object):
   def _export(self, layer_elem, image, layer):
     output_filename = layer_elem.get_filepath(self._output_directory, self._include_item_path)
     
+    self._layer_pixel_hashes.clear()
+    
+    if not self._scales:
+      self._export_file_formats(layer_elem, image, layer, output_filename)
+      return
+    
+    overwrite_mode = None
+    
+    scaled_images = self._get_scaled_images(image, layer)
+    try:
+      for scale_index, (scale, scaled_image, scaled_layer) in enumerate(scaled_images):
+        self._export_file_formats(
+          layer_elem, scaled_image, scaled_layer, self._get_scaled_filename(output_filename, scale, scale_index))
+        
+        if overwrite_mode is None:
+          overwrite_mode = self._current_overwrite_mode
+        
+        if self._current_layer_export_status == ExportStatuses.USE_DEFAULT_FILE_EXTENSION:
+          break
+    finally:
+      scaled_images.close()
+    
+    self._current_overwrite_mode = overwrite_mode
+  
+  def _get_scaled_images(self, image, layer):
+    """
+    Yield (scale, image, layer) tuples for each scale factor, from the largest
+    to the smallest scale.
+    
+    Scales smaller than 1 are obtained by downscaling the image of the previous
+    scale rather than the original image. For scale 1, the original image is
+    yielded.
+    """
+    
+    layer_position = pdb.gimp_image_get_item_position(image, layer)
+    scaled_images = []
+    source_image = image
+    
+    try:
+      for scale in self._scales:
+        if scale == 1.0:
+          yield scale, image, layer
+          continue
+        
+        scaled_image = pdb.gimp_image_duplicate(source_image if scale < 1.0 else image)
+        pdb.gimp_image_undo_freeze(scaled_image)
+        scaled_images.append(scaled_image)
+        
+        pdb.gimp_image_scale(
+          scaled_image, max(int(round(image.width * scale)), 1), max(int(round(image.height * scale)), 1))
+        
+        if scale < 1.0:
+          source_image = scaled_image
+        
+        yield scale, scaled_image, scaled_image.layers[layer_position]
+    finally:
+      for scaled_image in scaled_images:
+        pdb.gimp_image_delete(scaled_image)
+  
+  def _get_scaled_name(self, scale, scale_index):
+    scaled_filename_format = self.export_settings['scales/scaled_filename_format'].value
+    
+    try:
+      return scaled_filename_format.format(scale="{0:g}".format(scale), level=scale_index)
+    except (KeyError, IndexError, ValueError, AttributeError):
+      raise ExportLayersError(
+        _("Invalid filename suffix or folder name of scaled images: \"{0}\". "
+          "Only the \"{{scale}}\" and \"{{level}}\" fields are allowed.").format(scaled_filename_format))
+  
+  def _get_scaled_filename(self, filename, scale, scale_index):
+    scaled_name = self._get_scaled_name(scale, scale_index)
+    
+    dirname, basename = os.path.split(filename)
+    
+    if self.export_settings['scales/scaled_filename_mode'].is_item('folder'):
+      return os.path.join(dirname, pgpath.FilenameValidator.validate(scaled_name), basename)
+    else:
+      file_extension = pgitemtree.get_file_extension(basename)
+      basename_without_extension = pgitemtree.set_file_extension(basename, "", keep_extra_periods=True)
+      return os.path.join(
+        dirname,
+        "{0}.{1}".format(
+          pgpath.FilenameValidator.validate(basename_without_extension + scaled_name), file_extension))
+  
+  def _export_file_formats(self, layer_elem, image, layer, output_filename):
+    self._export_file(layer_elem, image, layer, output_filename)
+    
+    if self._current_layer_export_status == ExportStatuses.USE_DEFAULT_FILE_EXTENSION:
+      return
+    
+    overwrite_mode = self._current_overwrite_mode
+    file_extension = self._file_extension_to_assign
+    file_export_func = self._file_export_func
+    
+    # If the layer name contains a file extension, the layer is saved in that
+    # format and all the specified formats, including the default one.
+    for additional_file_extension in self._file_extensions:
+      if additional_file_extension == file_extension:
+        continue
+      
+      self._file_extension_to_assign = additional_file_extension
+      self._file_export_func = self._get_file_export_func(additional_file_extension)
+      
+      dirname, basename = os.path.split(output_filename)
+      self._export_file(
+        layer_elem, image, layer,
+        os.path.join(
+          dirname, pgitemtree.set_file_extension(basename, additional_file_extension, keep_extra_periods=True)))
+    
+    self._file_extension_to_assign = file_extension
+    self._file_export_func = file_export_func
+    self._current_overwrite_mode = overwrite_mode
+  
+  def _export_file(self, layer_elem, image, layer, output_filename):
     self.progress_updater.update_text(_("Saving '{0}'").format(output_filename))
     
     self._current_overwrite_mode, output_filename = overwrite.handle_overwrite(
@@ -820,9 +1126,65 @@ class LayerExporter(object):
       
       self._update_file_export_func()
       
+      if self._deduplicate_layers:
+        layer_hash = self._get_layer_hash(layer)
+      else:
+        layer_hash = None
+      
+      if self._deduplicate_layers and self._export_deduplicated(layer_hash, output_filename):
+        self._file_extension_properties[self._file_extension_to_assign].processed_count += 1
+        self._write_manifest_entry(
+          layer_elem, layer, output_filename, layer_hash, self._exported_filenames_by_hash[layer_hash])
+        return
+      
       self._export_once_wrapper(run_mode, image, layer, output_filename)
       if self._current_layer_export_status == ExportStatuses.FORCE_INTERACTIVE:
         self._export_once_wrapper(gimpenums.RUN_INTERACTIVE, image, layer, output_filename)
+      
+      if self._current_layer_export_status == ExportStatuses.EXPORT_SUCCESSFUL:
+        self._file_extension_properties[self._file_extension_to_assign].processed_count += 1
+        if self._deduplicate_layers:
+          self._exported_filenames_by_hash[layer_hash] = output_filename
+        self._write_manifest_entry(layer_elem, layer, output_filename, layer_hash)
+  
+  def _get_layer_hash(self, layer):
+    """
+    Return a hash identifying the layer contents saved in the current file
+    format. The pixels of the layer are hashed only once, even if the layer is
+    saved in multiple file formats.
+    """
+    
+    if layer.ID not in self._layer_pixel_hashes:
+      pixel_region = layer.get_pixel_rgn(0, 0, layer.width, layer.height, False, False)
+      
+      layer_hash = hashlib.sha1(pixel_region[0:layer.width, 0:layer.height])
+      layer_hash.update("{0}x{1}x{2}".format(layer.width, layer.height, layer.bpp).encode())
+      
+      self._layer_pixel_hashes[layer.ID] = layer_hash.hexdigest()
+    
+    return (self._layer_pixel_hashes[layer.ID], self._file_extension_to_assign)
+  
+  def _export_deduplicated(self, layer_hash, output_filename):
+    """
+    If a layer with the same contents and file extension has already been
+    exported, copy its file to `output_filename` instead of saving the layer
+    again. Return True if the file was copied, False otherwise.
+    """
+    
+    existing_filename = self._exported_filenames_by_hash.get(layer_hash)
+    if existing_filename is None or not os.path.isfile(existing_filename):
+      return False
+    
+    if os.path.abspath(existing_filename) != os.path.abspath(output_filename):
+      try:
+        shutil.copyfile(existing_filename, output_filename)
+      except (IOError, OSError):
+        return False
+    
+    self._current_layer_export_status = ExportStatuses.EXPORT_SUCCESSFUL
+    self._num_deduplicated_layers += 1
+    
+    return True
   
   def _export_once_wrapper(self, run_mode, image, layer, output_filename):
     with self.export_context_manager(run_mode, image, layer, output_filename, *self.export_context_manager_args):
@@ -849,7 +1211,7 @@ class LayerExporter(object):
         else:
           raise ExportLayersError(e.message, layer, self._default_file_extension)
       else:
-        if self._file_extension_to_assign != self._default_file_extension:
+        if self._file_extension_to_assign not in self._file_extensions:
           self._file_extension_properties[self._file_extension_to_assign].is_valid = False
           self._file_extension_to_assign = self._default_file_extension
           self._current_layer_export_status = ExportStatuses.USE_DEFAULT_FILE_EXTENSION
@@ -858,15 +1220,212 @@ class LayerExporter(object):
     else:
       self._current_layer_export_status = ExportStatuses.EXPORT_SUCCESSFUL
   
+  def _add_layer_to_atlas(self, layer_elem, image, layer):
+    if (layer.width > self.export_settings['atlas/max_width'].value
+        or layer.height > self.export_settings['atlas/max_height'].value):
+      raise ExportLayersError(
+        _("Layer is larger than the maximum atlas size."), layer, self._default_file_extension)
+    
+    if self._atlas_image is None:
+      self._atlas_image = pgpdb.duplicate(self._image_copy, metadata_only=True)
+      pdb.gimp_image_undo_freeze(self._atlas_image)
+    
+    atlas_layer = pdb.gimp_layer_new_from_drawable(layer, self._atlas_image)
+    pdb.gimp_image_insert_layer(self._atlas_image, atlas_layer, None, 0)
+    
+    self._atlas_layers.append((layer_elem, atlas_layer))
+  
+  def _export_atlas(self):
+    if not self._atlas_layers:
+      return
+    
+    bins = rectpacking.pack(
+      [(index, atlas_layer.width, atlas_layer.height)
+       for index, (_unused, atlas_layer) in enumerate(self._atlas_layers)],
+      self.export_settings['atlas/max_width'].value,
+      self.export_settings['atlas/max_height'].value,
+      self.export_settings['atlas/padding'].value)
+    
+    image_name = self.image.name if self.image.name is not None else _("Untitled")
+    atlas_name = pgitemtree.set_file_extension(image_name, "")
+    
+    self._file_extension_to_assign = self._default_file_extension
+    self._file_export_func = self._get_file_export_func(self._default_file_extension)
+    
+    run_mode = self.initial_run_mode
+    
+    for page_number, bin_ in enumerate(bins, start=1):
+      if self.should_stop:
+        raise ExportLayersCancelError("export stopped by user")
+      
+      if len(bins) > 1:
+        atlas_filename = "{0}_{1}.{2}".format(atlas_name, page_number, self._default_file_extension)
+      else:
+        atlas_filename = "{0}.{1}".format(atlas_name, self._default_file_extension)
+      
+      self._export_atlas_image(bin_, os.path.join(self._output_directory, atlas_filename), run_mode)
+      
+      if self._current_layer_export_status == ExportStatuses.EXPORT_SUCCESSFUL:
+        run_mode = gimpenums.RUN_WITH_LAST_VALS
+      
+      yield
+  
+  def _export_atlas_image(self, bin_, output_filename, run_mode):
+    self._current_layer_start_time = time.time()
+    
+    atlas_image = pgpdb.duplicate(self._atlas_image, metadata_only=True)
+    pdb.gimp_image_undo_freeze(atlas_image)
+    
+    try:
+      pdb.gimp_image_resize(atlas_image, bin_.width, bin_.height, 0, 0)
+      
+      layer_entries = collections.OrderedDict()
+      
+      for rectangle in bin_.rectangles:
+        layer_elem, atlas_layer = self._atlas_layers[rectangle.key]
+        
+        layer_copy = pdb.gimp_layer_new_from_drawable(atlas_layer, atlas_image)
+        pdb.gimp_image_insert_layer(atlas_image, layer_copy, None, 0)
+        pdb.gimp_item_set_visible(layer_copy, True)
+        pdb.gimp_layer_set_offsets(layer_copy, rectangle.x, rectangle.y)
+        
+        layer_entries[self._get_atlas_layer_name(layer_elem)] = collections.OrderedDict([
+          ('x', rectangle.x), ('y', rectangle.y), ('width', rectangle.width), ('height', rectangle.height)])
+      
+      layer = pdb.gimp_image_merge_visible_layers(atlas_image, gimpenums.CLIP_TO_IMAGE)
+      pdb.gimp_layer_resize_to_image_size(layer)
+      
+      self.progress_updater.update_text(_("Saving '{0}'").format(output_filename))
+      
+      self._current_overwrite_mode, output_filename = overwrite.handle_overwrite(
+        output_filename, self.overwrite_chooser, self._get_uniquifier_position(output_filename))
+      
+      if self._current_overwrite_mode == overwrite.OverwriteModes.CANCEL:
+        raise ExportLayersCancelError("cancelled")
+      
+      if self._current_overwrite_mode != overwrite.OverwriteModes.SKIP:
+        self._make_dirs(os.path.dirname(output_filename))
+        
+        self._export_once_wrapper(run_mode, atlas_image, layer, output_filename)
+        if self._current_layer_export_status == ExportStatuses.FORCE_INTERACTIVE:
+          self._export_once_wrapper(gimpenums.RUN_INTERACTIVE, atlas_image, layer, output_filename)
+        
+        if self._current_layer_export_status == ExportStatuses.EXPORT_SUCCESSFUL:
+          atlas_data = collections.OrderedDict([
+            ('image', os.path.basename(output_filename)),
+            ('width', bin_.width),
+            ('height', bin_.height),
+            ('layers', layer_entries)])
+          
+          with open(pgitemtree.set_file_extension(output_filename, "json"), "w") as atlas_data_file:
+            json.dump(atlas_data, atlas_data_file, indent=2)
+          
+          self._exported_layers.extend(
+            self._atlas_layers[rectangle.key][0].item for rectangle in bin_.rectangles)
+          
+          self._write_manifest_entry(None, layer, output_filename)
+    finally:
+      pdb.gimp_image_delete(atlas_image)
+  
+  def _get_atlas_layer_name(self, layer_elem):
+    layer_filepath = os.path.relpath(
+      layer_elem.get_filepath(self._output_directory, self._include_item_path), self._output_directory)
+    return pgitemtree.set_file_extension(layer_filepath, "").replace(os.sep, "/")
+  
+  def _open_manifest(self):
+    if not self.export_settings['more_operations/write_manifest'].value:
+      return
+    
+    image_name = self.image.name if self.image.name is not None else _("Untitled")
+    self._manifest_filename = os.path.join(
+      self._output_directory, "{0}_manifest.jsonl".format(pgitemtree.set_file_extension(image_name, "")))
+    
+    self._make_dirs(self._output_directory)
+    
+    try:
+      self._manifest_file = open(self._manifest_filename, "w")
+    except (IOError, OSError) as e:
+      raise InvalidOutputDirectoryError(
+        "{0}: \"{1}\"".format(e.strerror, self._manifest_filename), None, self._default_file_extension)
+  
+  def _close_manifest(self):
+    if self._manifest_file is not None:
+      self._manifest_file.close()
+      self._manifest_file = None
+  
+  def _write_manifest_entry(self, layer_elem, layer, output_filename, layer_hash=None, duplicate_of=None):
+    """
+    Write an entry describing the exported file to the manifest. The entry is
+    flushed immediately so that the manifest remains valid if the export is
+    interrupted.
+    
+    If `layer_elem` is None, the file does not correspond to a single layer
+    (e.g. an atlas image).
+    
+    If `duplicate_of` is not None, the file is a copy of the specified file
+    containing a layer with identical contents.
+    
+    If `layer_hash` is None, the hash of `layer` is computed.
+    """
+    
+    if self._manifest_file is None:
+      return
+    
+    if layer_hash is None:
+      layer_hash = self._get_layer_hash(layer)
+    
+    if layer_elem is not None:
+      layer_id = layer_elem.item.ID
+      layer_path = "/".join([parent.orig_name for parent in layer_elem.parents] + [layer_elem.orig_name])
+    else:
+      layer_id = None
+      layer_path = None
+    
+    entry = collections.OrderedDict([
+      ('layer_id', layer_id),
+      ('layer_path', layer_path),
+      ('output_path', output_filename),
+      ('format', self._file_extension_to_assign),
+      ('width', layer.width),
+      ('height', layer.height),
+      ('size', os.path.getsize(output_filename)),
+      ('hash', layer_hash[0]),
+      ('processing_time', round(time.time() - self._current_layer_start_time, 6))])
+    
+    if duplicate_of is not None:
+      entry['duplicate_of'] = duplicate_of
+    
+    self._manifest_file.write(json.dumps(entry) + "\n")
+    self._manifest_file.flush()
+  
   def _get_run_mode(self):
     if self._file_extension_properties[self._file_extension_to_assign].is_valid:
       if self._file_extension_properties[self._file_extension_to_assign].processed_count == 0:
         return self.initial_run_mode
+      elif (self.initial_run_mode == gimpenums.RUN_NONINTERACTIVE
+            and self._get_save_parameter_values(self._file_extension_to_assign)):
+        # Keep passing explicit save parameters rather than relying on the last
+        # values stored by the file save procedure.
+        return gimpenums.RUN_NONINTERACTIVE
       else:
         return gimpenums.RUN_WITH_LAST_VALS
     else:
       return self.initial_run_mode
   
+  def _get_file_export_func(self, file_extension):
+    return pgfileformats.get_save_procedure(file_extension, self._get_save_parameter_values(file_extension))
+  
+  def _get_save_parameter_values(self, file_extension):
+    file_format = pgfileformats.file_formats_dict.get(file_extension)
+    if file_format is None or not file_format.save_procedure_func_args:
+      return {}
+    
+    save_parameters_path = 'save_parameters/' + file_format.file_extensions[0]
+    if save_parameters_path not in self.export_settings:
+      return {}
+    
+    return {setting.name: setting.value for setting in self.export_settings[save_parameters_path].iterate_all()}
+  
   def _update_file_export_func(self):
     if self.export_settings['more_operations/use_file_extensions_in_layer_names'].value:
-      self._file_export_func = pgfileformats.get_save_procedure(self._file_extension_to_assign)
+      self._file_export_func = self._get_file_export_func(self._file_extension_to_assign)
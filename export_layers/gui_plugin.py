@@ -50,9 +50,11 @@ import export_layers.pygimplib as pygimplib
 
 from export_layers.pygimplib import constants
 from export_layers.pygimplib import overwrite
+from export_layers.pygimplib import pgfileformats
 from export_layers.pygimplib import pggui
 from export_layers.pygimplib import pggui_entries
 from export_layers.pygimplib import pgutils
+from export_layers.pygimplib import pgscheduler
 from export_layers.pygimplib import pgsetting
 from export_layers.pygimplib import pgsettinggroup
 from export_layers.pygimplib import pgsettingpersistor
@@ -164,6 +166,11 @@ class _ExportLayersGenericGui(object):
   _PROGRESS_BARS_SPACING = 3
   _PROGRESS_BAR_INDIVIDUAL_OPERATIONS_HEIGHT = 10
   
+  # Maximum time the export runs before GTK events are processed (e.g. the
+  # progress bar is redrawn or the Stop button is handled).
+  _EXPORT_STEPS_TIME_BUDGET_MILLISECONDS = 50
+  _PROGRESS_UPDATE_MIN_INTERVAL_MILLISECONDS = 50
+  
   def __init__(self):
     self._layer_exporter = None
     
@@ -185,6 +192,11 @@ class _ExportLayersGenericGui(object):
     else:
       return False
   
+  def _export_layers_in_steps(self, **export_kwargs):
+    pgscheduler.StepRunner(
+      self._layer_exporter.export_layers_in_steps(**export_kwargs),
+      self._EXPORT_STEPS_TIME_BUDGET_MILLISECONDS).run()
+  
   def _install_gimp_progress(self, progress_set_value, progress_reset_value):
     self._progress_callback = gimp.progress_install(
       progress_reset_value, progress_reset_value, lambda *args: None, progress_set_value)
@@ -434,6 +446,13 @@ class _ExportLayersGui(_ExportLayersGenericGui):
   _DELAY_NAME_PREVIEW_UPDATE_TEXT_ENTRIES_MILLISECONDS = 100
   _DELAY_CLEAR_LABEL_MESSAGE_MILLISECONDS = 10000
   
+  _NUM_PRERENDERED_NEIGHBORING_PREVIEWS = 2
+  
+  # The name preview determines which layers the image preview can display,
+  # hence it is updated first if both previews are due to be updated.
+  _NAME_PREVIEW_UPDATE_PRIORITY = 0
+  _IMAGE_PREVIEW_UPDATE_PRIORITY = 1
+  
   def __init__(self, initial_layer_tree, settings):
     super(_ExportLayersGui, self).__init__()
     
@@ -443,6 +462,8 @@ class _ExportLayersGui(_ExportLayersGenericGui):
     
     self._is_exporting = False
     
+    self._preview_scheduler = pgscheduler.UpdateScheduler()
+    
     self._suppress_gimp_progress()
     
     self._layer_exporter_for_previews = exportlayers.LayerExporter(
@@ -517,6 +538,12 @@ class _ExportLayersGui(_ExportLayersGenericGui):
       self._initial_layer_tree,
       self._settings['gui_session/export_image_preview_displayed_layers'].value[self._image.ID])
     
+    self._preview_scheduler.set_priority(self._export_name_preview.update, self._NAME_PREVIEW_UPDATE_PRIORITY)
+    self._preview_scheduler.set_priority(
+      self._export_name_preview.update_exported_layers, self._NAME_PREVIEW_UPDATE_PRIORITY)
+    self._preview_scheduler.set_priority(
+      self._export_image_preview.update_in_chunks, self._IMAGE_PREVIEW_UPDATE_PRIORITY)
+    
     self._vbox_folder_chooser = gtk.VBox(homogeneous=False)
     self._vbox_folder_chooser.set_spacing(self._DIALOG_VBOX_SPACING * 2)
     self._vbox_folder_chooser.pack_start(self._folder_chooser_label, expand=False, fill=False)
@@ -541,6 +568,8 @@ class _ExportLayersGui(_ExportLayersGenericGui):
     
     self._file_extension_entry = pggui_entries.FileExtensionEntry()
     self._file_extension_entry.set_width_chars(self._FILE_EXTENSION_ENTRY_WIDTH_CHARS)
+    self._file_extension_entry.set_tooltip_text(
+      _("Multiple file extensions can be separated by commas (e.g. \"png, jpg\")."))
     
     self._save_as_label = gtk.Label()
     self._save_as_label.set_markup("<b>" + _("Save as") + ":</b>")
@@ -610,6 +639,18 @@ class _ExportLayersGui(_ExportLayersGenericGui):
       self._settings['main/process_tagged_layers'].gui.element, expand=False, fill=False)
     self._vbox_more_settings_builtin.pack_start(
       self._settings['main/export_only_selected_layers'].gui.element, expand=False, fill=False)
+    self._vbox_more_settings_builtin.pack_start(
+      self._create_more_settings_section(_("Atlas"), self._settings['main/atlas'].iterate_all()),
+      expand=False, fill=False)
+    self._vbox_more_settings_builtin.pack_start(
+      self._create_more_settings_section(_("Scales"), self._settings['main/scales'].iterate_all()),
+      expand=False, fill=False)
+    for save_parameters_group in self._settings['main/save_parameters']:
+      self._vbox_more_settings_builtin.pack_start(
+        self._create_more_settings_section(
+          pgfileformats.file_formats_dict[save_parameters_group.name].description,
+          save_parameters_group.iterate_all()),
+        expand=False, fill=False)
     
     self._scrolled_window_more_settings_builtin = gtk.ScrolledWindow()
     self._scrolled_window_more_settings_builtin.set_policy(gtk.POLICY_AUTOMATIC, gtk.POLICY_AUTOMATIC)
@@ -728,6 +769,40 @@ class _ExportLayersGui(_ExportLayersGenericGui):
     
     self._dialog.show()
   
+  def _create_more_settings_section(self, title, settings):
+    """
+    Create a titled section in "More settings" containing GUI elements of the
+    specified settings. Check buttons span the entire width of the section,
+    other GUI elements are preceded by a label.
+    """
+    
+    settings = list(settings)
+    
+    label_title = gtk.Label()
+    label_title.set_markup("<b>" + gobject.markup_escape_text(title) + "</b>")
+    label_title.set_alignment(0.0, 0.5)
+    
+    table = gtk.Table(rows=len(settings), columns=2, homogeneous=False)
+    table.set_row_spacings(self._MORE_SETTINGS_OPERATIONS_SPACING)
+    table.set_col_spacings(self._HBOX_HORIZONTAL_SPACING)
+    
+    for row, setting in enumerate(settings):
+      if isinstance(setting, pgsetting.BoolSetting):
+        table.attach(setting.gui.element, 0, 2, row, row + 1, yoptions=0)
+      else:
+        label = gtk.Label(setting.display_name)
+        label.set_alignment(0.0, 0.5)
+        
+        table.attach(label, 0, 1, row, row + 1, xoptions=gtk.FILL, yoptions=0)
+        table.attach(setting.gui.element, 1, 2, row, row + 1, yoptions=0)
+    
+    vbox_section = gtk.VBox(homogeneous=False)
+    vbox_section.set_spacing(self._MORE_SETTINGS_OPERATIONS_SPACING)
+    vbox_section.pack_start(label_title, expand=False, fill=False)
+    vbox_section.pack_start(table, expand=False, fill=False)
+    
+    return vbox_section
+  
   def _init_previews(self):
     self._export_name_preview.update()
     self._export_image_preview.update()
@@ -749,7 +824,7 @@ class _ExportLayersGui(_ExportLayersGenericGui):
     try:
       setting.gui.update_setting_value()
     except pgsetting.SettingValueError as e:
-      pgutils.timeout_add_strict(
+      self._preview_scheduler.schedule(
         self._DELAY_NAME_PREVIEW_UPDATE_TEXT_ENTRIES_MILLISECONDS,
         self._export_name_preview.set_sensitive, False)
       self._display_message_label(e.message, message_type=gtk.MESSAGE_ERROR, setting=setting)
@@ -759,7 +834,7 @@ class _ExportLayersGui(_ExportLayersGenericGui):
       if self._message_setting == setting:
         self._display_message_label(None)
       
-      pgutils.timeout_add_strict(
+      self._preview_scheduler.schedule(
         self._DELAY_NAME_PREVIEW_UPDATE_TEXT_ENTRIES_MILLISECONDS, self._export_name_preview.update,
         should_enable_sensitive=True)
   
@@ -800,21 +875,69 @@ class _ExportLayersGui(_ExportLayersGenericGui):
       return
     
     if self._dialog.is_active() and not self._is_exporting:
+      # GIMP provides no means to find out whether the image was modified while
+      # the dialog was inactive, hence cached previews may be outdated.
+      self._export_image_preview.invalidate_previews()
       self._export_name_preview.update(reset_items=True)
       self._export_image_preview.update()
   
   def _connect_setting_changes_to_previews(self):
+    # Previews being rendered in advance would be outdated and the layer exporter
+    # they use must not be in the middle of rendering when the previews are updated.
     def _on_setting_changed(setting):
-      pgutils.timeout_add_strict(
+      self._export_image_preview.cancel_prerendering()
+      # Updating the entire name preview also covers a pending update of exported layers.
+      self._preview_scheduler.cancel(self._export_name_preview.update_exported_layers)
+      self._preview_scheduler.schedule(
         self._DELAY_PREVIEWS_SETTINGS_UPDATE_MILLISECONDS, self._export_name_preview.update)
-      pgutils.timeout_add_strict(
-        self._DELAY_PREVIEWS_SETTINGS_UPDATE_MILLISECONDS, self._export_image_preview.update)
+      self._preview_scheduler.schedule(
+        self._DELAY_PREVIEWS_SETTINGS_UPDATE_MILLISECONDS, self._export_image_preview.update_in_chunks)
+    
+    def _on_setting_affecting_exported_layers_changed(setting):
+      self._export_image_preview.cancel_prerendering()
+      self._preview_scheduler.schedule(
+        self._DELAY_PREVIEWS_SETTINGS_UPDATE_MILLISECONDS, self._export_name_preview.update_exported_layers)
+      self._preview_scheduler.schedule(
+        self._DELAY_PREVIEWS_SETTINGS_UPDATE_MILLISECONDS, self._export_image_preview.update_in_chunks)
+    
+    def _on_setting_not_affecting_layer_names_changed(setting):
+      self._export_image_preview.cancel_prerendering()
+      self._preview_scheduler.schedule(
+        self._DELAY_PREVIEWS_SETTINGS_UPDATE_MILLISECONDS, self._export_image_preview.update_in_chunks)
+    
+    # These settings modify only layer contents or the export itself, not layer
+    # names or which layers are exported, hence the name preview does not have
+    # to be updated.
+    settings_not_affecting_layer_names = set(
+      [self._settings['main/use_image_size'],
+       self._settings['main/more_operations/inherit_transparency_from_groups'],
+       self._settings['main/more_operations/ignore_layer_modes'],
+       self._settings['main/more_operations/autocrop'],
+       self._settings['main/more_operations/autocrop_to_background'],
+       self._settings['main/more_operations/autocrop_to_foreground'],
+       self._settings['main/more_operations/export_as_atlas'],
+       self._settings['main/more_operations/deduplicate_layers'],
+       self._settings['main/more_operations/write_manifest']]
+      + list(self._settings['main/atlas'].iterate_all())
+      + list(self._settings['main/scales'].iterate_all())
+      + list(self._settings['main/save_parameters'].iterate_all()))
+    
+    # These settings only determine which layers are exported. Names need to be
+    # computed only for layers in folders where layers were added or removed.
+    settings_affecting_exported_layers = set(
+      [self._settings['main/only_visible_layers']]
+      + list(self._settings['main/more_filters'].iterate_all()))
     
     for setting in self._settings['main'].iterate_all():
       if setting.name not in [
           'file_extension', 'output_directory', 'overwrite_mode', 'layer_filename_pattern',
           'export_only_selected_layers', 'selected_layers', 'selected_layers_persistent']:
-        setting.connect_event('value-changed', _on_setting_changed)
+        if setting in settings_affecting_exported_layers:
+          setting.connect_event('value-changed', _on_setting_affecting_exported_layers_changed)
+        elif setting not in settings_not_affecting_layer_names:
+          setting.connect_event('value-changed', _on_setting_changed)
+        else:
+          setting.connect_event('value-changed', _on_setting_not_affecting_layer_names_changed)
     
     event_id = self._settings['main/export_only_selected_layers'].connect_event(
       'value-changed', _on_setting_changed)
@@ -874,10 +997,10 @@ class _ExportLayersGui(_ExportLayersGenericGui):
         self._export_image_preview, self._settings['gui/export_image_preview_enabled'], "previews_enabled")
     elif current_position != self._hpaned_previous_position:
       if self._export_image_preview.is_larger_than_image():
-        pgutils.timeout_add_strict(
-          self._DELAY_PREVIEWS_PANE_DRAG_UPDATE_MILLISECONDS, self._export_image_preview.update)
+        self._preview_scheduler.schedule(
+          self._DELAY_PREVIEWS_PANE_DRAG_UPDATE_MILLISECONDS, self._export_image_preview.update_in_chunks)
       else:
-        pgutils.timeout_remove_strict(self._export_image_preview.update)
+        self._preview_scheduler.cancel(self._export_image_preview.update_in_chunks)
         self._export_image_preview.resize()
     
     self._hpaned_previous_position = current_position
@@ -905,10 +1028,10 @@ class _ExportLayersGui(_ExportLayersGenericGui):
         "vpaned_preview_enabled")
     elif current_position != self._vpaned_previous_position:
       if self._export_image_preview.is_larger_than_image():
-        pgutils.timeout_add_strict(
-          self._DELAY_PREVIEWS_PANE_DRAG_UPDATE_MILLISECONDS, self._export_image_preview.update)
+        self._preview_scheduler.schedule(
+          self._DELAY_PREVIEWS_PANE_DRAG_UPDATE_MILLISECONDS, self._export_image_preview.update_in_chunks)
       else:
-        pgutils.timeout_remove_strict(self._export_image_preview.update)
+        self._preview_scheduler.cancel(self._export_image_preview.update_in_chunks)
         self._export_image_preview.resize()
     
     self._vpaned_previous_position = current_position
@@ -931,18 +1054,27 @@ class _ExportLayersGui(_ExportLayersGenericGui):
           or layer_elem_from_cursor.item.ID != self._export_image_preview.layer_elem.item.ID):
         self._export_image_preview.layer_elem = layer_elem_from_cursor
         self._export_image_preview.update()
+        self._prerender_neighboring_previews(layer_elem_from_cursor)
     else:
       layer_elems_from_selected_rows = self._export_name_preview.get_layer_elems_from_selected_rows()
       if layer_elems_from_selected_rows:
         self._export_image_preview.layer_elem = layer_elems_from_selected_rows[0]
         self._export_image_preview.update()
+        self._prerender_neighboring_previews(layer_elems_from_selected_rows[0])
       else:
         self._export_image_preview.clear()
   
+  def _prerender_neighboring_previews(self, layer_elem):
+    self._export_image_preview.prerender_previews(
+      self._export_name_preview.get_neighboring_layer_elems(
+        layer_elem, self._NUM_PRERENDERED_NEIGHBORING_PREVIEWS))
+  
   def _on_name_preview_after_update(self):
+    self._export_image_preview.invalidate_tagged_layers()
     self._export_image_preview.update_layer_elem()
   
   def _on_name_preview_after_edit_tags(self):
+    self._export_image_preview.invalidate_tagged_layers()
     self._on_name_preview_selection_changed()
   
   def _on_dialog_key_press(self, widget, event):
@@ -1019,7 +1151,9 @@ class _ExportLayersGui(_ExportLayersGenericGui):
       default_response=self._settings['main/overwrite_mode'].items['cancel'],
       title=pygimplib.config.PLUGIN_TITLE,
       parent=self._dialog)
-    progress_updater = pggui.GtkProgressUpdater(self._progress_bar)
+    progress_updater = pggui.GtkProgressUpdater(
+      self._progress_bar, min_update_interval_milliseconds=self._PROGRESS_UPDATE_MIN_INTERVAL_MILLISECONDS,
+      force_update=False)
     
     self._layer_exporter = exportlayers.LayerExporter(
       gimpenums.RUN_INTERACTIVE, self._image, self._settings['main'], overwrite_chooser, progress_updater,
@@ -1027,9 +1161,11 @@ class _ExportLayersGui(_ExportLayersGenericGui):
     
     should_quit = True
     self._is_exporting = True
+    self._preview_scheduler.cancel_all()
+    self._export_image_preview.cancel_prerendering()
     
     try:
-      self._layer_exporter.export_layers()
+      self._export_layers_in_steps()
     except exportlayers.ExportLayersCancelError as e:
       should_quit = False
     except exportlayers.ExportLayersError as e:
@@ -1182,10 +1318,12 @@ class _ExportLayersRepeatGui(_ExportLayersGenericGui):
     self._layer_exporter = exportlayers.LayerExporter(
       gimpenums.RUN_WITH_LAST_VALS, self._image, self._settings['main'],
       overwrite.NoninteractiveOverwriteChooser(self._settings['main/overwrite_mode'].value),
-      pggui.GtkProgressUpdater(self._progress_bar),
+      pggui.GtkProgressUpdater(
+        self._progress_bar, min_update_interval_milliseconds=self._PROGRESS_UPDATE_MIN_INTERVAL_MILLISECONDS,
+        force_update=False),
       export_context_manager=_handle_gui_in_export, export_context_manager_args=[self._dialog])
     try:
-      self._layer_exporter.export_layers(layer_tree=self._layer_tree)
+      self._export_layers_in_steps(layer_tree=self._layer_tree)
     except exportlayers.ExportLayersCancelError:
       pass
     except exportlayers.ExportLayersError as e:
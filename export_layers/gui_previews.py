@@ -47,6 +47,7 @@ pdb = gimp.pdb
 import export_layers.pygimplib as pygimplib
 
 from export_layers.pygimplib import constants
+from export_layers.pygimplib import pgcache
 
 from export_layers import exportlayers
 
@@ -145,6 +146,13 @@ class ExportNamePreview(ExportPreview):
       on_after_edit_tags_func if on_after_edit_tags_func is not None else lambda *args: None)
     
     self._tree_iters = collections.defaultdict(lambda: None)
+    # List of (layer ID, parent layer ID or None) tuples in the order in which
+    # rows were inserted into the tree view.
+    self._displayed_item_structure = []
+    # Set of (layer ID, True if the layer is exported or False if the layer is a
+    # parent of an exported layer) tuples from the last update. None if names of
+    # all layers must be computed on the next update.
+    self._processed_items = None
     
     self._row_expand_collapse_interactive = True
     self._toggle_tag_interactive = True
@@ -156,18 +164,33 @@ class ExportNamePreview(ExportPreview):
     
     self._widget = self._vbox
   
-  def update(self, should_enable_sensitive=False, reset_items=False, update_existing_contents_only=False):
+  def update(self, should_enable_sensitive=False, reset_items=False, update_existing_contents_only=False,
+             changed_items=None):
     """
     Update the preview (filter layers, modify layer tree, etc.).
     
-    If `reset_items` is True, perform full update - add new layers, remove
-    non-existent layers, etc. Note that setting this to True may introduce a
-    performance penalty for hundreds of items.
+    If `reset_items` is True, refresh the layer tree against the current state
+    of the image (see `pgitemtree.ItemTree.refresh`) - add new layers, remove
+    non-existent layers, etc.
+    
+    If the displayed items (and their parents) are the same as before the
+    update, only the contents of the existing rows are updated. If items were
+    only added or removed, the corresponding rows are inserted or removed.
+    Otherwise, all rows are inserted again.
     
     If `update_existing_contents_only` is True, only update the contents of the
     existing items. Note that the items will not be reparented,
     expanded/collapsed or added/removed even if they need to be. This option is
     useful if you know the item structure will be preserved.
+    
+    `changed_items` is a list of IDs of layers whose names may have changed
+    since the last update (e.g. due to edited tags). If not None, names are
+    computed only for layers under the same parents as the changed layers and
+    layers under the same parents as layers added to or removed from the
+    exported layers since the last update. An empty list therefore indicates
+    that only the exported layers may have changed (see
+    `update_exported_layers`). If `changed_items` is None, names of all layers
+    are computed.
     """
     
     if self._update_locked:
@@ -176,18 +199,22 @@ class ExportNamePreview(ExportPreview):
     if should_enable_sensitive:
       self.set_sensitive(True)
     
-    if not update_existing_contents_only:
-      self.clear()
-    
-    self._process_items(reset_items=reset_items)
+    self._process_items(reset_items=reset_items, changed_items=changed_items)
     
     self._enable_filtered_items(enabled=True)
     
-    if not update_existing_contents_only:
-      self._insert_items()
+    item_structure = self._get_item_structure()
+    
+    if update_existing_contents_only or item_structure == self._displayed_item_structure:
+      self._update_items()
+    elif self._are_items_only_added_or_removed(item_structure):
+      self._add_and_remove_items(item_structure)
+      self._update_items()
       self._set_expanded_items()
     else:
-      self._update_items()
+      self.clear()
+      self._insert_items()
+      self._set_expanded_items()
     
     self._set_selection()
     self._set_items_sensitive()
@@ -200,6 +227,16 @@ class ExportNamePreview(ExportPreview):
     
     self._on_after_update_func()
   
+  def update_exported_layers(self):
+    """
+    Update the preview after a change affecting only which layers are exported
+    (e.g. a change in layer filters). Rows of layers no longer exported are
+    removed and rows of newly exported layers are inserted. Names are computed
+    only for layers under the same parents as the added or removed layers.
+    """
+    
+    self.update(changed_items=[])
+  
   def clear(self):
     """
     Clear the entire preview.
@@ -208,6 +245,7 @@ class ExportNamePreview(ExportPreview):
     self._clearing_preview = True
     self._tree_model.clear()
     self._tree_iters.clear()
+    self._displayed_item_structure = []
     self._clearing_preview = False
   
   def set_sensitive(self, sensitive):
@@ -233,6 +271,28 @@ class ExportNamePreview(ExportPreview):
     return [self._layer_exporter.layer_tree[layer_id]
             for layer_id in self._get_layer_ids_in_current_selection()]
   
+  def get_neighboring_layer_elems(self, layer_elem, num_neighbors):
+    """
+    Return a list of up to `num_neighbors` layers displayed before and up to
+    `num_neighbors` layers displayed after the specified layer, ordered from the
+    nearest. If the layer is not displayed, return an empty list.
+    """
+    
+    item_ids = [item_id for item_id, _unused in self._displayed_item_structure]
+    
+    try:
+      index = item_ids.index(layer_elem.item.ID)
+    except ValueError:
+      return []
+    
+    neighboring_item_ids = []
+    for offset in range(1, num_neighbors + 1):
+      for neighbor_index in [index + offset, index - offset]:
+        if 0 <= neighbor_index < len(item_ids):
+          neighboring_item_ids.append(item_ids[neighbor_index])
+    
+    return [self._layer_exporter.layer_tree[item_id] for item_id in neighboring_item_ids]
+  
   def get_layer_elem_from_cursor(self):
     tree_path, _unused = self._tree_view.get_cursor()
     if tree_path is not None:
@@ -438,9 +498,10 @@ class ExportNamePreview(ExportPreview):
     if self._toggle_tag_interactive:
       pdb.gimp_image_undo_group_start(self._layer_exporter.image)
       
-      for layer_id in self._get_layer_ids_in_current_selection():
-        layer_elem = self._layer_exporter.layer_tree[layer_id]
-        
+      layer_elems = [
+        self._layer_exporter.layer_tree[layer_id] for layer_id in self._get_layer_ids_in_current_selection()]
+      
+      for layer_elem in layer_elems:
         if tags_menu_item.get_active():
           layer_elem.add_tag(tag)
         else:
@@ -448,9 +509,14 @@ class ExportNamePreview(ExportPreview):
       
       pdb.gimp_image_undo_group_end(self._layer_exporter.image)
       
-      # Modifying just one layer could result in renaming other layers differently,
-      # hence update the whole preview.
-      self.update(update_existing_contents_only=True)
+      if self._are_layer_names_affected_by_tags():
+        # Modifying just one layer could result in renaming other layers in the
+        # same folder differently.
+        self.update(changed_items=[layer_elem.item.ID for layer_elem in layer_elems])
+      else:
+        for layer_elem in layer_elems:
+          self._update_item_elem(layer_elem)
+        self._update_displayed_tags()
       
       self._on_after_edit_tags_func()
   
@@ -545,10 +611,24 @@ class ExportNamePreview(ExportPreview):
       
       if self._layer_exporter.export_settings['export_only_selected_layers'].value:
         if self._selected_items != previous_selected_items:
-          self.update(update_existing_contents_only=True)
+          self.update(update_existing_contents_only=True, changed_items=[])
       
       self._on_selection_changed_func()
   
+  def _are_layer_names_affected_by_tags(self):
+    """
+    Return True if tags affect which layers are exported or what their names
+    are, False otherwise. If False, editing tags only changes the tag icons of
+    the edited layers.
+    """
+    
+    export_settings = self._layer_exporter.export_settings
+    return (
+      export_settings['process_tagged_layers'].value
+      or export_settings['more_filters/only_non_tagged_layers'].value
+      or export_settings['more_filters/only_tagged_layers'].value
+      or "[tags" in export_settings['layer_filename_pattern'].value)
+  
   def _get_layer_ids_in_current_selection(self):
     _unused, tree_paths = self._tree_view.get_selection().get_selected_rows()
     return [self._get_layer_id(self._tree_model.get_iter(tree_path)) for tree_path in tree_paths]
@@ -556,23 +636,91 @@ class ExportNamePreview(ExportPreview):
   def _get_layer_id(self, tree_iter):
     return self._tree_model.get_value(tree_iter, column=self._COLUMN_LAYER_ID[0])
   
-  def _process_items(self, reset_items=False):
+  def _process_items(self, reset_items=False, changed_items=None):
     if not reset_items:
       if self._initial_layer_tree is not None:
         layer_tree = self._initial_layer_tree
         self._initial_layer_tree = None
       else:
         if self._layer_exporter.layer_tree is not None:
+          if changed_items is not None and self._can_process_items_partially():
+            self._process_items_partially(changed_items)
+            return
+          
           self._layer_exporter.layer_tree.reset_item_elements()
         layer_tree = self._layer_exporter.layer_tree
     else:
-      layer_tree = None
+      if self._layer_exporter.layer_tree is not None:
+        self._layer_exporter.layer_tree.refresh()
+        self._layer_exporter.layer_tree.reset_item_elements()
+      layer_tree = self._layer_exporter.layer_tree
     
+    self._process_layer_names(layer_tree)
+    self._processed_items = self._get_processed_items()
+  
+  def _process_items_partially(self, changed_items):
+    layer_tree = self._layer_exporter.layer_tree
+    
+    parent_elems = set(layer_tree[item_id].parent for item_id in changed_items)
+    self._reset_items_in_folders(parent_elems)
+    
+    # Processing names also determines which layers are exported now. Layers
+    # added to or removed from a folder affect names of other layers in the
+    # folder, hence the folder is processed again.
+    self._process_layer_names(layer_tree)
+    
+    processed_items = self._get_processed_items()
+    
+    parent_elems_with_added_or_removed_items = set(
+      layer_tree[item_id].parent
+      for item_id, _unused in processed_items.symmetric_difference(self._processed_items)) - parent_elems
+    
+    # If names of all layers were computed, there is nothing left to process.
+    if None not in parent_elems and parent_elems_with_added_or_removed_items:
+      self._reset_items_in_folders(parent_elems_with_added_or_removed_items)
+      self._process_layer_names(layer_tree)
+    
+    self._processed_items = processed_items
+  
+  def _can_process_items_partially(self):
+    """
+    Return True if names can be computed only for layers in folders affected by
+    a change, False if names of all layers must be computed.
+    
+    Layers are uniquified and numbered per folder only if layer groups are
+    treated as folders. The filter matching file extensions and the layer path
+    in the filename pattern depend on names of other layers at the time the
+    name of a layer is computed.
+    """
+    
+    export_settings = self._layer_exporter.export_settings
+    return (
+      self._processed_items is not None
+      and export_settings['layer_groups_as_folders'].value
+      and not export_settings['more_filters/only_layers_matching_file_extension'].value
+      and "[layer path" not in export_settings['layer_filename_pattern'].value)
+  
+  def _reset_items_in_folders(self, parent_elems):
+    if None in parent_elems:
+      self._layer_exporter.layer_tree.reset_item_elements()
+    else:
+      for parent_elem in parent_elems:
+        self._layer_exporter.layer_tree.reset_item_elements(parent_elem.children)
+  
+  def _process_layer_names(self, layer_tree):
     with self._layer_exporter.modify_export_settings(
            {'selected_layers': {self._layer_exporter.image.ID: self._selected_items}},
            self._settings_events_to_temporarily_disable):
       self._layer_exporter.export_layers(operations=['layer_name'], layer_tree=layer_tree)
   
+  def _get_processed_items(self):
+    processed_items = set()
+    for layer_elem in self._layer_exporter.layer_tree:
+      processed_items.add((layer_elem.item.ID, True))
+      processed_items.update((parent_elem.item.ID, False) for parent_elem in layer_elem.parents)
+    
+    return processed_items
+  
   def _update_items(self):
     for layer_elem in self._layer_exporter.layer_tree:
       if self._layer_exporter.export_settings['layer_groups_as_folders'].value:
@@ -585,29 +733,125 @@ class ExportNamePreview(ExportPreview):
         self._insert_parent_item_elems(layer_elem)
       self._insert_item_elem(layer_elem)
   
+  def _get_item_structure(self):
+    """
+    Return a list of (layer ID, parent layer ID or None) tuples for the items to
+    be displayed in the order in which they would be inserted by
+    `_insert_items`.
+    """
+    
+    item_structure = []
+    item_ids = set()
+    
+    def _add_item_elem(item_elem):
+      if item_elem.parent is not None and item_elem.parent.item.ID in item_ids:
+        parent_id = item_elem.parent.item.ID
+      else:
+        parent_id = None
+      
+      item_structure.append((item_elem.item.ID, parent_id))
+      item_ids.add(item_elem.item.ID)
+    
+    for layer_elem in self._layer_exporter.layer_tree:
+      if self._layer_exporter.export_settings['layer_groups_as_folders'].value:
+        for parent_elem in layer_elem.parents:
+          if parent_elem.item.ID not in item_ids:
+            _add_item_elem(parent_elem)
+      _add_item_elem(layer_elem)
+    
+    return item_structure
+  
+  def _are_items_only_added_or_removed(self, item_structure):
+    displayed_parent_ids = dict(self._displayed_item_structure)
+    return all(
+      displayed_parent_ids[item_id] == parent_id
+      for item_id, parent_id in item_structure if item_id in displayed_parent_ids)
+  
+  def _add_and_remove_items(self, item_structure):
+    """
+    Remove rows of items not present in `item_structure` and insert rows of new
+    items, keeping the rows of the other items. Rows are removed in reverse order
+    so that rows of children are removed before rows of their parents.
+    """
+    
+    parent_ids = dict(item_structure)
+    
+    self._row_select_interactive = False
+    
+    for item_id, _unused in reversed(self._displayed_item_structure):
+      if item_id not in parent_ids:
+        self._tree_model.remove(self._tree_iters.pop(item_id))
+    
+    self._row_select_interactive = True
+    
+    displayed_item_ids = set(item_id for item_id, _unused in self._displayed_item_structure)
+    # key: parent layer ID or None; value: tree iter of the last child processed
+    last_child_tree_iters = {}
+    
+    for item_id, parent_id in item_structure:
+      if item_id not in displayed_item_ids:
+        self._insert_item_elem_after(
+          self._layer_exporter.layer_tree[item_id], self._tree_iters[parent_id],
+          last_child_tree_iters.get(parent_id))
+      
+      last_child_tree_iters[parent_id] = self._tree_iters[item_id]
+    
+    self._displayed_item_structure = list(item_structure)
+  
   def _insert_item_elem(self, item_elem):
     if item_elem.parent:
       parent_tree_iter = self._tree_iters[item_elem.parent.item.ID]
     else:
       parent_tree_iter = None
     
-    tree_iter = self._tree_model.append(
-      parent_tree_iter,
-      [self._get_icon_from_item_elem(item_elem),
-       bool(item_elem.tags),
-       True,
-       item_elem.name.encode(constants.GTK_CHARACTER_ENCODING),
-       item_elem.item.ID])
+    tree_iter = self._tree_model.append(parent_tree_iter, self._get_row_values(item_elem))
+    self._tree_iters[item_elem.item.ID] = tree_iter
+    self._displayed_item_structure.append(
+      (item_elem.item.ID, item_elem.parent.item.ID if parent_tree_iter is not None else None))
+    
+    return tree_iter
+  
+  def _insert_item_elem_after(self, item_elem, parent_tree_iter, previous_sibling_tree_iter):
+    """
+    Insert a row for the specified item after the row of its previous sibling.
+    If `previous_sibling_tree_iter` is None, insert the row as the first child
+    of `parent_tree_iter` (or as the first top-level row if `parent_tree_iter`
+    is None).
+    """
+    
+    tree_iter = self._tree_model.insert_after(
+      parent_tree_iter, previous_sibling_tree_iter, self._get_row_values(item_elem))
     self._tree_iters[item_elem.item.ID] = tree_iter
     
     return tree_iter
   
+  def _get_row_values(self, item_elem):
+    return [
+      self._get_icon_from_item_elem(item_elem),
+      bool(item_elem.tags),
+      True,
+      item_elem.name.encode(constants.GTK_CHARACTER_ENCODING),
+      item_elem.item.ID]
+  
   def _update_item_elem(self, item_elem):
-    self._tree_model.set(
-      self._tree_iters[item_elem.item.ID],
-      self._COLUMN_ICON_TAG_VISIBLE[0], bool(item_elem.tags),
-      self._COLUMN_LAYER_NAME_SENSITIVE[0], True,
-      self._COLUMN_LAYER_NAME[0], item_elem.name.encode(constants.GTK_CHARACTER_ENCODING))
+    """
+    Update the row of the specified item. Only columns whose values differ are
+    modified, avoiding redrawing rows that did not change.
+    """
+    
+    tree_iter = self._tree_iters[item_elem.item.ID]
+    
+    columns_and_values = []
+    for column, value in [
+          (self._COLUMN_ICON_LAYER[0], self._get_icon_from_item_elem(item_elem)),
+          (self._COLUMN_ICON_TAG_VISIBLE[0], bool(item_elem.tags)),
+          (self._COLUMN_LAYER_NAME_SENSITIVE[0], True),
+          (self._COLUMN_LAYER_NAME[0], item_elem.name.encode(constants.GTK_CHARACTER_ENCODING))]:
+      if self._tree_model.get_value(tree_iter, column) != value:
+        columns_and_values.extend([column, value])
+    
+    if columns_and_values:
+      self._tree_model.set(tree_iter, *columns_and_values)
   
   def _insert_parent_item_elems(self, item_elem):
     for parent_elem in item_elem.parents:
@@ -656,7 +900,8 @@ class ExportNamePreview(ExportPreview):
     return self._tree_model.get_value(self._tree_iters[item_elem.item.ID], self._COLUMN_LAYER_NAME_SENSITIVE[0])
   
   def _set_item_elem_sensitive(self, item_elem, sensitive):
-    if self._tree_iters[item_elem.item.ID] is not None:
+    if (self._tree_iters[item_elem.item.ID] is not None
+        and self._get_item_elem_sensitive(item_elem) != sensitive):
       self._tree_model.set_value(
         self._tree_iters[item_elem.item.ID], self._COLUMN_LAYER_NAME_SENSITIVE[0], sensitive)
   
@@ -759,6 +1004,27 @@ class ExportNamePreview(ExportPreview):
 
 class ExportImagePreview(ExportPreview):
   
+  """
+  This class defines a widget displaying the preview of the contents of a layer
+  as it would be exported.
+  
+  Finished previews are stored in a cache discarding the least recently used
+  previews if the total size of previews exceeds `max_preview_cache_size` (in
+  bytes). A cached preview is used if the layer, its attributes (and attributes
+  of layers tagged as background or foreground if such layers are processed),
+  export settings and preview size are the same. Changes in layer contents are
+  not tracked - call `invalidate_previews` if the image may have been modified.
+  
+  Previews of other layers (e.g. layers adjacent to the previewed layer) can be
+  rendered in advance via `prerender_previews` while GTK is idle.
+  
+  Attributes:
+  
+  * `preview_cache` (read-only) - `pgcache.LruCache` instance storing previews.
+    Use the `hits` and `misses` attributes of the cache to determine its
+    effectiveness or the `max_size` attribute to change the memory budget.
+  """
+  
   _BOTTOM_WIDGETS_PADDING = 5
   _IMAGE_PREVIEW_PADDING = 3
   
@@ -766,13 +1032,56 @@ class ExportImagePreview(ExportPreview):
   
   _PREVIEW_ALPHA_CHECK_SIZE = 4
   
-  def __init__(self, layer_exporter, initial_layer_tree=None, initial_previered_layer_id=None):
+  _MAX_PREVIEW_CACHE_SIZE_BYTES = 32 * 1024 * 1024
+  
+  _MAX_NUM_RECENTLY_VIEWED_LAYERS = 5
+  
+  _MAX_NUM_CACHED_CHECKERBOARDS = 4
+  _MAX_NUM_CACHED_SCALED_PREVIEWS = 8
+  # Sizes of previews scaled down when resizing the preview are rounded down to
+  # a multiple of this value so that scaled previews can be reused.
+  _SCALED_PREVIEW_SIZE_BUCKET_PIXELS = 16
+  
+  # Settings not affecting the contents of the preview
+  _PREVIEW_CACHE_IGNORED_SETTINGS = [
+    'output_directory', 'overwrite_mode', 'export_only_selected_layers', 'selected_layers',
+    'selected_layers_persistent']
+  
+  def __init__(self, layer_exporter, initial_layer_tree=None, initial_previered_layer_id=None,
+               max_preview_cache_size=None):
     super(ExportImagePreview, self).__init__()
     
     self._layer_exporter = layer_exporter
     self._initial_layer_tree = initial_layer_tree
     self._initial_previewed_layer_id = initial_previered_layer_id
     
+    self._preview_cache = pgcache.LruCache(
+      max_preview_cache_size if max_preview_cache_size is not None else self._MAX_PREVIEW_CACHE_SIZE_BYTES,
+      get_size_func=self._get_cached_preview_size)
+    
+    # key: (width, height); value: pixbuf with the checkerboard pattern
+    self._checkerboards = pgcache.LruCache(self._MAX_NUM_CACHED_CHECKERBOARDS)
+    # key: (width, height); value: scaled `_preview_pixbuf` with the alpha background
+    self._scaled_previews = pgcache.LruCache(self._MAX_NUM_CACHED_SCALED_PREVIEWS)
+    self._scaled_previews_source_pixbuf = None
+    
+    self._recently_viewed_layer_ids = collections.deque(maxlen=self._MAX_NUM_RECENTLY_VIEWED_LAYERS)
+    self._layer_ids_to_prerender = collections.deque()
+    self._prerender_source_id = None
+    # Generator rendering the preview of a single layer in steps (see
+    # `_get_in_memory_preview_in_steps`) and attributes describing the preview
+    # being rendered, which are swapped with those of the displayed preview
+    # before each step.
+    self._prerender_steps = None
+    self._prerender_preview_state = None
+    
+    self._update_in_progress = None
+    
+    # Layers tagged with built-in tags. The list is computed once per layer tree
+    # change (see `invalidate_tagged_layers`).
+    self._tagged_layers = None
+    self._tagged_layers_layer_tree = None
+    
     self._layer_elem = None
     
     self._preview_pixbuf = None
@@ -799,9 +1108,42 @@ class ExportImagePreview(ExportPreview):
     self._widget = self._vbox
   
   def update(self, should_enable_sensitive=False):
+    self._cancel_update_in_progress()
+    self._update_in_progress = self._update_in_chunks(should_enable_sensitive, True)
+    
+    for _unused in self._update_in_progress:
+      pass
+  
+  def update_in_chunks(self, should_enable_sensitive=False):
+    """
+    Update the preview like `update`, rendering the preview in chunks. Return a
+    generator performing one chunk per iteration, allowing the caller (e.g.
+    `pgscheduler.UpdateScheduler`) to process GTK events between chunks.
+    
+    The update in progress is discarded if the preview is updated again before
+    all chunks are performed.
+    
+    Unlike `update`, GTK events are not processed within the chunks.
+    """
+    
+    self._cancel_update_in_progress()
+    self._update_in_progress = self._update_in_chunks(should_enable_sensitive, False)
+    return self._update_in_progress
+  
+  def _cancel_update_in_progress(self):
+    # The update cannot be closed if this method is called from the update itself
+    # (while processing GTK events), in which case the update is left to finish.
+    if self._update_in_progress is not None and not self._update_in_progress.gi_running:
+      self._update_in_progress.close()
+    
+    self._update_in_progress = None
+  
+  def _update_in_chunks(self, should_enable_sensitive, process_gtk_events):
     if self._update_locked:
       return
     
+    self.cancel_prerendering()
+    
     if should_enable_sensitive:
       self.set_sensitive(True)
     
@@ -817,25 +1159,81 @@ class ExportImagePreview(ExportPreview):
       self.clear()
       return
     
+    layer_elem = self.layer_elem
+    
     self._is_updating = True
     
-    self._placeholder_image.hide()
-    self._preview_image.show()
-    self._set_layer_name_label(self.layer_elem.name)
+    try:
+      self._placeholder_image.hide()
+      self._preview_image.show()
+      self._set_layer_name_label(layer_elem.name)
+      
+      # Make sure that the correct size is allocated to the image.
+      if process_gtk_events:
+        while gtk.events_pending():
+          gtk.main_iteration()
+      else:
+        yield
+      
+      preview_pixbuf = None
+      with self._redirect_messages():
+        for preview_pixbuf in self._get_in_memory_preview_in_steps(layer_elem):
+          if preview_pixbuf is None:
+            yield
+      
+      if preview_pixbuf is not None:
+        self._preview_image.set_from_pixbuf(preview_pixbuf)
+        self._add_recently_viewed_layer_id(layer_elem.item.ID)
+      else:
+        self.clear(use_layer_name=True)
+    finally:
+      self._is_updating = False
+  
+  def prerender_previews(self, layer_elems):
+    """
+    Render previews of the specified layers and recently viewed layers in the
+    background and store them in the preview cache, so that displaying them
+    later is instant.
+    
+    Previews are rendered one at a time in steps, one step per idle callback,
+    so that GTK can process events between steps. Rendering stops as soon as
+    user input is pending, the preview is updated (see `update`, e.g. when a
+    different layer is selected) or the cache would have to discard previews to
+    make room for new ones. Previously scheduled rendering is canceled.
+    """
     
-    # Make sure that the correct size is allocated to the image.
-    while gtk.events_pending():
-      gtk.main_iteration()
+    self.cancel_prerendering()
     
-    with self._redirect_messages():
-      preview_pixbuf = self._get_in_memory_preview(self.layer_elem.item)
+    layer_ids = [layer_elem.item.ID for layer_elem in layer_elems] + list(reversed(self._recently_viewed_layer_ids))
+    for layer_id in layer_ids:
+      if ((self.layer_elem is None or layer_id != self.layer_elem.item.ID)
+          and layer_id not in self._layer_ids_to_prerender):
+        self._layer_ids_to_prerender.append(layer_id)
     
-    if preview_pixbuf is not None:
-      self._preview_image.set_from_pixbuf(preview_pixbuf)
-    else:
-      self.clear(use_layer_name=True)
+    if self._layer_ids_to_prerender:
+      self._prerender_source_id = gobject.idle_add(self._prerender_next_step, priority=gobject.PRIORITY_LOW)
+  
+  def cancel_prerendering(self):
+    """
+    Cancel rendering of previews scheduled by `prerender_previews`, including
+    the preview being rendered.
+    """
     
-    self._is_updating = False
+    if self._prerender_source_id is not None:
+      gobject.source_remove(self._prerender_source_id)
+      self._prerender_source_id = None
+    
+    self._stop_prerendering()
+  
+  def invalidate_previews(self):
+    """
+    Discard cached previews and cancel rendering of previews scheduled by
+    `prerender_previews`. Call this method if the contents of the image may have
+    been modified outside the plug-in.
+    """
+    
+    self.cancel_prerendering()
+    self._preview_cache.clear()
   
   def clear(self, use_layer_name=False):
     self.layer_elem = None
@@ -874,6 +1272,14 @@ class ExportImagePreview(ExportPreview):
         self.layer_elem = layer_elem
         self._set_layer_name_label(self.layer_elem.name)
   
+  def invalidate_tagged_layers(self):
+    """
+    Find layers tagged with built-in tags again on the next update. Call this
+    method if the layer tree or tags of layers changed.
+    """
+    
+    self._tagged_layers = None
+  
   @property
   def layer_elem(self):
     return self._layer_elem
@@ -890,6 +1296,10 @@ class ExportImagePreview(ExportPreview):
   def widget(self):
     return self._widget
   
+  @property
+  def preview_cache(self):
+    return self._preview_cache
+  
   def _init_gui(self):
     self._preview_image = gtk.Image()
     self._preview_image.set_no_show_all(True)
@@ -921,13 +1331,38 @@ class ExportImagePreview(ExportPreview):
     else:
       return layer_elem
   
-  def _get_in_memory_preview(self, layer):
+  def _get_in_memory_preview_in_steps(self, layer_elem):
+    """
+    Render the preview of the specified layer in steps. Yield None after each
+    step. If the preview was rendered, yield the preview as the last value.
+    """
+    
+    layer = layer_elem.item
+    
     self._preview_width, self._preview_height = self._get_preview_size(layer.width, layer.height)
     self._preview_scaling_factor = self._preview_width / layer.width
     
-    image_preview = self._get_image_preview()
+    preview_cache_key = self._get_preview_cache_key(layer_elem)
+    cached_preview = self._preview_cache.get(preview_cache_key)
+    if cached_preview is not None:
+      self._preview_pixbuf, layer_preview_pixbuf = cached_preview
+      yield layer_preview_pixbuf
+      return
+    
+    if self._can_render_preview_from_thumbnail(layer_elem):
+      layer_preview_pixbuf = self._get_preview_from_thumbnail(layer_elem)
+      if layer_preview_pixbuf is not None:
+        self._preview_cache.add(preview_cache_key, (self._preview_pixbuf, layer_preview_pixbuf))
+        yield layer_preview_pixbuf
+        return
+    
+    image_preview = None
+    for image_preview in self._get_image_preview_in_steps(layer_elem):
+      if image_preview is None:
+        yield None
+    
     if image_preview is None:
-      return None
+      return
     
     if image_preview.base_type != gimpenums.RGB:
       pdb.gimp_image_convert_rgb(image_preview)
@@ -949,7 +1384,253 @@ class ExportImagePreview(ExportPreview):
     
     self._cleanup(image_preview)
     
-    return layer_preview_pixbuf
+    self._preview_cache.add(preview_cache_key, (self._preview_pixbuf, layer_preview_pixbuf))
+    
+    yield layer_preview_pixbuf
+  
+  def _get_preview_cache_key(self, layer_elem):
+    layer = layer_elem.item
+    
+    export_settings_values = tuple(
+      (setting.name, repr(setting.value)) for setting in self._layer_exporter.export_settings.iterate_all()
+      if setting.name not in self._PREVIEW_CACHE_IGNORED_SETTINGS)
+    
+    layers_to_compare = [layer] + self._get_tagged_layers()
+    
+    return (
+      layer.ID,
+      hash(export_settings_values),
+      tuple(self._get_layer_attributes(layer_to_compare) for layer_to_compare in layers_to_compare),
+      # Opacity and visibility of parents affect the layer if transparency is
+      # inherited from layer groups.
+      tuple((parent.item.ID, parent.item.opacity, parent.item.visible) for parent in layer_elem.parents),
+      (self._layer_exporter.image.width, self._layer_exporter.image.height),
+      (self._preview_width, self._preview_height),
+      self.draw_checkboard_alpha_background)
+  
+  def _get_tagged_layers(self):
+    """
+    Return layers tagged with built-in tags (background, foreground) inserted to
+    each exported layer if tagged layers are processed.
+    """
+    
+    layer_tree = self._layer_exporter.layer_tree
+    
+    if not self._layer_exporter.export_settings['process_tagged_layers'].value or layer_tree is None:
+      return []
+    
+    if self._tagged_layers is None or self._tagged_layers_layer_tree is not layer_tree:
+      orig_is_filtered = layer_tree.is_filtered
+      layer_tree.is_filtered = False
+      try:
+        self._tagged_layers = [
+          layer_elem.item for layer_elem in layer_tree
+          if any(tag in exportlayers.LayerExporter.BUILTIN_TAGS for tag in layer_elem.tags)]
+      finally:
+        layer_tree.is_filtered = orig_is_filtered
+      
+      self._tagged_layers_layer_tree = layer_tree
+    
+    return self._tagged_layers
+  
+  @staticmethod
+  def _get_layer_attributes(layer):
+    return (layer.ID, layer.width, layer.height, layer.offsets, layer.opacity, layer.mode, layer.visible)
+  
+  def _can_render_preview_from_thumbnail(self, layer_elem):
+    """
+    Return True if the preview of the layer is identical to the thumbnail of the
+    layer (placed within the image if `use_image_size` is enabled), i.e. if no
+    operation changing the layer contents would be applied during the export.
+    
+    Translucent layers are not rendered from the thumbnail as the thumbnail does
+    not reflect the layer opacity.
+    """
+    
+    export_settings = self._layer_exporter.export_settings
+    layer = layer_elem.item
+    
+    if layer_elem.item_type != layer_elem.ITEM or not layer.is_rgb or layer.mask is not None:
+      return False
+    
+    if layer.opacity != 100.0:
+      return False
+    
+    if layer.mode != gimpenums.NORMAL_MODE and not export_settings['more_operations/ignore_layer_modes'].value:
+      return False
+    
+    if export_settings['more_operations/autocrop'].value:
+      return False
+    
+    if (export_settings['more_operations/inherit_transparency_from_groups'].value
+        and any(parent.attributes["opacity"] != 100.0 for parent in layer_elem.parents)):
+      return False
+    
+    return not self._get_tagged_layers()
+  
+  def _get_preview_from_thumbnail(self, layer_elem):
+    """
+    Render the preview from the thumbnail of the layer, bypassing the export.
+    
+    Return None if the thumbnail cannot be obtained in the required size, in
+    which case the preview must be rendered by the export.
+    """
+    
+    layer = layer_elem.item
+    
+    if not self._layer_exporter.export_settings['use_image_size'].value:
+      self._preview_width, self._preview_height, preview_data = self._get_preview_data(
+        layer, self._preview_width, self._preview_height)
+      
+      return self._get_preview_pixbuf(layer, self._preview_width, self._preview_height, preview_data)
+    
+    image = self._layer_exporter.image
+    
+    self._preview_width, self._preview_height = self._get_preview_size(image.width, image.height)
+    self._preview_scaling_factor = self._preview_width / image.width
+    
+    layer_preview_width = max(1, int(round(layer.width * self._preview_scaling_factor)))
+    layer_preview_height = max(1, int(round(layer.height * self._preview_scaling_factor)))
+    
+    if (layer_preview_width > self._MAX_PREVIEW_SIZE_PIXELS
+        or layer_preview_height > self._MAX_PREVIEW_SIZE_PIXELS):
+      return None
+    
+    layer_preview_width, layer_preview_height, preview_data = self._get_preview_data(
+      layer, layer_preview_width, layer_preview_height)
+    
+    layer_pixbuf = gtk.gdk.pixbuf_new_from_data(
+      preview_data, gtk.gdk.COLORSPACE_RGB, layer.has_alpha, 8, layer_preview_width,
+      layer_preview_height, layer_preview_width * layer.bpp)
+    
+    preview_pixbuf = gtk.gdk.Pixbuf(
+      gtk.gdk.COLORSPACE_RGB, True, 8, self._preview_width, self._preview_height)
+    preview_pixbuf.fill(0x00000000)
+    
+    layer_offset_x, layer_offset_y = (
+      int(round(offset * self._preview_scaling_factor)) for offset in layer.offsets)
+    
+    # Only the part of the layer within the image is visible.
+    dest_x = max(layer_offset_x, 0)
+    dest_y = max(layer_offset_y, 0)
+    dest_width = min(layer_offset_x + layer_preview_width, self._preview_width) - dest_x
+    dest_height = min(layer_offset_y + layer_preview_height, self._preview_height) - dest_y
+    
+    if dest_width > 0 and dest_height > 0:
+      layer_pixbuf.composite(
+        preview_pixbuf, dest_x, dest_y, dest_width, dest_height, layer_offset_x, layer_offset_y,
+        1.0, 1.0, gtk.gdk.INTERP_NEAREST, 255)
+    
+    self._preview_pixbuf = preview_pixbuf
+    
+    return self._add_alpha_background_to_pixbuf(
+      preview_pixbuf, 100, self.draw_checkboard_alpha_background,
+      self._PREVIEW_ALPHA_CHECK_SIZE,
+      self._PREVIEW_ALPHA_CHECK_COLOR_FIRST, self._PREVIEW_ALPHA_CHECK_COLOR_SECOND)
+  
+  def _add_recently_viewed_layer_id(self, layer_id):
+    if layer_id in self._recently_viewed_layer_ids:
+      self._recently_viewed_layer_ids.remove(layer_id)
+    self._recently_viewed_layer_ids.append(layer_id)
+  
+  def _prerender_next_step(self):
+    # The layer exporter must not be used while an update is rendered in chunks.
+    if self._update_locked or self._is_updating or gtk.events_pending():
+      self._prerender_source_id = None
+      self._stop_prerendering()
+      return False
+    
+    if self._prerender_steps is None:
+      layer_elem = self._get_next_layer_elem_to_prerender()
+      if layer_elem is None:
+        self._prerender_source_id = None
+        return False
+      
+      self._prerender_steps = self._get_in_memory_preview_in_steps(layer_elem)
+      self._prerender_preview_state = (None, None, None, None)
+    
+    if self._prerender_step():
+      self._close_prerender_steps()
+      
+      if not self._layer_ids_to_prerender:
+        self._prerender_source_id = None
+        return False
+    
+    # Stop before GTK processes user input, which may use the layer exporter.
+    if gtk.events_pending():
+      self._prerender_source_id = None
+      self._stop_prerendering()
+      return False
+    
+    return True
+  
+  def _get_next_layer_elem_to_prerender(self):
+    layer_tree = self._layer_exporter.layer_tree
+    
+    while self._layer_ids_to_prerender:
+      layer_id = self._layer_ids_to_prerender.popleft()
+      
+      if layer_tree is not None and layer_id in layer_tree:
+        layer_elem = layer_tree[layer_id]
+        if (layer_tree.filter.is_match(layer_elem) and pdb.gimp_item_is_valid(layer_elem.item)
+            and self._can_prerender_preview_without_discarding_previews(layer_elem.item)):
+          return layer_elem
+    
+    return None
+  
+  def _prerender_step(self):
+    """
+    Perform one step of rendering the preview. Return True if the preview was
+    rendered (or could not be rendered), False otherwise.
+    """
+    
+    # Rendering modifies attributes describing the displayed preview.
+    orig_preview_state = (
+      self._preview_pixbuf, self._preview_width, self._preview_height, self._preview_scaling_factor)
+    
+    self._preview_pixbuf, self._preview_width, self._preview_height, self._preview_scaling_factor = (
+      self._prerender_preview_state)
+    
+    try:
+      with self._redirect_messages():
+        layer_preview_pixbuf = next(self._prerender_steps)
+    except StopIteration:
+      return True
+    else:
+      return layer_preview_pixbuf is not None
+    finally:
+      self._prerender_preview_state = (
+        self._preview_pixbuf, self._preview_width, self._preview_height, self._preview_scaling_factor)
+      
+      self._preview_pixbuf, self._preview_width, self._preview_height, self._preview_scaling_factor = (
+        orig_preview_state)
+  
+  def _stop_prerendering(self):
+    self._close_prerender_steps()
+    self._layer_ids_to_prerender.clear()
+  
+  def _close_prerender_steps(self):
+    # Closing the generator in the middle of rendering discards the unfinished
+    # preview and restores the state of the layer exporter. The generator cannot
+    # be closed if this method is called from within a step, in which case it is
+    # closed once garbage-collected.
+    if self._prerender_steps is not None and not self._prerender_steps.gi_running:
+      self._prerender_steps.close()
+    
+    self._prerender_steps = None
+    self._prerender_preview_state = None
+  
+  def _can_prerender_preview_without_discarding_previews(self, layer):
+    preview_width, preview_height = self._get_preview_size(layer.width, layer.height)
+    # Estimate for the preview with and without the alpha background (4 bytes per pixel)
+    estimated_preview_size = preview_width * preview_height * 4 * 2
+    return self._preview_cache.size + estimated_preview_size <= self._preview_cache.max_size
+  
+  @staticmethod
+  def _get_cached_preview_size(cached_preview):
+    return sum(
+      pixbuf.get_rowstride() * pixbuf.get_height()
+      for pixbuf in set(pixbuf for pixbuf in cached_preview if pixbuf is not None))
   
   @contextlib.contextmanager
   def _redirect_messages(self, message_handler=gimpenums.ERROR_CONSOLE):
@@ -961,7 +1642,14 @@ class ExportImagePreview(ExportPreview):
     finally:
       pdb.gimp_message_set_handler(orig_message_handler)
   
-  def _get_image_preview(self):
+  def _get_image_preview_in_steps(self, layer_elem):
+    """
+    Export the specified layer for the preview in steps (see
+    `LayerExporter.export_layers_in_steps`). Yield None after each step. If the
+    export succeeded, yield the image containing the exported layer as the last
+    value.
+    """
+    
     if self._initial_layer_tree is not None:
       layer_tree = self._initial_layer_tree
       self._initial_layer_tree = None
@@ -970,22 +1658,27 @@ class ExportImagePreview(ExportPreview):
     
     layer_tree_filter = layer_tree.filter if layer_tree is not None else None
     
-    with self._layer_exporter.modify_export_settings(
-           {'export_only_selected_layers': True,
-            'selected_layers': {self._layer_exporter.image.ID: set([self.layer_elem.item.ID])}},
-           self._settings_events_to_temporarily_disable):
-      try:
-        image_preview = self._layer_exporter.export_layers(
-          operations=['layer_contents'], layer_tree=layer_tree, keep_exported_layers=True,
-          on_after_create_image_copy_func=self._layer_exporter_on_after_create_image_copy,
-          on_after_insert_layer_func=self._layer_exporter_on_after_insert_layer)
-      except Exception:
-        image_preview = None
-    
-    if layer_tree_filter is not None:
-      self._layer_exporter.layer_tree.filter = layer_tree_filter
+    try:
+      with self._layer_exporter.modify_export_settings(
+             {'export_only_selected_layers': True,
+              'selected_layers': {self._layer_exporter.image.ID: set([layer_elem.item.ID])}},
+             self._settings_events_to_temporarily_disable):
+        try:
+          for _unused in self._layer_exporter.export_layers_in_steps(
+                operations=['layer_contents'], layer_tree=layer_tree, keep_exported_layers=True,
+                on_after_create_image_copy_func=self._layer_exporter_on_after_create_image_copy,
+                on_after_insert_layer_func=self._layer_exporter_on_after_insert_layer):
+            yield None
+        except Exception:
+          image_preview = None
+        else:
+          image_preview = self._layer_exporter.kept_image_copy
+    finally:
+      if layer_tree_filter is not None:
+        self._layer_exporter.layer_tree.filter = layer_tree_filter
     
-    return image_preview
+    if image_preview is not None:
+      yield image_preview
   
   def _layer_exporter_on_after_create_image_copy(self, image_copy):
     pdb.gimp_image_resize(
@@ -1024,16 +1717,14 @@ class ExportImagePreview(ExportPreview):
   def _add_alpha_background_to_pixbuf(self, pixbuf, opacity, use_checkboard_background=False, check_size=None,
                                       check_color_first=None, check_color_second=None):
     if use_checkboard_background:
-      pixbuf_with_alpha_background = gtk.gdk.Pixbuf(
-        gtk.gdk.COLORSPACE_RGB, False, 8,
-        pixbuf.get_width(), pixbuf.get_height())
+      pixbuf_with_alpha_background = self._get_checkerboard(
+        pixbuf.get_width(), pixbuf.get_height(), check_size, check_color_first, check_color_second).copy()
       
-      pixbuf.composite_color(
+      pixbuf.composite(
         pixbuf_with_alpha_background, 0, 0,
         pixbuf.get_width(), pixbuf.get_height(),
         0, 0, 1.0, 1.0, gtk.gdk.INTERP_NEAREST,
-        int(round((opacity / 100.0) * 255)),
-        0, 0, check_size, check_color_first, check_color_second)
+        int(round((opacity / 100.0) * 255)))
     else:
       pixbuf_with_alpha_background = gtk.gdk.Pixbuf(
         gtk.gdk.COLORSPACE_RGB, True, 8,
@@ -1048,11 +1739,31 @@ class ExportImagePreview(ExportPreview):
     
     return pixbuf_with_alpha_background
   
+  def _get_checkerboard(self, width, height, check_size, check_color_first, check_color_second):
+    """
+    Return a pixbuf of the specified size filled with the checkerboard pattern.
+    The pixbuf is cached and must not be modified.
+    """
+    
+    checkerboard = self._checkerboards.get((width, height))
+    if checkerboard is None:
+      checkerboard = gtk.gdk.Pixbuf(gtk.gdk.COLORSPACE_RGB, False, 8, width, height)
+      # Compositing a fully transparent image leaves just the checkerboard.
+      gtk.gdk.Pixbuf(gtk.gdk.COLORSPACE_RGB, True, 8, width, height).composite_color(
+        checkerboard, 0, 0, width, height, 0, 0, 1.0, 1.0, gtk.gdk.INTERP_NEAREST, 0,
+        0, 0, check_size, check_color_first, check_color_second)
+      
+      self._checkerboards.add((width, height), checkerboard)
+    
+    return checkerboard
+  
   def _get_preview_data(self, layer, preview_width, preview_height):
     actual_preview_width, actual_preview_height, _unused, _unused, preview_data = (
       pdb.gimp_drawable_thumbnail(layer, preview_width, preview_height))
     
-    return actual_preview_width, actual_preview_height, array.array(b"B", preview_data).tostring()
+    # The array is passed to `gtk.gdk.pixbuf_new_from_data` directly via the
+    # buffer interface, avoiding an intermediate copy to a string.
+    return actual_preview_width, actual_preview_height, array.array(b"B", preview_data)
   
   def _get_preview_size(self, width, height):
     preview_widget_allocation = self._preview_image.get_allocation()
@@ -1089,26 +1800,56 @@ class ExportImagePreview(ExportPreview):
         and preview_allocation.height >= preview_pixbuf.get_height()):
       return
     
-    scaled_preview_width, scaled_preview_height = self._get_preview_size(
+    scaled_preview_width, scaled_preview_height = self._get_scaled_preview_size(
       preview_pixbuf.get_width(), preview_pixbuf.get_height())
     
     if (self._previous_preview_pixbuf_width == scaled_preview_width
         and self._previous_preview_pixbuf_height == scaled_preview_height):
       return
     
-    scaled_preview_pixbuf = preview_pixbuf.scale_simple(
-      scaled_preview_width, scaled_preview_height, gtk.gdk.INTERP_NEAREST)
+    if self._scaled_previews_source_pixbuf is not preview_pixbuf:
+      self._scaled_previews.clear()
+      self._scaled_previews_source_pixbuf = preview_pixbuf
     
-    scaled_preview_pixbuf = self._add_alpha_background_to_pixbuf(
-      scaled_preview_pixbuf, 100, self.draw_checkboard_alpha_background,
-      self._PREVIEW_ALPHA_CHECK_SIZE,
-      self._PREVIEW_ALPHA_CHECK_COLOR_FIRST, self._PREVIEW_ALPHA_CHECK_COLOR_SECOND)
+    scaled_preview_pixbuf = self._scaled_previews.get((scaled_preview_width, scaled_preview_height))
+    if scaled_preview_pixbuf is None:
+      scaled_preview_pixbuf = preview_pixbuf.scale_simple(
+        scaled_preview_width, scaled_preview_height, gtk.gdk.INTERP_NEAREST)
+      
+      scaled_preview_pixbuf = self._add_alpha_background_to_pixbuf(
+        scaled_preview_pixbuf, 100, self.draw_checkboard_alpha_background,
+        self._PREVIEW_ALPHA_CHECK_SIZE,
+        self._PREVIEW_ALPHA_CHECK_COLOR_FIRST, self._PREVIEW_ALPHA_CHECK_COLOR_SECOND)
+      
+      self._scaled_previews.add((scaled_preview_width, scaled_preview_height), scaled_preview_pixbuf)
     
     self._preview_image.set_from_pixbuf(scaled_preview_pixbuf)
     
     self._previous_preview_pixbuf_width = scaled_preview_width
     self._previous_preview_pixbuf_height = scaled_preview_height
   
+  def _get_scaled_preview_size(self, width, height):
+    """
+    Return the size of the preview fitting the preview widget, with the larger
+    dimension rounded down to a multiple of `_SCALED_PREVIEW_SIZE_BUCKET_PIXELS`
+    (preserving the aspect ratio).
+    """
+    
+    def _round_down_to_bucket(size):
+      if size >= self._SCALED_PREVIEW_SIZE_BUCKET_PIXELS:
+        return size - size % self._SCALED_PREVIEW_SIZE_BUCKET_PIXELS
+      else:
+        return size
+    
+    scaled_width, scaled_height = self._get_preview_size(width, height)
+    
+    if scaled_width >= scaled_height:
+      bucketed_width = _round_down_to_bucket(scaled_width)
+      return bucketed_width, max(int(round((bucketed_width / width) * height)), 1)
+    else:
+      bucketed_height = _round_down_to_bucket(scaled_height)
+      return max(int(round((bucketed_height / height) * width)), 1), bucketed_height
+  
   def _cleanup(self, image_preview):
     pdb.gimp_image_delete(image_preview)
   
@@ -37,10 +37,10 @@ try:
   import gimpplugin
   
   from . import pglogging
+  from . import pgprofiling
   from . import pgsetting
   from . import pgsettinggroup
   from . import pgsettingsources
-  from . import pggui
 except ImportError:
   _gimp_dependent_modules_imported = False
 else:
@@ -105,6 +105,9 @@ def _init_config():
   if _gimp_dependent_modules_imported:
     config.LOG_MODE = constants.LOG_EXCEPTIONS_ONLY
   
+  # Can be overridden by the `PYGIMPLIB_PROFILE_MODE` environment variable.
+  config.PROFILE_MODE = constants.PROFILE_NONE
+  
   gettext.install(config.DOMAIN_NAME, config.LOCALE_PATH, unicode=True)
   
   _init_config_builtin(config)
@@ -137,6 +140,8 @@ def _init_config_builtin(config):
   
   config.PLUGINS_LOG_STDOUT_FILENAME = config.PLUGIN_NAME + ".log"
   config.PLUGINS_LOG_STDERR_FILENAME = config.PLUGIN_NAME + "_error.log"
+  config.PLUGINS_LOG_PROFILE_FILENAME = config.PLUGIN_NAME + "_profile.log"
+  config.PLUGINS_PROFILE_STATS_FILENAME = config.PLUGIN_NAME + ".prof"
   
   config.GIMP_CONSOLE_MESSAGE_DELAY_MILLISECONDS = 50
 
@@ -184,6 +189,15 @@ if _gimp_dependent_modules_imported:
   _plugins_names = collections.OrderedDict()
   
   def plugin(*plugin_args, **plugin_kwargs):
+    """
+    Register the decorated function as a plug-in procedure. The arguments are
+    passed to `install_plugin`.
+    
+    `parameters` and `return_values` may also be functions returning the list of
+    parameters and return values, respectively. The functions are called only
+    when the procedure is installed, avoiding the creation of settings on each
+    import of the plug-in.
+    """
     
     def plugin_wrapper(procedure):
       _plugins[procedure] = (plugin_args, plugin_kwargs)
@@ -203,6 +217,9 @@ if _gimp_dependent_modules_imported:
     def _get_pdb_params(params):
       pdb_params = []
       
+      if callable(params):
+        params = params()
+      
       if params:
         has_settings = isinstance(params[0], (pgsetting.Setting, pgsettinggroup.SettingGroup))
         if has_settings:
@@ -244,10 +261,17 @@ if _gimp_dependent_modules_imported:
     config._can_modify_config = False
     
     procedure = _set_gui_excepthook(_plugins_names[procedure_name], procedure_params[0])
-    procedure(*procedure_params)
+    
+    pgprofiling.profile(
+      procedure, procedure_params, pgprofiling.get_profile_mode(config.PROFILE_MODE),
+      config.PLUGINS_LOG_DIRNAMES, config.PLUGINS_LOG_PROFILE_FILENAME, config.PLUGINS_PROFILE_STATS_FILENAME,
+      config.PLUGIN_TITLE)
   
   def _set_gui_excepthook(procedure, run_mode):
     if run_mode == gimpenums.RUN_INTERACTIVE:
+      # Import GTK only if needed to speed up non-interactive runs.
+      from . import pggui
+      
       return pggui.set_gui_excepthook(config.PLUGIN_TITLE,
         report_uri_list=config.BUG_REPORT_URI_LIST)(procedure)
     else:
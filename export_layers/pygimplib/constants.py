@@ -32,4 +32,6 @@ str = unicode
 
 _LOG_OUTPUT_MODES = (LOG_EXCEPTIONS_ONLY, LOG_OUTPUT_FILES, LOG_OUTPUT_GIMP_CONSOLE) = (0, 1, 2)
 
+_PROFILE_MODES = (PROFILE_NONE, PROFILE_CPU, PROFILE_CPU_AND_MEMORY) = (0, 1, 2)
+
 GTK_CHARACTER_ENCODING = "utf-8"
@@ -0,0 +1,166 @@
+#
+# This file is part of pygimplib.
+#
+# Copyright (C) 2014-2016 khalim19 <khalim19@gmail.com>
+#
+# pygimplib is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pygimplib is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pygimplib.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+This module defines a cache with a limited total size that discards the least
+recently used entries first.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+str = unicode
+
+import collections
+
+#===============================================================================
+
+
+class LruCache(object):
+  
+  """
+  This class stores (key, value) pairs up to the specified total size. If adding
+  a value exceeds the total size, the least recently used entries are discarded.
+  
+  Attributes:
+  
+  * `max_size` - Maximum total size of all values. The unit of the size is
+    determined by `get_size_func`. Reducing the maximum size discards the least
+    recently used entries immediately.
+  
+  * `size` (read-only) - Current total size of all values.
+  
+  * `hits` (read-only) - Number of `get` calls that found an entry.
+  
+  * `misses` (read-only) - Number of `get` calls that did not find an entry.
+  """
+  
+  def __init__(self, max_size, get_size_func=None):
+    """
+    Parameters:
+    
+    * `max_size` - Maximum total size of all values.
+    
+    * `get_size_func` - Function returning the size of a value. If None, each
+      value has the size of 1, i.e. `max_size` is the maximum number of entries.
+    """
+    
+    self._max_size = max_size
+    self._get_size_func = get_size_func if get_size_func is not None else lambda value: 1
+    
+    # key: cache key; value: (value, size of value)
+    self._entries = collections.OrderedDict()
+    self._size = 0
+    
+    self._hits = 0
+    self._misses = 0
+  
+  @property
+  def max_size(self):
+    return self._max_size
+  
+  @max_size.setter
+  def max_size(self, max_size):
+    self._max_size = max_size
+    self._discard_least_recently_used()
+  
+  @property
+  def size(self):
+    return self._size
+  
+  @property
+  def hits(self):
+    return self._hits
+  
+  @property
+  def misses(self):
+    return self._misses
+  
+  def __contains__(self, key):
+    """
+    Return True if the cache contains the specified key. Unlike `get`, this
+    does not mark the entry as recently used or update the hit/miss counters.
+    """
+    
+    return key in self._entries
+  
+  def __len__(self):
+    return len(self._entries)
+  
+  def get(self, key, default_value=None):
+    """
+    Return the value for the specified key and mark the entry as the most
+    recently used. If the key does not exist, return `default_value`.
+    """
+    
+    try:
+      entry = self._entries.pop(key)
+    except KeyError:
+      self._misses += 1
+      return default_value
+    
+    self._entries[key] = entry
+    self._hits += 1
+    
+    return entry[0]
+  
+  def add(self, key, value):
+    """
+    Add the specified value to the cache as the most recently used entry,
+    replacing the existing value for the same key.
+    
+    If the value alone exceeds the maximum size, the value is not stored (and
+    the existing value for the same key is removed).
+    """
+    
+    self.remove(key)
+    
+    size = self._get_size_func(value)
+    if size > self._max_size:
+      return
+    
+    self._entries[key] = (value, size)
+    self._size += size
+    
+    self._discard_least_recently_used()
+  
+  def remove(self, key):
+    """
+    Remove the entry with the specified key. If the key does not exist, do
+    nothing.
+    """
+    
+    if key in self._entries:
+      _unused, size = self._entries.pop(key)
+      self._size -= size
+  
+  def clear(self):
+    """
+    Remove all entries. The hit/miss counters are preserved.
+    """
+    
+    self._entries.clear()
+    self._size = 0
+  
+  def _discard_least_recently_used(self):
+    while self._entries and self._size > self._max_size:
+      _unused, (_unused, size) = self._entries.popitem(last=False)
+      self._size -= size
@@ -23,13 +23,24 @@ supported by GIMP.
 
 Each element of the list is a tuple:
 
-  (file format description, file extensions, (optional) file save procedure)
+  (file format description, file extensions, (optional) file save procedure name,
+   (optional) file save procedure function, (optional) list of save parameters)
 
 The file save procedure can be used for multiple purposes, such as:
 * checking that the corresponding file format plug-in is installed,
 * using that save procedure instead of the default save procedure
   (`pdb.gimp_file_save`, which invokes the correct file save procedure based on
   the file extension of the filename).
+
+File formats may declare typed save parameters (`_SaveParameter` instances) that
+are passed to the file save procedure function as keyword arguments. This allows
+saving in the non-interactive run mode with explicitly specified values (e.g.
+compression level), rather than relying on the last used values.
+
+The existence of file save procedures in the GIMP procedural database is
+checked only once for all file formats and the result is cached. Call
+`refresh_save_procedures` to check again, e.g. after installing a file format
+plug-in.
 """
 
 from __future__ import absolute_import
@@ -39,6 +50,8 @@ from __future__ import unicode_literals
 
 str = unicode
 
+import functools
+
 import gimp
 
 pdb = gimp.pdb
@@ -50,14 +63,77 @@ def get_default_save_procedure():
   return _save_image_default
 
 
-def get_save_procedure(file_extension):
+def get_save_procedure(file_extension, save_parameter_values=None):
   """
   Return the file save procedure for the given file extension. If the file
   extension is invalid or does not have a specific save procedure defined,
   return the default save procedure (as returned by
   `get_default_save_procedure`).
+  
+  If the file format declares save parameters, the returned save procedure
+  passes them to the file format's save procedure function.
+  `save_parameter_values` is a dict of (parameter name: value) pairs. Parameters
+  not present in `save_parameter_values` are assigned their default values.
+  """
+  
+  if file_extension not in _save_procedures:
+    _save_procedures[file_extension] = _resolve_save_procedure(file_extension)
+  
+  save_procedure = _save_procedures[file_extension]
+  
+  if save_procedure == get_default_save_procedure():
+    return save_procedure
+  
+  save_parameters = file_formats_dict[file_extension].save_procedure_func_args
+  if not save_parameters:
+    return save_procedure
+  
+  if save_parameter_values is None:
+    save_parameter_values = {}
+  
+  return functools.partial(
+    save_procedure,
+    **{parameter.name: save_parameter_values.get(parameter.name, parameter.default_value)
+       for parameter in save_parameters})
+
+
+def is_save_procedure_available(save_procedure_name):
   """
+  Return True if the specified file save procedure exists in the GIMP
+  procedural database, False otherwise. If `save_procedure_name` is None, return
+  True.
   
+  All save procedures of registered file formats are looked up in the GIMP
+  procedural database on the first call to this function. The result is cached
+  until `refresh_save_procedures` is called.
+  """
+  
+  if save_procedure_name is None:
+    return True
+  
+  if not _available_save_procedures:
+    _probe_save_procedures()
+  
+  if save_procedure_name not in _available_save_procedures:
+    _available_save_procedures[save_procedure_name] = bool(
+      pdb.gimp_procedural_db_proc_exists(save_procedure_name))
+  
+  return _available_save_procedures[save_procedure_name]
+
+
+def refresh_save_procedures():
+  """
+  Discard cached file save procedures and look them up again in the GIMP
+  procedural database.
+  """
+  
+  _save_procedures.clear()
+  _available_save_procedures.clear()
+  
+  _probe_save_procedures()
+
+
+def _resolve_save_procedure(file_extension):
   if file_extension in file_formats_dict:
     save_procedure_name = file_formats_dict[file_extension].save_procedure_name
     save_procedure_func = file_formats_dict[file_extension].save_procedure_func
@@ -65,19 +141,77 @@ def get_save_procedure(file_extension):
     if not save_procedure_name and save_procedure_func:
       return save_procedure_func
     elif save_procedure_name and save_procedure_func:
-      if pdb.gimp_procedural_db_proc_exists(save_procedure_name):
+      if is_save_procedure_available(save_procedure_name):
         return save_procedure_func
   
   return get_default_save_procedure()
 
 
+def _probe_save_procedures():
+  for file_format in file_formats:
+    if (file_format.save_procedure_name is not None
+        and file_format.save_procedure_name not in _available_save_procedures):
+      _available_save_procedures[file_format.save_procedure_name] = bool(
+        pdb.gimp_procedural_db_proc_exists(file_format.save_procedure_name))
+
+
 def _save_image_default(run_mode, image, layer, filename, raw_filename):
   pdb.gimp_file_save(image, layer, filename, raw_filename, run_mode=run_mode)
 
 
+def _save_png(run_mode, image, layer, filename, raw_filename, interlace, compression,
+              save_background_color, save_gamma, save_layer_offset, save_resolution, save_creation_time,
+              save_comment, save_color_values_from_transparent_pixels):
+  pdb.file_png_save2(
+    image, layer, filename, raw_filename, interlace, compression, save_background_color, save_gamma,
+    save_layer_offset, save_resolution, save_creation_time, save_comment,
+    save_color_values_from_transparent_pixels, run_mode=run_mode)
+
+
+def _save_jpeg(run_mode, image, layer, filename, raw_filename, quality, smoothing, optimize, progressive,
+               baseline):
+  pdb.file_jpeg_save(
+    image, layer, filename, raw_filename, quality / 100.0, smoothing / 100.0, optimize, progressive,
+    "", 0, baseline, 0, 0, run_mode=run_mode)
+
+
+def N_(str_):
+  return str_
+
+
 #===============================================================================
 
 
+class _SaveParameter(object):
+  
+  """
+  This class describes a typed parameter of a file save procedure.
+  
+  Attributes:
+  
+  * `name` - Parameter name, passed as a keyword argument to the file save
+    procedure function.
+  
+  * `type` - Name of the parameter type, matching the names in
+    `pgsetting.SettingTypes` ("integer", "float", "boolean", ...).
+  
+  * `default_value` - Default parameter value.
+  
+  * `display_name` - Parameter name in human-readable format (untranslated).
+  
+  * `min_value`, `max_value` - Minimum and maximum parameter value for numeric
+    types. None means no limit.
+  """
+  
+  def __init__(self, name, type_, default_value, display_name, min_value=None, max_value=None):
+    self.name = name
+    self.type = type_
+    self.default_value = default_value
+    self.display_name = display_name
+    self.min_value = min_value
+    self.max_value = max_value
+
+
 class _FileFormat(object):
   
   def __init__(self, description, file_extensions, save_procedure_name=None,
@@ -96,6 +230,15 @@ class _FileFormat(object):
       self.save_procedure_func_args = save_procedure_func_args
     else:
       self.save_procedure_func_args = []
+  
+  def is_installed(self):
+    """
+    Return True if the file format can be used for saving, i.e. the format
+    does not require a specific file save procedure or the procedure exists in
+    the GIMP procedural database.
+    """
+    
+    return is_save_procedure_available(self.save_procedure_name)
 
 
 def _create_file_formats(file_formats_params):
@@ -117,6 +260,10 @@ def _create_file_formats_dict(file_formats):
 
 #===============================================================================
 
+# key: file extension; value: resolved file save procedure
+_save_procedures = {}
+# key: file save procedure name; value: True if the procedure exists in the PDB
+_available_save_procedures = {}
 
 file_formats = _create_file_formats([
   ("Alias Pix image", ["pix", "matte", "mask", "alpha", "als"]),
@@ -138,7 +285,12 @@ file_formats = _create_file_formats([
   ("GIMP XCF image", ["xcf"]),
   ("gzip archive", ["xcf.gz", "xcfgz"]),
   ("HTML table", ["html", "htm"]),
-  ("JPEG image", ["jpg", "jpeg", "jpe"]),
+  ("JPEG image", ["jpg", "jpeg", "jpe"], None, _save_jpeg, [
+    _SaveParameter("quality", "integer", 90, N_("Quality"), 0, 100),
+    _SaveParameter("smoothing", "integer", 0, N_("Smoothing"), 0, 100),
+    _SaveParameter("optimize", "boolean", True, N_("Optimize")),
+    _SaveParameter("progressive", "boolean", False, N_("Progressive")),
+    _SaveParameter("baseline", "boolean", True, N_("Use baseline"))]),
   # Plug-in can be found at: http://registry.gimp.org/node/25508
   ("JPEG XR image", ["jxr"], "file-jxr-save"),
   ("KISS CEL", ["cel"]),
@@ -148,7 +300,17 @@ file_formats = _create_file_formats([
   ("PBM image", ["pbm"]),
   ("PGM image", ["pgm"]),
   ("Photoshop image", ["psd"]),
-  ("PNG image", ["png"]),
+  ("PNG image", ["png"], None, _save_png, [
+    _SaveParameter("interlace", "boolean", False, N_("Interlacing (Adam7)")),
+    _SaveParameter("compression", "integer", 9, N_("Compression level"), 0, 9),
+    _SaveParameter("save_background_color", "boolean", True, N_("Save background color")),
+    _SaveParameter("save_gamma", "boolean", False, N_("Save gamma")),
+    _SaveParameter("save_layer_offset", "boolean", False, N_("Save layer offset")),
+    _SaveParameter("save_resolution", "boolean", True, N_("Save resolution")),
+    _SaveParameter("save_creation_time", "boolean", True, N_("Save creation time")),
+    _SaveParameter("save_comment", "boolean", True, N_("Save comment")),
+    _SaveParameter("save_color_values_from_transparent_pixels", "boolean", True,
+                   N_("Save color values from transparent pixels"))]),
   # Plug-in can be found at: http://registry.gimp.org/node/24394
   ("APNG image", ["apng"], "file-apng-save-defaults",
    lambda run_mode, *args: pdb.file_apng_save_defaults(*args, run_mode=run_mode)),
@@ -441,6 +441,21 @@ def set_gui_excepthook_parent(parent):
 
 class GtkProgressUpdater(progress.ProgressUpdater):
   
+  """
+  This class updates a GTK progress bar.
+  
+  If `force_update` is True, pending GTK events are processed on each update
+  so that the progress bar is redrawn even if the work being done blocks the
+  GTK main loop. If the work is performed in steps from the main loop (e.g. via
+  `pgscheduler.StepRunner`), pass False to let GTK redraw the progress bar
+  between steps only.
+  """
+  
+  def __init__(self, progress_bar, num_total_tasks=0, min_update_interval_milliseconds=0, force_update=True):
+    super(GtkProgressUpdater, self).__init__(progress_bar, num_total_tasks, min_update_interval_milliseconds)
+    
+    self._should_force_update = force_update
+  
   def _fill_progress_bar(self):
     self.progress_bar.set_fraction(self._num_finished_tasks / self.num_total_tasks)
     self._force_update()
@@ -450,6 +465,9 @@ class GtkProgressUpdater(progress.ProgressUpdater):
     self._force_update()
   
   def _force_update(self):
+    if not self._should_force_update:
+      return
+    
     # This is necessary for the GTK progress bar to be updated properly.
     # See http://faq.pygtk.org/index.py?req=show&file=faq23.020.htp
     while gtk.events_pending():
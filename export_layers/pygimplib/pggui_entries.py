@@ -38,10 +38,6 @@ import gtk
 import gobject
 import pango
 
-import gimp
-
-pdb = gimp.pdb
-
 from . import constants
 from . import pgfileformats
 from . import pgpath
@@ -1470,12 +1466,7 @@ class FileExtensionEntry(ExtendedEntry):
     file_formats_to_add = []
     
     for file_format in file_formats:
-      can_add_file_format = (
-        file_format.save_procedure_name is None
-        or (file_format.save_procedure_name is not None
-            and pdb.gimp_procedural_db_proc_exists(file_format.save_procedure_name)))
-      
-      if can_add_file_format:
+      if file_format.is_installed():
         file_formats_to_add.append([file_format.description, file_format.file_extensions])
     
     return file_formats_to_add
@@ -33,6 +33,9 @@ This module defines the following classes:
 
 * `_ItemTreeElement` - wrapper for `gimp.Item` objects containing custom
   attributes derived from the original `gimp.Item` attributes
+
+* `_CompactItemTreeElement` - memory-efficient variant of `_ItemTreeElement`
+  used by item trees created with `compact=True`
 """
 
 from __future__ import absolute_import
@@ -43,6 +46,7 @@ from __future__ import unicode_literals
 str = unicode
 
 import abc
+import array
 import collections
 import os
 
@@ -95,15 +99,30 @@ class ItemTree(object):
   
   * `filter` - `ObjectFilter` instance where you can add or remove filter rules
     or subfilters to filter items.
+  
+  * `prefetched_attributes` (read-only) - Names of `gimp.Item` attributes read
+    for every item once during the construction of the item tree. The values are
+    available in `_ItemTreeElement.attributes` without further communication
+    with GIMP. The values are not updated automatically if the items change -
+    call `refresh_attributes` to update them.
+  
+  * `compact` (read-only) - If True, store item tree elements as
+    `_CompactItemTreeElement` objects, whose attributes are kept in arrays shared
+    by all elements. This reduces memory usage and construction time for images
+    with a large number of items. Tags are loaded from items on first access.
   """
   
   __metaclass__ = abc.ABCMeta
   
-  def __init__(self, image, name=None, is_filtered=False, filter_match_type=objectfilter.ObjectFilter.MATCH_ALL):
+  _PREFETCHED_ATTRIBUTES = ("visible",)
+  
+  def __init__(self, image, name=None, is_filtered=False, filter_match_type=objectfilter.ObjectFilter.MATCH_ALL,
+               compact=False):
     self._image = image
     self._name = name
     self.is_filtered = is_filtered
     self._filter_match_type = filter_match_type
+    self._compact = compact
     
     # Filters applied to all items in `self._itemtree`
     self.filter = objectfilter.ObjectFilter(self._filter_match_type)
@@ -135,6 +154,14 @@ class ItemTree(object):
   def name(self):
     return self._name
   
+  @property
+  def prefetched_attributes(self):
+    return self._PREFETCHED_ATTRIBUTES
+  
+  @property
+  def compact(self):
+    return self._compact
+  
   def __getitem__(self, id_or_name):
     """
     Access an `_ItemTreeElement` object by its `_ItemTreeElement.item.ID`
@@ -273,27 +300,118 @@ class ItemTree(object):
     
     self.filter = objectfilter.ObjectFilter(self._filter_match_type)
   
-  def reset_item_elements(self):
+  def refresh_attributes(self, item_elems=None):
+    """
+    Read the prefetched attributes (`_ItemTreeElement.attributes`) again from
+    the items of the specified `_ItemTreeElement` objects. If `item_elems` is
+    None, refresh attributes of all elements (regardless of item filtering).
+    
+    Path visibility (`_ItemTreeElement.path_visible`) is recomputed for all
+    elements, since it depends on the visibility of parents.
+    """
+    
+    if item_elems is None:
+      item_elems = self._itemtree.values()
+    
+    for item_elem in item_elems:
+      item_elem._refresh_attributes(self._PREFETCHED_ATTRIBUTES)
+    
+    self._update_path_visibility()
+  
+  def refresh(self):
+    """
+    Update the item tree to match the current state of the image, without
+    rebuilding the entire item tree.
+    
+    Items are matched by their IDs. Elements of items that were not renamed or
+    moved to a different parent are kept along with their state (tags, modified
+    names) and only their prefetched attributes are read again. Elements are
+    created for new items and for items that were renamed or moved. Elements of
+    items no longer in the image are removed. Items in the item tree are
+    ordered according to the image.
+    
+    If the item tree stores compact elements (`compact` is True), the item tree
+    is rebuilt entirely, but changes are still reported.
+    
+    If any item was added, removed or changed, the cache for already uniquified
+    and validated elements is cleared and names of all elements are reset (see
+    `reset_item_elements`).
+    
+    Returns:
+    
+    * `added_ids` - List of IDs of items added to the image.
+    
+    * `removed_ids` - List of IDs of items removed from the image.
+    
+    * `changed_ids` - List of IDs of items whose elements were created again
+      (renamed or moved items) or whose prefetched attributes or children
+      changed.
+    """
+    
+    if self._compact:
+      added_ids, removed_ids, changed_ids = self._refresh_compact_item_tree()
+    else:
+      added_ids, removed_ids, changed_ids = self._refresh_item_tree()
+    
+    self._update_path_visibility()
+    
+    if added_ids or removed_ids or changed_ids:
+      self.reset_item_elements()
+    
+    return added_ids, removed_ids, changed_ids
+  
+  def reset_item_elements(self, item_elems=None):
     """
     Reset the `name` attribute of all `_ItemTreeElement` instances (regardless
     of item filtering) and clear cache for already uniquified and validated
     `_ItemTreeElement` instances.
+    
+    If `item_elems` is not None, reset only the specified `_ItemTreeElement`
+    instances and remove them from the cache. Names of the other elements remain
+    uniquified and validated, which allows processing names of a subset of the
+    item tree again. This is only meaningful if item paths are taken into
+    account during uniquification (see `uniquify_name`).
     """
     
-    for item_elem in self._itemtree.values():
-      item_elem.name = item_elem.orig_name
+    if item_elems is None:
+      for item_elem in self._itemtree.values():
+        item_elem.name = item_elem.orig_name
+      
+      self._uniquified_itemtree.clear()
+      self._uniquified_itemtree_names.clear()
+      self._validated_itemtree.clear()
+    else:
+      for item_elem in item_elems:
+        parent = item_elem.parent
+        if item_elem in self._uniquified_itemtree.get(parent, set()):
+          self._uniquified_itemtree[parent].remove(item_elem)
+          self._uniquified_itemtree_names[parent].discard(item_elem.name)
+        
+        self._validated_itemtree.discard(item_elem)
+        
+        item_elem.name = item_elem.orig_name
+  
+  def is_name_uniquified(self, item_elem):
+    """
+    Return True if the name of the specified `_ItemTreeElement` instance was
+    uniquified and not reset since, False otherwise. Only uniquification taking
+    item paths into account is considered (see `uniquify_name`).
+    """
     
-    self._uniquified_itemtree.clear()
-    self._uniquified_itemtree_names.clear()
-    self._validated_itemtree.clear()
+    return item_elem in self._uniquified_itemtree.get(item_elem.parent, set())
   
   def _fill_item_tree(self):
     """
     Fill the `_itemtree` and `_itemtree_names` dictionaries.
     """
     
+    if self._compact:
+      self._fill_compact_item_tree()
+      return
+    
     child_items = self._get_children_from_image(self._image)
-    child_item_elems = [_ItemTreeElement(item, [], None, self._name) for item in child_items]
+    child_item_elems = [
+      _ItemTreeElement(item, [], None, self._name, self._PREFETCHED_ATTRIBUTES) for item in child_items]
     
     item_elem_tree = child_item_elems
     
@@ -311,7 +429,9 @@ class ItemTree(object):
       
       if child_items is not None:
         item_elem_parents.append(item_elem)
-        child_item_elems = [_ItemTreeElement(item, item_elem_parents, None, self._name) for item in child_items]
+        child_item_elems = [
+          _ItemTreeElement(item, item_elem_parents, None, self._name, self._PREFETCHED_ATTRIBUTES)
+          for item in child_items]
         
         # We break the convention here and access the `_ItemTreeElement._children`
         # private attribute.
@@ -320,6 +440,117 @@ class ItemTree(object):
         for child_item_elem in reversed(child_item_elems):
           item_elem_tree.insert(0, child_item_elem)
   
+  def _fill_compact_item_tree(self):
+    storage = _CompactItemTreeStorage(self._name, self._PREFETCHED_ATTRIBUTES)
+    
+    item_stack = [(item, -1) for item in reversed(self._get_children_from_image(self._image))]
+    
+    while item_stack:
+      item, parent_index = item_stack.pop()
+      
+      is_group = self._is_group(item)
+      item_elem = storage.append(item, parent_index, is_group)
+      
+      self._itemtree[item.ID] = item_elem
+      self._itemtree_names[item_elem.orig_name] = item_elem
+      
+      if is_group:
+        for child_item in reversed(self._get_children_from_item(item)):
+          item_stack.append((child_item, item_elem._index))
+  
+  def _update_path_visibility(self):
+    # Elements are stored in pre-order (parents before their children), hence
+    # parents are always updated first.
+    for item_elem in self._itemtree.values():
+      item_elem._update_path_visible()
+  
+  def _refresh_item_tree(self):
+    orig_itemtree = self._itemtree
+    orig_children_ids = {
+      item_elem.item.ID: [child_elem.item.ID for child_elem in item_elem.children]
+      for item_elem in orig_itemtree.values() if item_elem.children is not None}
+    
+    self._itemtree = collections.OrderedDict()
+    self._itemtree_names = {}
+    
+    added_ids = []
+    changed_ids = []
+    
+    item_stack = [(item, None) for item in reversed(self._get_children_from_image(self._image))]
+    
+    while item_stack:
+      item, parent_elem = item_stack.pop()
+      
+      item_elem = orig_itemtree.pop(item.ID, None)
+      
+      if (item_elem is not None and item_elem.parent is parent_elem
+          and item_elem.orig_name == item.name.decode()):
+        orig_attributes = item_elem.attributes
+        item_elem._refresh_attributes(self._PREFETCHED_ATTRIBUTES)
+        if item_elem.attributes != orig_attributes:
+          changed_ids.append(item.ID)
+      else:
+        if item_elem is not None:
+          changed_ids.append(item.ID)
+        else:
+          added_ids.append(item.ID)
+        
+        item_elem_parents = list(parent_elem.parents) + [parent_elem] if parent_elem is not None else []
+        item_elem = _ItemTreeElement(item, item_elem_parents, None, self._name, self._PREFETCHED_ATTRIBUTES)
+      
+      self._itemtree[item.ID] = item_elem
+      self._itemtree_names[item_elem.orig_name] = item_elem
+      
+      # We break the convention here and access the private attributes of
+      # `_ItemTreeElement` to rebuild the children of kept elements.
+      item_elem._item_type = None
+      
+      if parent_elem is not None:
+        parent_elem._children.append(item_elem)
+      
+      if self._is_group(item):
+        item_elem._children = []
+        for child_item in reversed(self._get_children_from_item(item)):
+          item_stack.append((child_item, item_elem))
+      else:
+        item_elem._children = None
+    
+    changed_ids_set = set(changed_ids)
+    for item_id, item_elem in self._itemtree.items():
+      if (item_id in orig_children_ids and item_id not in changed_ids_set
+          and orig_children_ids[item_id] != [child_elem.item.ID for child_elem in item_elem.children]):
+        changed_ids.append(item_id)
+    
+    removed_ids = list(orig_itemtree.keys())
+    
+    return added_ids, removed_ids, changed_ids
+  
+  def _refresh_compact_item_tree(self):
+    def _get_item_states():
+      return {
+        item_elem.item.ID: (
+          item_elem.parent.item.ID if item_elem.parent is not None else None,
+          item_elem.orig_name,
+          [child_elem.item.ID for child_elem in item_elem.children] if item_elem.children is not None else None,
+          item_elem.attributes)
+        for item_elem in self._itemtree.values()}
+    
+    orig_item_states = _get_item_states()
+    
+    self._itemtree = collections.OrderedDict()
+    self._itemtree_names = {}
+    self._fill_compact_item_tree()
+    
+    item_states = _get_item_states()
+    
+    added_ids = [item_id for item_id in item_states if item_id not in orig_item_states]
+    removed_ids = [item_id for item_id in orig_item_states if item_id not in item_states]
+    changed_ids = [
+      item_id for item_id, item_state in item_states.items()
+      if item_id in orig_item_states and item_state != orig_item_states[item_id]]
+    
+    return added_ids, removed_ids, changed_ids
+  
   @abc.abstractmethod
   def _get_children_from_image(self, image):
     """
@@ -345,6 +576,8 @@ class ItemTree(object):
 
 class LayerTree(ItemTree):
   
+  _PREFETCHED_ATTRIBUTES = ("visible", "opacity")
+  
   def _get_children_from_image(self, image):
     return image.layers
   
@@ -431,7 +664,142 @@ def set_file_extension(filename, file_extension, keep_extra_periods=False):
 #===============================================================================
 
 
-class _ItemTreeElement(object):
+class _BaseItemTreeElement(object):
+  
+  """
+  This class defines methods common to `_ItemTreeElement` and
+  `_CompactItemTreeElement`. Subclasses must define the attributes documented in
+  `_ItemTreeElement`.
+  """
+  
+  __slots__ = ()
+  
+  _ITEM_TYPES = ITEM, NONEMPTY_GROUP, EMPTY_GROUP = (0, 1, 2)
+  
+  _DEFAULT_PREFETCHED_ATTRIBUTES = ("visible",)
+  
+  def __str__(self):
+    return "<{0} '{1}'>".format(type(self).__name__, self.orig_name)
+  
+  def get_file_extension(self):
+    """
+    Get file extension from the `name` attribute, in lowercase.
+    
+    If `name` has no file extension, return an empty string.
+    """
+    
+    return get_file_extension(self.name)
+  
+  def set_file_extension(self, file_extension, keep_extra_periods=False):
+    """
+    Set file extension in the `name` attribute.
+    
+    For more information, see the `pgitemtree.set_file_extension()` method.
+    """
+    
+    self.name = set_file_extension(self.name, file_extension, keep_extra_periods)
+  
+  def get_base_name(self):
+    """
+    Return the item name without its file extension.
+    """
+    
+    file_extension = get_file_extension(self.name)
+    if file_extension:
+      return self.name[:-(len(file_extension) + 1)]
+    else:
+      return self.name
+  
+  def get_filepath(self, directory, include_item_path=True):
+    """
+    Return file path given the specified directory, item name and names of its
+    parents.
+    
+    If `include_item_path` is True, create file path in the following format:
+    <directory>/<item path components>/<item name>
+    
+    If `include_item_path` is False, create file path in the following format:
+    <directory>/<item name>
+    
+    If directory is not an absolute path or is None, prepend the current working
+    directory.
+    
+    Item path components consist of parents' item names, starting with the
+    topmost parent.
+    """
+    
+    if directory is None:
+      directory = ""
+    
+    path = os.path.abspath(directory)
+    
+    if include_item_path:
+      path_components = self.get_path_components()
+      if path_components:
+        path = os.path.join(path, os.path.join(*path_components))
+    
+    path = os.path.join(path, self.name)
+    
+    return path
+  
+  def get_path_components(self):
+    """
+    Return a list of names of all parents of this item as path components.
+    """
+    
+    return list(self._get_path_components())
+  
+  def add_tag(self, tag):
+    """
+    Add the specified tag to the item. If the tag already exists, do nothing.
+    The tag is saved to the item persistently.
+    """
+    
+    if tag in self.tags:
+      return
+    
+    self.tags.add(tag)
+    
+    self._save_tags()
+  
+  def remove_tag(self, tag):
+    """
+    Remove the specified tag from the item. If the tag does not exist, raise
+    `ValueError`.
+    """
+    
+    if tag not in self.tags:
+      raise ValueError("tag '{0}' not found in {1}".format(tag, self))
+    
+    self.tags.remove(tag)
+    
+    self._save_tags()
+  
+  def _save_tags(self):
+    """
+    Save tags persistently to the item.
+    """
+    
+    self.item.parasite_detach(self.tags_source_name)
+    
+    self.item.parasite_attach(
+      gimp.Parasite(
+        self.tags_source_name,
+        gimpenums.PARASITE_PERSISTENT | gimpenums.PARASITE_UNDOABLE,
+        pickle.dumps(self.tags)))
+  
+  def _load_tags(self):
+    parasite = self.item.parasite_find(self.tags_source_name)
+    if parasite:
+      return pickle.loads(parasite.data)
+    else:
+      return set()
+  
+  def _read_attributes(self, attribute_names):
+    return {attribute_name: getattr(self.item, attribute_name, None) for attribute_name in attribute_names}
+
+
+class _ItemTreeElement(_BaseItemTreeElement):
   
   """
   This class wraps a `gimp.Item` object and defines custom item attributes.
@@ -468,7 +836,9 @@ class _ItemTreeElement(object):
   
   * `path_visible` (read-only) - Visibility of all item's parents and this
     item. If all items are visible, `path_visible` is True. If at least one
-    of these items is invisible, `path_visible` is False.
+    of these items is invisible, `path_visible` is False. The visibility is
+    computed from the parent's `path_visible` when the element is created and
+    is updated by `ItemTree.refresh_attributes` and `ItemTree.refresh`.
   
   * `tags` - Set of arbitrary strings attached to the item. Tags can be used for
     a variety of purposes, such as special handling of items with specific tags.
@@ -478,11 +848,14 @@ class _ItemTreeElement(object):
   
   * `tags_source_name` - Name of the persistent source for the `tags` attribute.
     Defaults to "tags" if the source name is None.
-  """
   
-  _ITEM_TYPES = ITEM, NONEMPTY_GROUP, EMPTY_GROUP = (0, 1, 2)
+  * `attributes` (read-only) - Dictionary of (attribute name: value) pairs of
+    `gimp.Item` attributes read when this object was created (or refreshed via
+    `ItemTree.refresh_attributes`). Attributes not available for the item are
+    None.
+  """
   
-  def __init__(self, item, parents=None, children=None, tags_source_name=None):
+  def __init__(self, item, parents=None, children=None, tags_source_name=None, prefetched_attributes=None):
     if item is None:
       raise TypeError("item cannot be None")
     
@@ -490,21 +863,40 @@ class _ItemTreeElement(object):
     self._parents = parents if parents is not None else []
     self._children = children
     
-    self.name = item.name.decode()
+    # Names of parents, computed on first access and invalidated when the name
+    # of any parent changes.
+    self._path_components = None
+    self._name = item.name.decode()
     
-    self._orig_name = self.name
+    self._orig_name = self._name
     self._depth = len(self._parents)
     self._parent = self._parents[-1] if self._parents else None
     self._item_type = None
-    self._path_visible = None
     
     self._tags_source_name = tags_source_name if tags_source_name else "tags"
     self._tags = self._load_tags()
+    
+    self._attributes = self._read_attributes(
+      prefetched_attributes if prefetched_attributes is not None else self._DEFAULT_PREFETCHED_ATTRIBUTES)
+    
+    self._path_visible = None
+    self._update_path_visible()
   
   @property
   def item(self):
     return self._item
   
+  @property
+  def name(self):
+    return self._name
+  
+  @name.setter
+  def name(self, name):
+    if name != self._name and self._children:
+      self._invalidate_path_components()
+    
+    self._name = name
+  
   @property
   def parents(self):
     return iter(self._parents)
@@ -543,9 +935,6 @@ class _ItemTreeElement(object):
   
   @property
   def path_visible(self):
-    if self._path_visible is None:
-      self._path_visible = self._get_path_visibility()
-    
     return self._path_visible
   
   @property
@@ -556,135 +945,217 @@ class _ItemTreeElement(object):
   def tags_source_name(self):
     return self._tags_source_name
   
-  def __str__(self):
-    return "<{0} '{1}'>".format(type(self).__name__, self.orig_name)
+  @property
+  def attributes(self):
+    return self._attributes
   
-  def get_file_extension(self):
-    """
-    Get file extension from the `name` attribute, in lowercase.
-    
-    If `name` has no file extension, return an empty string.
-    """
-    
-    return get_file_extension(self.name)
+  def _refresh_attributes(self, attribute_names):
+    self._attributes = self._read_attributes(attribute_names)
   
-  def set_file_extension(self, file_extension, keep_extra_periods=False):
+  def _update_path_visible(self):
     """
-    Set file extension in the `name` attribute.
-    
-    For more information, see the `pgitemtree.set_file_extension()` method.
+    Compute path visibility from the visibility of this item and the path
+    visibility of the parent, which must be up to date.
     """
     
-    self.name = set_file_extension(self.name, file_extension, keep_extra_periods)
+    self._path_visible = bool(self._attributes["visible"]) and (self._parent is None or self._parent.path_visible)
   
-  def get_base_name(self):
-    """
-    Return the item name without its file extension.
-    """
+  def _get_path_components(self):
+    if self._path_components is None:
+      if self._parent is not None:
+        self._path_components = self._parent._get_path_components() + (self._parent.name,)
+      else:
+        self._path_components = ()
     
-    file_extension = get_file_extension(self.name)
-    if file_extension:
-      return self.name[:-(len(file_extension) + 1)]
-    else:
-      return self.name
+    return self._path_components
+  
+  def _invalidate_path_components(self):
+    item_elems = list(self._children)
+    while item_elems:
+      item_elem = item_elems.pop()
+      item_elem._path_components = None
+      if item_elem._children:
+        item_elems.extend(item_elem._children)
+
+
+class _CompactItemTreeStorage(object):
   
-  def get_filepath(self, directory, include_item_path=True):
-    """
-    Return file path given the specified directory, item name and names of its
-    parents.
-    
-    If `include_item_path` is True, create file path in the following format:
-    <directory>/<item path components>/<item name>
-    
-    If `include_item_path` is False, create file path in the following format:
-    <directory>/<item name>
+  """
+  This class stores attributes of all `_CompactItemTreeElement` objects of an
+  item tree in parallel lists and arrays indexed by the element index.
+  
+  A parent index of -1 indicates that the element has no parent. Path
+  components of None indicate that they have not been computed yet.
+  
+  `prefetched_attributes` must contain "visible" as path visibility is
+  computed from it when elements are appended.
+  """
+  
+  def __init__(self, tags_source_name=None, prefetched_attributes=None):
+    self.tags_source_name = tags_source_name if tags_source_name else "tags"
+    self.prefetched_attributes = (
+      prefetched_attributes if prefetched_attributes is not None
+      else _BaseItemTreeElement._DEFAULT_PREFETCHED_ATTRIBUTES)
+    self.visible_attribute_index = self.prefetched_attributes.index("visible")
     
-    If directory is not an absolute path or is None, prepend the current working
-    directory.
+    self.elements = []
+    self.items = []
+    self.names = []
+    self.orig_names = []
+    self.parent_indices = array.array(b"i")
+    self.depths = array.array(b"i")
+    self.path_visible = array.array(b"b")
+    # Tuples of names of parents
+    self.path_components = []
+    # key: index of an item group; value: list of indices of children
+    self.children_indices = {}
+    # Tags are loaded on first access, None means not loaded yet.
+    self.tags = []
+    # Tuples of values of `prefetched_attributes`
+    self.attribute_values = []
+  
+  def append(self, item, parent_index=-1, is_group=False):
+    index = len(self.elements)
+    name = item.name.decode()
     
-    Item path components consist of parents' item names, starting with the
-    topmost parent.
-    """
+    self.items.append(item)
+    self.names.append(name)
+    self.orig_names.append(name)
+    self.parent_indices.append(parent_index)
+    self.depths.append(self.depths[parent_index] + 1 if parent_index != -1 else 0)
+    self.tags.append(None)
+    self.attribute_values.append(
+      tuple(getattr(item, attribute_name, None) for attribute_name in self.prefetched_attributes))
+    self.path_visible.append(
+      int(bool(self.attribute_values[index][self.visible_attribute_index])
+          and (parent_index == -1 or self.path_visible[parent_index])))
+    self.path_components.append(None)
     
-    if directory is None:
-      directory = ""
+    if is_group:
+      self.children_indices[index] = []
+    if parent_index != -1:
+      self.children_indices[parent_index].append(index)
     
-    path = os.path.abspath(directory)
+    item_elem = _CompactItemTreeElement(self, index)
+    self.elements.append(item_elem)
     
-    if include_item_path:
-      path_components = self.get_path_components()
-      if path_components:
-        path = os.path.join(path, os.path.join(*path_components))
-    
-    path = os.path.join(path, self.name)
-    
-    return path
+    return item_elem
+
+
+class _CompactItemTreeElement(_BaseItemTreeElement):
   
-  def get_path_components(self):
-    """
-    Return a list of names of all parents of this item as path components.
-    """
-    
-    return [parent.name for parent in self.parents]
+  """
+  This class provides the same interface as `_ItemTreeElement`, but stores its
+  attributes in a `_CompactItemTreeStorage` object shared by all elements of
+  an item tree. For the description of attributes, see `_ItemTreeElement`.
+  """
   
-  def add_tag(self, tag):
-    """
-    Add the specified tag to the item. If the tag already exists, do nothing.
-    The tag is saved to the item persistently.
-    """
-    
-    if tag in self._tags:
-      return
-    
-    self._tags.add(tag)
-    
-    self._save_tags()
+  __slots__ = ("_storage", "_index")
   
-  def remove_tag(self, tag):
-    """
-    Remove the specified tag from the item. If the tag does not exist, raise
-    `ValueError`.
-    """
-    
-    if tag not in self._tags:
-      raise ValueError("tag '{0}' not found in {1}".format(tag, self))
-    
-    self._tags.remove(tag)
+  def __init__(self, storage, index):
+    self._storage = storage
+    self._index = index
+  
+  @property
+  def item(self):
+    return self._storage.items[self._index]
+  
+  @property
+  def name(self):
+    return self._storage.names[self._index]
+  
+  @name.setter
+  def name(self, name):
+    if name != self._storage.names[self._index] and self._storage.children_indices.get(self._index):
+      self._invalidate_path_components()
     
-    self._save_tags()
+    self._storage.names[self._index] = name
   
-  def _get_path_visibility(self):
-    """
-    If this item and all of its parents are visible, return True, otherwise
-    return False.
-    """
+  @property
+  def parents(self):
+    parent_indices = []
+    parent_index = self._storage.parent_indices[self._index]
+    while parent_index != -1:
+      parent_indices.append(parent_index)
+      parent_index = self._storage.parent_indices[parent_index]
     
-    path_visible = True
-    if not self._item.visible:
-      path_visible = False
+    return (self._storage.elements[index] for index in reversed(parent_indices))
+  
+  @property
+  def children(self):
+    children_indices = self._storage.children_indices.get(self._index)
+    if children_indices is not None:
+      return (self._storage.elements[index] for index in children_indices)
     else:
-      for parent in self._parents:
-        if not parent.item.visible:
-          path_visible = False
-          break
-    return path_visible
+      return None
   
-  def _save_tags(self):
-    """
-    Save tags persistently to the item.
-    """
-    
-    self._item.parasite_detach(self._tags_source_name)
-    
-    self._item.parasite_attach(
-      gimp.Parasite(
-        self._tags_source_name,
-        gimpenums.PARASITE_PERSISTENT | gimpenums.PARASITE_UNDOABLE,
-        pickle.dumps(self._tags)))
+  @property
+  def orig_name(self):
+    return self._storage.orig_names[self._index]
   
-  def _load_tags(self):
-    parasite = self._item.parasite_find(self._tags_source_name)
-    if parasite:
-      return pickle.loads(parasite.data)
+  @property
+  def depth(self):
+    return self._storage.depths[self._index]
+  
+  @property
+  def parent(self):
+    parent_index = self._storage.parent_indices[self._index]
+    return self._storage.elements[parent_index] if parent_index != -1 else None
+  
+  @property
+  def item_type(self):
+    children_indices = self._storage.children_indices.get(self._index)
+    if children_indices is None:
+      return self.ITEM
+    elif children_indices:
+      return self.NONEMPTY_GROUP
     else:
-      return set()
+      return self.EMPTY_GROUP
+  
+  @property
+  def path_visible(self):
+    return bool(self._storage.path_visible[self._index])
+  
+  @property
+  def tags(self):
+    if self._storage.tags[self._index] is None:
+      self._storage.tags[self._index] = self._load_tags()
+    
+    return self._storage.tags[self._index]
+  
+  @property
+  def tags_source_name(self):
+    return self._storage.tags_source_name
+  
+  @property
+  def attributes(self):
+    return dict(zip(self._storage.prefetched_attributes, self._storage.attribute_values[self._index]))
+  
+  def _refresh_attributes(self, attribute_names):
+    attributes = self._read_attributes(attribute_names)
+    self._storage.attribute_values[self._index] = tuple(
+      attributes[attribute_name] for attribute_name in self._storage.prefetched_attributes)
+  
+  def _update_path_visible(self):
+    parent_index = self._storage.parent_indices[self._index]
+    self._storage.path_visible[self._index] = int(
+      bool(self._storage.attribute_values[self._index][self._storage.visible_attribute_index])
+      and (parent_index == -1 or self._storage.path_visible[parent_index]))
+  
+  def _get_path_components(self):
+    if self._storage.path_components[self._index] is None:
+      parent_index = self._storage.parent_indices[self._index]
+      if parent_index != -1:
+        self._storage.path_components[self._index] = (
+          self._storage.elements[parent_index]._get_path_components() + (self._storage.names[parent_index],))
+      else:
+        self._storage.path_components[self._index] = ()
+    
+    return self._storage.path_components[self._index]
+  
+  def _invalidate_path_components(self):
+    indices = list(self._storage.children_indices[self._index])
+    while indices:
+      index = indices.pop()
+      self._storage.path_components[index] = None
+      indices.extend(self._storage.children_indices.get(index, []))
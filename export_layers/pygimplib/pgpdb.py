@@ -33,6 +33,11 @@ str = unicode
 import os
 import contextlib
 
+try:
+  import numpy
+except ImportError:
+  numpy = None
+
 import gimp
 import gimpenums
 
@@ -259,7 +264,8 @@ def copy_and_paste_layer(layer, image, parent=None, position=0):
 
 
 def compare_layers(layers, compare_alpha_channels=True, compare_has_alpha=False,
-                   apply_layer_attributes=True, apply_layer_masks=True):
+                   apply_layer_attributes=True, apply_layer_masks=True, tolerance=0,
+                   diff_image_filepath=None):
   """
   Return True if the contents of all specified layers are identical, False
   otherwise. Layer groups are also supported.
@@ -278,6 +284,16 @@ def compare_layers(layers, compare_alpha_channels=True, compare_has_alpha=False,
   
   If `apply_layer_masks` is True, apply layer masks if they are enabled. If the
   masks are disabled or `apply_layer_masks` is False, layer masks are ignored.
+  
+  `tolerance` is the maximum difference of each channel value (0-255) for pixels
+  to be considered identical.
+  
+  If NumPy is available and no layer is a layer group or has a layer mask or
+  attributes to apply, the pixels of the layers are compared directly (see
+  `compare_layer_pixels`). In that case, if `diff_image_filepath` is not None
+  and the layers differ, save an image highlighting the differences to the
+  specified file. Otherwise, the layers are compared in a new image by
+  computing histograms of the differences and `diff_image_filepath` is ignored.
   """
   
   def _copy_layers(image, layers, parent=None, position=0):
@@ -319,7 +335,7 @@ def compare_layers(layers, compare_alpha_channels=True, compare_has_alpha=False,
     for layer in layer_group.children[1:]:
       layer.visible = True
       
-      histogram_data = pdb.gimp_histogram(layer_group, gimpenums.HISTOGRAM_VALUE, 1, 255)
+      histogram_data = pdb.gimp_histogram(layer_group, gimpenums.HISTOGRAM_VALUE, tolerance + 1, 255)
       percentile = histogram_data[5]
       identical = percentile == 0.0
       
@@ -354,6 +370,10 @@ def compare_layers(layers, compare_alpha_channels=True, compare_has_alpha=False,
   if compare_has_alpha and not all_layers_are_same_image_type:
     return False
   
+  if _can_compare_layer_pixels(layers, apply_layer_attributes, apply_layer_masks):
+    return compare_layer_pixels(
+      [get_layer_pixels(layer) for layer in layers], compare_alpha_channels, tolerance, diff_image_filepath)
+  
   image = gimp.Image(1, 1, gimpenums.RGB)
   layer_group = _copy_layers(image, layers)
   pdb.gimp_image_resize_to_layers(image)
@@ -386,6 +406,115 @@ def compare_layers(layers, compare_alpha_channels=True, compare_has_alpha=False,
   return identical
 
 
+def _can_compare_layer_pixels(layers, apply_layer_attributes, apply_layer_masks):
+  if numpy is None:
+    return False
+  
+  for layer in layers:
+    if pdb.gimp_item_is_group(layer) or layer.is_indexed:
+      return False
+    
+    if apply_layer_masks and layer.mask is not None:
+      return False
+    
+    if apply_layer_attributes and (layer.opacity != 100.0 or layer.mode != gimpenums.NORMAL_MODE):
+      return False
+  
+  return True
+
+
+def get_layer_pixels(layer):
+  """
+  Return the pixels of the specified RGB or grayscale layer as a NumPy array of
+  shape (height, width, 4) with RGBA values. Layers without an alpha channel are
+  treated as fully opaque.
+  
+  This function requires NumPy.
+  """
+  
+  pixel_region = layer.get_pixel_rgn(0, 0, layer.width, layer.height, False, False)
+  pixels = numpy.frombuffer(pixel_region[0:layer.width, 0:layer.height], dtype=numpy.uint8).reshape(
+    layer.height, layer.width, layer.bpp)
+  
+  num_color_channels = 3 if layer.bpp in [3, 4] else 1
+  
+  rgba_pixels = numpy.full((layer.height, layer.width, 4), 255, dtype=numpy.uint8)
+  rgba_pixels[..., :3] = pixels[..., :num_color_channels]
+  if layer.bpp in [2, 4]:
+    rgba_pixels[..., 3] = pixels[..., -1]
+  
+  return rgba_pixels
+
+
+def compare_layer_pixels(pixels_list, compare_alpha_channels=True, tolerance=0, diff_image_filepath=None):
+  """
+  Return True if all specified arrays of RGBA pixels (as returned by
+  `get_layer_pixels`) are identical within the given `tolerance` (the maximum
+  difference of each channel value), False otherwise.
+  
+  Color channels are compared premultiplied by alpha, i.e. colors of fully
+  transparent pixels are ignored. If `compare_alpha_channels` is True, alpha
+  channels are compared as well.
+  
+  If `diff_image_filepath` is not None and the pixels differ, save an image to
+  the specified file where pixels differing from the first array contain the
+  absolute differences and the remaining pixels are transparent. Only the first
+  differing array is saved.
+  
+  This function requires NumPy.
+  """
+  
+  if any(pixels.shape != pixels_list[0].shape for pixels in pixels_list[1:]):
+    return False
+  
+  for pixels in pixels_list[1:]:
+    differences = _get_pixel_differences(pixels_list[0], pixels, compare_alpha_channels)
+    differing_pixels = (differences > tolerance).any(axis=2)
+    
+    if differing_pixels.any():
+      if diff_image_filepath is not None:
+        _save_diff_image(differences, differing_pixels, diff_image_filepath)
+      return False
+  
+  return True
+
+
+def _get_pixel_differences(pixels, other_pixels, compare_alpha_channels):
+  differences = numpy.zeros(pixels.shape, dtype=numpy.uint8)
+  
+  alpha = pixels[..., 3:].astype(numpy.int32)
+  other_alpha = other_pixels[..., 3:].astype(numpy.int32)
+  
+  differences[..., :3] = (
+    numpy.abs(pixels[..., :3] * alpha - other_pixels[..., :3] * other_alpha) + 127) // 255
+  
+  if compare_alpha_channels:
+    differences[..., 3] = numpy.abs(alpha - other_alpha)[..., 0]
+  
+  return differences
+
+
+def _save_diff_image(differences, differing_pixels, filepath):
+  height, width = differing_pixels.shape
+  
+  diff_pixels = numpy.zeros((height, width, 4), dtype=numpy.uint8)
+  diff_pixels[..., :3] = differences[..., :3]
+  diff_pixels[..., 3] = numpy.where(differing_pixels, 255, 0)
+  
+  image = gimp.Image(width, height, gimpenums.RGB)
+  layer = gimp.Layer(image, "diff", width, height, gimpenums.RGBA_IMAGE, 100.0, gimpenums.NORMAL_MODE)
+  pdb.gimp_image_insert_layer(image, layer, None, 0)
+  
+  pixel_region = layer.get_pixel_rgn(0, 0, width, height, True, False)
+  pixel_region[0:width, 0:height] = diff_pixels.tobytes()
+  layer.flush()
+  
+  try:
+    pdb.gimp_file_save(image, layer, filepath.encode(), os.path.basename(filepath).encode())
+  finally:
+    pdb.gimp_image_delete(image)
+
+
 #-------------------------------------------------------------------------------
 
 
@@ -0,0 +1,304 @@
+#
+# This file is part of pygimplib.
+#
+# Copyright (C) 2014-2016 khalim19 <khalim19@gmail.com>
+#
+# pygimplib is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pygimplib is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pygimplib.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+This module provides profiling of plug-in procedures:
+* CPU profiling of the entire procedure via `cProfile`,
+* tracing of memory allocations in selected parts of the procedure via
+  `tracemalloc`, if available, or else recording the maximum resident set size
+  (via `resource`, if available) and the number of objects tracked by the
+  garbage collector before and after the selected parts.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+str = unicode
+
+import StringIO
+import cProfile
+import collections
+import contextlib
+import gc
+import os
+import pstats
+import sys
+
+try:
+  import resource
+except ImportError:
+  resource = None
+
+try:
+  import tracemalloc
+except ImportError:
+  tracemalloc = None
+
+from . import constants
+from . import pglogging
+from . import pgpath
+
+#===============================================================================
+
+PROFILE_MODE_ENVIRONMENT_VARIABLE = "PYGIMPLIB_PROFILE_MODE"
+
+_PROFILE_MODE_NAMES = {
+  "none": constants.PROFILE_NONE,
+  "cpu": constants.PROFILE_CPU,
+  "cpu_and_memory": constants.PROFILE_CPU_AND_MEMORY,
+}
+
+NUM_TOP_ENTRIES = 40
+
+# List of memory reports of the running `profile` call if memory is traced,
+# None otherwise.
+_memory_reports = None
+
+#===============================================================================
+
+
+def get_profile_mode(default_profile_mode):
+  """
+  Return the profile mode specified by the `PYGIMPLIB_PROFILE_MODE` environment
+  variable, or `default_profile_mode` if the environment variable is not set or
+  its value is not valid.
+  
+  Valid values of the environment variable are `none`, `cpu` and
+  `cpu_and_memory`.
+  """
+  
+  profile_mode_name = os.environ.get(PROFILE_MODE_ENVIRONMENT_VARIABLE, "").strip().lower()
+  return _PROFILE_MODE_NAMES.get(profile_mode_name, default_profile_mode)
+
+
+def profile(procedure, procedure_args, profile_mode, log_path_dirnames, profile_log_filename,
+            profile_stats_filename, log_header_title=""):
+  """
+  Call `procedure` with `procedure_args` and profile the call according to
+  `profile_mode`. Return the return value of `procedure`.
+  
+  The profile results are written even if `procedure` raises an exception.
+  
+  Parameters:
+  
+  * `profile_mode` - profile mode. Possible values:
+    
+    * PROFILE_NONE - do not profile, only call `procedure`.
+    * PROFILE_CPU - profile the call via `cProfile`.
+    * PROFILE_CPU_AND_MEMORY - in addition to `PROFILE_CPU`, trace memory
+      allocations within `trace_memory` blocks. If `tracemalloc` is not
+      available (e.g. in Python 2), record the memory usage and the number of
+      objects before and after each `trace_memory` block instead.
+  
+  * `log_path_dirnames` - list of directory paths for the profile files. If the
+    first path is invalid or permission to write is denied, subsequent
+    directories are used.
+  
+  * `profile_log_filename` - filename of the log file to append statistics and
+    top memory allocation sites in human-readable form to.
+  
+  * `profile_stats_filename` - filename of the file containing statistics in
+    the `pstats` format (e.g. for further analysis via `pstats.Stats`),
+    overwritten on each call.
+  
+  * `log_header_title` - optional title in the header written to the log file
+    before the statistics.
+  """
+  
+  global _memory_reports
+  
+  if profile_mode == constants.PROFILE_NONE:
+    return procedure(*procedure_args)
+  
+  if profile_mode == constants.PROFILE_CPU_AND_MEMORY:
+    _memory_reports = []
+  
+  profiler = cProfile.Profile()
+  
+  try:
+    return profiler.runcall(procedure, *procedure_args)
+  finally:
+    memory_reports = _memory_reports
+    _memory_reports = None
+    
+    _write_profile(
+      profiler, profile_mode, memory_reports, log_path_dirnames, profile_log_filename,
+      profile_stats_filename, log_header_title)
+
+
+@contextlib.contextmanager
+def trace_memory(label):
+  """
+  Trace memory allocations within the `with` block and add the top allocation
+  sites to the log file of the running `profile` call.
+  
+  If `tracemalloc` is not available, add the maximum resident set size and the
+  number of objects tracked by the garbage collector (in total and per type)
+  before and after the `with` block instead.
+  
+  If `profile` is not running in the `PROFILE_CPU_AND_MEMORY` mode, do nothing.
+  """
+  
+  if _memory_reports is None:
+    yield
+    return
+  
+  if tracemalloc is not None:
+    trace_memory_func = _trace_memory_via_tracemalloc
+  else:
+    trace_memory_func = _trace_memory_usage
+  
+  with trace_memory_func(label, _memory_reports):
+    yield
+
+
+@contextlib.contextmanager
+def _trace_memory_via_tracemalloc(label, memory_reports):
+  is_tracing = tracemalloc.is_tracing()
+  if not is_tracing:
+    tracemalloc.start()
+  
+  snapshot_before = tracemalloc.take_snapshot()
+  
+  try:
+    yield
+  finally:
+    snapshot_after = tracemalloc.take_snapshot()
+    _unused, peak_size = tracemalloc.get_traced_memory()
+    
+    if not is_tracing:
+      tracemalloc.stop()
+    
+    memory_reports.append(_get_memory_report(label, snapshot_before, snapshot_after, peak_size))
+
+
+def _get_memory_report(label, snapshot_before, snapshot_after, peak_size):
+  report_lines = [
+    "Memory allocations in {0} (peak traced memory: {1:.1f} KiB):".format(label, peak_size / 1024)]
+  
+  for stat in snapshot_after.compare_to(snapshot_before, "lineno")[:NUM_TOP_ENTRIES]:
+    report_lines.append("  {0}".format(stat))
+  
+  return "\n".join(report_lines)
+
+
+@contextlib.contextmanager
+def _trace_memory_usage(label, memory_reports):
+  max_rss_before = _get_max_rss()
+  object_counts_before = _get_object_counts()
+  
+  try:
+    yield
+  finally:
+    max_rss_after = _get_max_rss()
+    object_counts_after = _get_object_counts()
+    
+    memory_reports.append(
+      _get_memory_usage_report(
+        label, max_rss_before, max_rss_after, object_counts_before, object_counts_after))
+
+
+def _get_max_rss():
+  """
+  Return the maximum resident set size of the process in KiB, or None if
+  `resource` is not available.
+  """
+  
+  if resource is None:
+    return None
+  
+  max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+  # `ru_maxrss` is in bytes on OS X and in KiB on other platforms.
+  if sys.platform == "darwin":
+    max_rss /= 1024
+  
+  return max_rss
+
+
+def _get_object_counts():
+  gc.collect()
+  return collections.Counter(type(object_).__name__ for object_ in gc.get_objects())
+
+
+def _get_memory_usage_report(label, max_rss_before, max_rss_after, object_counts_before, object_counts_after):
+  report_lines = ["Memory usage in {0}:".format(label)]
+  
+  if max_rss_before is not None:
+    report_lines.append(
+      "  maximum resident set size: {0:.1f} KiB before, {1:.1f} KiB after".format(
+        max_rss_before, max_rss_after))
+  else:
+    report_lines.append("  maximum resident set size not recorded - resource is not available")
+  
+  report_lines.append(
+    "  objects tracked by the garbage collector: {0} before, {1} after".format(
+      sum(object_counts_before.values()), sum(object_counts_after.values())))
+  
+  object_count_diffs = [
+    (type_name, object_counts_after[type_name] - object_counts_before[type_name])
+    for type_name in set(object_counts_before) | set(object_counts_after)]
+  object_count_diffs = [
+    (type_name, count_diff) for type_name, count_diff in object_count_diffs if count_diff != 0]
+  object_count_diffs.sort(key=lambda item: (-abs(item[1]), item[0]))
+  
+  for type_name, count_diff in object_count_diffs[:NUM_TOP_ENTRIES]:
+    report_lines.append("  {0}: {1:+d}".format(type_name, count_diff))
+  
+  return "\n".join(report_lines)
+
+
+def _write_profile(profiler, profile_mode, memory_reports, log_path_dirnames, profile_log_filename,
+                   profile_stats_filename, log_header_title):
+  log_dirname = _get_writable_dirname(log_path_dirnames)
+  if log_dirname is None:
+    return
+  
+  stats_output = StringIO.StringIO()
+  stats = pstats.Stats(profiler, stream=stats_output)
+  stats.sort_stats("cumulative").print_stats(NUM_TOP_ENTRIES)
+  
+  stats.dump_stats(os.path.join(log_dirname, profile_stats_filename))
+  
+  with open(os.path.join(log_dirname, profile_log_filename), "a") as profile_log_file:
+    profile_log_file.write(pglogging.get_log_header(log_header_title).encode())
+    profile_log_file.write(stats_output.getvalue())
+    
+    if profile_mode == constants.PROFILE_CPU_AND_MEMORY:
+      if tracemalloc is None:
+        profile_log_file.write(
+          b"Memory allocations not traced - tracemalloc is not available, "
+          b"recording memory usage and object counts instead.\n")
+      
+      for memory_report in memory_reports:
+        profile_log_file.write((memory_report + "\n\n").encode("utf-8"))
+
+
+def _get_writable_dirname(dirnames):
+  for dirname in dirnames:
+    try:
+      pgpath.make_dirs(dirname)
+    except OSError:
+      continue
+    
+    if os.access(dirname, os.W_OK):
+      return dirname
+  
+  return None
@@ -0,0 +1,417 @@
+#
+# This file is part of pygimplib.
+#
+# Copyright (C) 2014-2016 khalim19 <khalim19@gmail.com>
+#
+# pygimplib is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pygimplib is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pygimplib.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+This module defines classes to invoke work from the GTK main loop:
+* a scheduler of delayed updates (e.g. of GUI previews),
+* a runner performing long operations in steps while keeping the GUI
+  responsive.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+str = unicode
+
+import itertools
+import sys
+import time
+import types
+
+import gobject
+
+#===============================================================================
+
+
+class UpdateTiming(object):
+  
+  """
+  This class stores statistics of updates invoked via `UpdateScheduler`.
+  
+  Attributes:
+  
+  * `num_updates` - Number of finished updates.
+  
+  * `num_coalesced` - Number of scheduled updates replaced by a newer update
+    before they were started.
+  
+  * `num_canceled` - Number of updates canceled via `UpdateScheduler.cancel`
+    plus the number of updates in progress whose remaining chunks were
+    discarded.
+  
+  * `last_duration` - Duration of the last finished update in seconds.
+  
+  * `max_duration` - Maximum duration of a finished update in seconds.
+  
+  * `total_duration` - Total duration of all finished updates in seconds.
+  
+  * `average_duration` (read-only) - Average duration of a finished update in
+    seconds.
+  
+  The duration of an update only includes the time spent in the update, not the
+  time waiting for the update to be started or for the next chunk.
+  """
+  
+  def __init__(self):
+    self.num_updates = 0
+    self.num_coalesced = 0
+    self.num_canceled = 0
+    self.last_duration = 0.0
+    self.max_duration = 0.0
+    self.total_duration = 0.0
+  
+  @property
+  def average_duration(self):
+    return self.total_duration / self.num_updates if self.num_updates > 0 else 0.0
+  
+  def _add_duration(self, duration):
+    self.num_updates += 1
+    self.last_duration = duration
+    self.max_duration = max(self.max_duration, duration)
+    self.total_duration += duration
+
+
+class _Update(object):
+  
+  def __init__(self, callback, callback_args, callback_kwargs, priority):
+    self.callback = callback
+    self.callback_args = callback_args
+    self.callback_kwargs = callback_kwargs
+    self.priority = priority
+    
+    self.timeout_source_id = None
+    self.ready_order = None
+    self.chunks = None
+    self.is_discarded = False
+    self.duration = 0.0
+
+
+class UpdateScheduler(object):
+  
+  """
+  This class invokes updates (callbacks) after a delay from the GTK main loop.
+  
+  Unlike `pgutils.timeout_add_strict`, the scheduler also provides the
+  following features:
+  
+  * Coalescing - scheduling a callback that is already scheduled replaces the
+    scheduled invocation, including its arguments and delay. A burst of changes
+    therefore results in a single update reflecting the latest state.
+  
+  * Priorities - if multiple updates are due at the same time, updates with a
+    lower priority value (see `set_priority`) are invoked first, like in GLib.
+  
+  * Chunked updates - if the callback returns a generator (i.e. the callback
+    is a generator function), each iteration of the generator (chunk) is
+    performed in a separate idle callback, allowing GTK to process events
+    between chunks. If the callback is scheduled again or canceled before all
+    chunks are performed, the remaining chunks of the now stale update are
+    discarded. If this happens while a chunk is being performed (e.g. from a GTK
+    event handler invoked within the chunk), the chunks are discarded once the
+    chunk is finished.
+  
+  * Timing - the duration of updates is measured for each callback (see
+    `timings`).
+  
+  Attributes:
+  
+  * `timings` (read-only) - Dictionary of {callback: `UpdateTiming`} pairs.
+  """
+  
+  def __init__(self, idle_priority=gobject.PRIORITY_DEFAULT_IDLE):
+    """
+    Parameters:
+    
+    * `idle_priority` - GLib priority of the idle callbacks invoking the
+      updates.
+    """
+    
+    self._idle_priority = idle_priority
+    
+    self._priorities = {}
+    self._timings = {}
+    
+    # key: callback; value: `_Update` instance waiting for the timeout
+    self._pending_updates = {}
+    # key: callback; value: `_Update` instance waiting to be started
+    self._ready_updates = {}
+    self._running_update = None
+    
+    self._ready_order_counter = itertools.count()
+    self._idle_source_id = None
+  
+  @property
+  def timings(self):
+    return self._timings
+  
+  def set_priority(self, callback, priority):
+    """
+    Set the priority of the specified callback. Lower values mean higher
+    priority. The default priority is 0.
+    """
+    
+    self._priorities[callback] = priority
+  
+  def schedule(self, delay, callback, *callback_args, **callback_kwargs):
+    """
+    Invoke `callback` with the specified arguments after `delay` milliseconds.
+    
+    If `callback` is already scheduled, the scheduled update is replaced. If an
+    update of `callback` performed in chunks is in progress, its remaining
+    chunks are discarded.
+    """
+    
+    self._remove_update(callback, is_coalesced=True)
+    
+    update = _Update(callback, callback_args, callback_kwargs, self._priorities.get(callback, 0))
+    update.timeout_source_id = gobject.timeout_add(delay, self._on_update_timeout, update)
+    self._pending_updates[callback] = update
+  
+  def cancel(self, callback):
+    """
+    Cancel the scheduled update of `callback` or discard the remaining chunks of
+    an update in progress. If `callback` is not scheduled, do nothing.
+    """
+    
+    self._remove_update(callback, is_coalesced=False)
+  
+  def cancel_all(self):
+    """
+    Cancel all scheduled updates and updates in progress.
+    """
+    
+    callbacks = set(self._pending_updates) | set(self._ready_updates)
+    if self._running_update is not None:
+      callbacks.add(self._running_update.callback)
+    
+    for callback in callbacks:
+      self.cancel(callback)
+  
+  def is_scheduled(self, callback):
+    """
+    Return True if the update of `callback` is scheduled or in progress.
+    """
+    
+    return (
+      callback in self._pending_updates or callback in self._ready_updates
+      or (self._running_update is not None and self._running_update.callback == callback))
+  
+  def _remove_update(self, callback, is_coalesced):
+    timing = self._timings.setdefault(callback, UpdateTiming())
+    
+    if callback in self._pending_updates:
+      gobject.source_remove(self._pending_updates.pop(callback).timeout_source_id)
+      self._count_removed_update(timing, is_coalesced)
+    elif callback in self._ready_updates:
+      del self._ready_updates[callback]
+      self._count_removed_update(timing, is_coalesced)
+    
+    if (self._running_update is not None and self._running_update.callback == callback
+        and self._running_update.chunks is not None):
+      # A generator cannot be closed while it is executing, hence the chunks are
+      # closed in `_invoke_chunk` after the current chunk is finished.
+      if self._running_update.chunks.gi_running:
+        self._running_update.is_discarded = True
+      else:
+        self._running_update.chunks.close()
+      
+      self._running_update = None
+      timing.num_canceled += 1
+  
+  def _count_removed_update(self, timing, is_coalesced):
+    if is_coalesced:
+      timing.num_coalesced += 1
+    else:
+      timing.num_canceled += 1
+  
+  def _on_update_timeout(self, update):
+    del self._pending_updates[update.callback]
+    
+    update.timeout_source_id = None
+    update.ready_order = next(self._ready_order_counter)
+    self._ready_updates[update.callback] = update
+    
+    if self._idle_source_id is None:
+      self._idle_source_id = gobject.idle_add(self._process_next_chunk, priority=self._idle_priority)
+    
+    return False
+  
+  def _process_next_chunk(self):
+    try:
+      self._process_chunk()
+    except Exception:
+      # The idle callback is removed if an exception is raised.
+      self._idle_source_id = None
+      if self._ready_updates:
+        self._idle_source_id = gobject.idle_add(self._process_next_chunk, priority=self._idle_priority)
+      raise
+    
+    if self._running_update is None and not self._ready_updates:
+      self._idle_source_id = None
+      return False
+    else:
+      return True
+  
+  def _process_chunk(self):
+    if self._running_update is None and self._ready_updates:
+      update = min(self._ready_updates.values(), key=lambda update: (update.priority, update.ready_order))
+      del self._ready_updates[update.callback]
+      
+      self._running_update = update
+      self._invoke_chunk(
+        update, lambda: update.callback(*update.callback_args, **update.callback_kwargs))
+    elif self._running_update is not None:
+      update = self._running_update
+      self._invoke_chunk(update, lambda: next(update.chunks))
+  
+  def _invoke_chunk(self, update, chunk_func):
+    start_time = time.time()
+    is_finished = False
+    
+    try:
+      retval = chunk_func()
+    except StopIteration:
+      is_finished = True
+    except Exception:
+      if self._running_update is update:
+        self._running_update = None
+      raise
+    else:
+      if update.chunks is None:
+        if isinstance(retval, types.GeneratorType):
+          update.chunks = retval
+        else:
+          is_finished = True
+    finally:
+      update.duration += time.time() - start_time
+    
+    if update.is_discarded:
+      if not is_finished:
+        update.chunks.close()
+      return
+    
+    if is_finished:
+      self._timings.setdefault(update.callback, UpdateTiming())._add_duration(update.duration)
+      if self._running_update is update:
+        self._running_update = None
+
+
+#===============================================================================
+
+
+class StepRunner(object):
+  
+  """
+  This class performs a long operation split into steps from idle callbacks of
+  the GTK main loop, allowing GTK to process events (e.g. redraw the window or
+  handle button clicks) between steps.
+  
+  The operation is a generator, each iteration of which is a single step.
+  Within one idle callback, steps are performed until the time budget is
+  exceeded. The budget therefore determines how often GTK processes events
+  during the operation.
+  
+  Attributes:
+  
+  * `is_running` (read-only) - True if `run` was called and the operation has
+    not finished yet.
+  """
+  
+  def __init__(self, steps, time_budget_milliseconds=50, idle_priority=gobject.PRIORITY_DEFAULT_IDLE):
+    """
+    Parameters:
+    
+    * `steps` - Generator performing one step per iteration.
+    
+    * `time_budget_milliseconds` - Time after which no more steps are performed
+      in the current idle callback. At least one step is always performed.
+    
+    * `idle_priority` - GLib priority of the idle callbacks performing the
+      steps.
+    """
+    
+    self._steps = steps
+    self._time_budget = time_budget_milliseconds / 1000
+    self._idle_priority = idle_priority
+    
+    self._main_loop = None
+    self._idle_source_id = None
+    self._exc_info = None
+  
+  @property
+  def is_running(self):
+    return self._main_loop is not None
+  
+  def run(self):
+    """
+    Perform all steps and return after the last step was performed or `stop`
+    was called. GTK events are processed between steps via a nested main loop.
+    
+    If a step raises an exception, no more steps are performed and the exception
+    is raised from this method.
+    """
+    
+    self._exc_info = None
+    self._main_loop = gobject.MainLoop()
+    self._idle_source_id = gobject.idle_add(self._perform_steps, priority=self._idle_priority)
+    
+    try:
+      self._main_loop.run()
+    finally:
+      self._main_loop = None
+    
+    if self._exc_info is not None:
+      exc_info, self._exc_info = self._exc_info, None
+      raise exc_info[0], exc_info[1], exc_info[2]
+  
+  def stop(self):
+    """
+    Stop performing steps and close the generator, causing `run` to return. If
+    the operation is not running, do nothing.
+    """
+    
+    if not self.is_running:
+      return
+    
+    if self._idle_source_id is not None:
+      gobject.source_remove(self._idle_source_id)
+      self._idle_source_id = None
+    
+    self._steps.close()
+    self._main_loop.quit()
+  
+  def _perform_steps(self):
+    start_time = time.time()
+    
+    try:
+      while True:
+        next(self._steps)
+        if time.time() - start_time >= self._time_budget:
+          return True
+    except StopIteration:
+      pass
+    except Exception:
+      self._exc_info = sys.exc_info()
+    
+    self._idle_source_id = None
+    self._main_loop.quit()
+    
+    return False
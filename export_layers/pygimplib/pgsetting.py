@@ -42,7 +42,6 @@ pdb = gimp.pdb
 from . import pgpath
 from . import pgsettingpersistor
 from . import pgsettingpresenter
-from .pgsettingpresenters_gtk import SettingGuiTypes
 
 #===============================================================================
 
@@ -79,6 +78,27 @@ class SettingPdbTypes(object):
   automatic = type(b"AutomaticSettingPdbType", (), {})()
 
 
+class _SettingGuiTypes(object):
+  
+  """
+  This class provides the items of `pgsettingpresenters_gtk.SettingGuiTypes`.
+  
+  GTK setting presenters (and thus GTK) are imported only when an item other
+  than `automatic` or `none` is accessed, so that settings can be created and
+  used without GTK (e.g. when the plug-in is run non-interactively).
+  """
+  
+  automatic = pgsettingpresenter.automatic_gui_type
+  none = pgsettingpresenter.NullSettingPresenter
+  
+  def __getattr__(self, name):
+    from . import pgsettingpresenters_gtk
+    return getattr(pgsettingpresenters_gtk.SettingGuiTypes, name)
+
+
+SettingGuiTypes = _SettingGuiTypes()
+
+
 #===============================================================================
 
 
@@ -421,7 +441,7 @@ class Setting(object):
       raise ValueError("gui_type cannot be automatic if gui_element is not None")
     
     if gui_type == SettingGuiTypes.automatic:
-      gui_type = self._gui_type
+      gui_type = self._resolve_gui_type(self._gui_type)
     elif gui_type is None:
       gui_type = pgsettingpresenter.NullSettingPresenter
       # We need to disconnect the event before removing the GUI.
@@ -722,20 +742,34 @@ class Setting(object):
       gui_type_to_return = SettingGuiTypes.none
     elif gui_type == SettingGuiTypes.automatic:
       if self._ALLOWED_GUI_TYPES:
+        # The GUI type is resolved in `set_gui` if specified by name.
         gui_type_to_return = self._ALLOWED_GUI_TYPES[0]
       else:
         gui_type_to_return = SettingGuiTypes.none
     else:
-      if gui_type in self._ALLOWED_GUI_TYPES:
+      allowed_gui_types = [self._resolve_gui_type(type_) for type_ in self._ALLOWED_GUI_TYPES]
+      if gui_type in [SettingGuiTypes.none, pgsettingpresenter.NullSettingPresenter]:
         gui_type_to_return = gui_type
-      elif gui_type in [SettingGuiTypes.none, pgsettingpresenter.NullSettingPresenter]:
+      elif gui_type in allowed_gui_types:
         gui_type_to_return = gui_type
       else:
         raise ValueError(
-          "invalid GUI type; must be one of {0}".format([type_.__name__ for type_ in self._ALLOWED_GUI_TYPES]))
+          "invalid GUI type; must be one of {0}".format([type_.__name__ for type_ in allowed_gui_types]))
     
     return gui_type_to_return
   
+  def _resolve_gui_type(self, gui_type):
+    """
+    Return the `SettingPresenter` class for `gui_type`. Items of
+    `_ALLOWED_GUI_TYPES` may be names of `SettingGuiTypes` items so that GTK is
+    not imported when this module is imported.
+    """
+    
+    if isinstance(gui_type, str):
+      return getattr(SettingGuiTypes, gui_type)
+    else:
+      return gui_type
+  
   def _value_to_str(self, value):
     """
     Prepend `value` to an error message if `value` that is meant to be assigned
@@ -829,6 +863,7 @@ class IntSetting(NumericSetting):
   """
   
   _ALLOWED_PDB_TYPES = [SettingPdbTypes.int32, SettingPdbTypes.int16, SettingPdbTypes.int8]
+  _ALLOWED_GUI_TYPES = ["spin_button"]
 
 
 class FloatSetting(NumericSetting):
@@ -860,7 +895,7 @@ class BoolSetting(Setting):
   """
   
   _ALLOWED_PDB_TYPES = [SettingPdbTypes.int32, SettingPdbTypes.int16, SettingPdbTypes.int8]
-  _ALLOWED_GUI_TYPES = [SettingGuiTypes.check_button, SettingGuiTypes.check_menu_item]
+  _ALLOWED_GUI_TYPES = ["check_button", "check_menu_item"]
   
   @property
   def description(self):
@@ -918,7 +953,7 @@ class EnumSetting(Setting):
   """
   
   _ALLOWED_PDB_TYPES = [SettingPdbTypes.int32, SettingPdbTypes.int16, SettingPdbTypes.int8]
-  _ALLOWED_GUI_TYPES = [SettingGuiTypes.combobox]
+  _ALLOWED_GUI_TYPES = ["combobox"]
   
   def __init__(self, name, default_value, items, empty_value=None, **kwargs):
     """
@@ -1139,7 +1174,7 @@ class StringSetting(Setting):
   """
   
   _ALLOWED_PDB_TYPES = [SettingPdbTypes.string]
-  _ALLOWED_GUI_TYPES = [SettingGuiTypes.text_entry]
+  _ALLOWED_GUI_TYPES = ["text_entry"]
 
 
 class ValidatableStringSetting(StringSetting):
@@ -1221,7 +1256,7 @@ class FileExtensionSetting(ValidatableStringSetting):
   """
   
   _ALLOWED_EMPTY_VALUES = [""]
-  _ALLOWED_GUI_TYPES = [SettingGuiTypes.text_entry]
+  _ALLOWED_GUI_TYPES = ["text_entry"]
   
   def __init__(self, name, default_value, **kwargs):
     if isinstance(default_value, bytes):
@@ -1249,7 +1284,7 @@ class DirectorySetting(ValidatableStringSetting):
   """
   
   _ALLOWED_EMPTY_VALUES = [None, ""]
-  _ALLOWED_GUI_TYPES = [SettingGuiTypes.folder_chooser]
+  _ALLOWED_GUI_TYPES = ["folder_chooser"]
   
   def __init__(self, name, default_value, **kwargs):
     if isinstance(default_value, bytes):
@@ -33,6 +33,12 @@ import abc
 
 #===============================================================================
 
+# Placeholder for a GUI type determined by the setting itself (see
+# `SettingGuiTypes.automatic` in `pgsettingpresenters_gtk`).
+automatic_gui_type = type(b"AutomaticGuiType", (), {})()
+
+#===============================================================================
+
 
 class SettingValueSynchronizer(object):
   
@@ -101,6 +101,37 @@ class GtkCheckButtonPresenter(GtkSettingPresenter):
     self._element.set_active(value)
 
 
+class GtkSpinButtonPresenter(GtkSettingPresenter):
+  
+  """
+  This class is a `SettingPresenter` for `gtk.SpinButton` elements holding
+  integer values.
+  
+  Value: Number in the spin button.
+  """
+  
+  _VALUE_CHANGED_SIGNAL = "value-changed"
+  
+  _MIN_VALUE = -2**31
+  _MAX_VALUE = 2**31 - 1
+  
+  def _create_gui_element(self, setting):
+    adjustment = gtk.Adjustment(
+      value=setting.value,
+      lower=setting.min_value if setting.min_value is not None else self._MIN_VALUE,
+      upper=setting.max_value if setting.max_value is not None else self._MAX_VALUE,
+      step_incr=1,
+      page_incr=10)
+    
+    return gtk.SpinButton(adjustment=adjustment, digits=0)
+  
+  def _get_value(self):
+    return self._element.get_value_as_int()
+  
+  def _set_value(self, value):
+    self._element.set_value(value)
+
+
 class GimpUiIntComboBoxPresenter(GtkSettingPresenter):
   
   """
@@ -310,6 +341,7 @@ class SettingGuiTypes(object):
   """
   
   check_button = GtkCheckButtonPresenter
+  spin_button = GtkSpinButtonPresenter
   combobox = GimpUiIntComboBoxPresenter
   text_entry = GtkEntryPresenter
   extended_entry = ExtendedEntryPresenter
@@ -320,5 +352,5 @@ class SettingGuiTypes(object):
   paned_position = GtkPanedPositionPresenter
   check_menu_item = GtkCheckMenuItemPresenter
   
-  automatic = type(b"AutomaticGuiType", (), {})()
+  automatic = pgsettingpresenter.automatic_gui_type
   none = pgsettingpresenter.NullSettingPresenter
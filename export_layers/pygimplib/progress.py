@@ -29,6 +29,8 @@ from __future__ import unicode_literals
 
 str = unicode
 
+import time
+
 #===============================================================================
 
 
@@ -42,6 +44,13 @@ class ProgressUpdater(object):
   To use this in the GUI for a progress bar, subclass this class and override
   the `_fill_progress_bar()` and `_set_text_progress_bar()` methods.
   
+  If many tasks are finished in a short time, updating the progress bar on each
+  task may take a considerable fraction of the total time. To avoid this, pass
+  a non-zero `min_update_interval_milliseconds` during initialization. The
+  progress bar is then updated at most once per the interval. Updates within
+  the interval are not lost - the latest progress and text are displayed on the
+  next update, once all tasks are finished or when calling `flush()`.
+  
   Attributes:
   
   * `progress_bar` - Progress bar (GUI element).
@@ -49,18 +58,58 @@ class ProgressUpdater(object):
   * `num_total_tasks` - Number of total tasks to complete.
   
   * `num_finished_tasks` (read-only) - Number of tasks finished so far.
+  
+  * `min_update_interval_milliseconds` - Minimum time between two updates of
+    the progress bar.
+  
+  * `elapsed_time` (read-only) - Time in seconds since the creation of the
+    object or since the last `reset()`.
+  
+  * `throughput` (read-only) - Average number of finished tasks per second, or
+    None if no task has been finished yet.
+  
+  * `estimated_remaining_time` (read-only) - Estimated time in seconds to finish
+    the remaining tasks based on `throughput`, or None if no task has been
+    finished yet.
   """
   
-  def __init__(self, progress_bar, num_total_tasks=0):
+  def __init__(self, progress_bar, num_total_tasks=0, min_update_interval_milliseconds=0):
     self.progress_bar = progress_bar
     
     self.num_total_tasks = num_total_tasks
     self._num_finished_tasks = 0
+    
+    self.min_update_interval_milliseconds = min_update_interval_milliseconds
+    
+    self._start_time = time.time()
+    self._last_update_time = None
+    self._is_progress_update_pending = False
+    self._pending_text = None
   
   @property
   def num_finished_tasks(self):
     return self._num_finished_tasks
   
+  @property
+  def elapsed_time(self):
+    return time.time() - self._start_time
+  
+  @property
+  def throughput(self):
+    elapsed_time = self.elapsed_time
+    if self._num_finished_tasks == 0 or elapsed_time <= 0.0:
+      return None
+    else:
+      return self._num_finished_tasks / elapsed_time
+  
+  @property
+  def estimated_remaining_time(self):
+    throughput = self.throughput
+    if throughput is None:
+      return None
+    else:
+      return (self.num_total_tasks - self._num_finished_tasks) / throughput
+  
   def update_tasks(self, num_tasks=1):
     """
     Advance the progress bar by a given number of tasks finished.
@@ -75,7 +124,10 @@ class ProgressUpdater(object):
     
     self._num_finished_tasks += num_tasks
     
-    self._fill_progress_bar()
+    self._is_progress_update_pending = True
+    
+    if self._num_finished_tasks == self.num_total_tasks or self._can_update():
+      self.flush()
   
   def update_text(self, text):
     """
@@ -85,7 +137,27 @@ class ProgressUpdater(object):
     
     if text is None:
       text = ""
-    self._set_text_progress_bar(text)
+    
+    self._pending_text = text
+    
+    if self._can_update():
+      self.flush()
+  
+  def flush(self):
+    """
+    Display the latest progress and text in the progress bar if they have not
+    been displayed yet due to `min_update_interval_milliseconds`.
+    """
+    
+    if self._is_progress_update_pending:
+      self._is_progress_update_pending = False
+      self._fill_progress_bar()
+    
+    if self._pending_text is not None:
+      text, self._pending_text = self._pending_text, None
+      self._set_text_progress_bar(text)
+    
+    self._last_update_time = time.time()
   
   def reset(self):
     """
@@ -93,10 +165,20 @@ class ProgressUpdater(object):
     """
     
     self._num_finished_tasks = 0
+    self._start_time = time.time()
+    self._last_update_time = None
+    self._is_progress_update_pending = False
+    self._pending_text = None
+    
     if self.num_total_tasks > 0:
       self._fill_progress_bar()
     self._set_text_progress_bar("")
   
+  def _can_update(self):
+    return (
+      self._last_update_time is None
+      or (time.time() - self._last_update_time) * 1000 >= self.min_update_interval_milliseconds)
+  
   def _fill_progress_bar(self):
     """
     Fill in `num_finished_tasks`/`num_total_tasks` fraction of the progress bar.
@@ -0,0 +1,286 @@
+#
+# This file is part of pygimplib.
+#
+# Copyright (C) 2014-2016 khalim19 <khalim19@gmail.com>
+#
+# pygimplib is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pygimplib is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pygimplib.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+This module defines a rectangle packer using the "maximal rectangles" algorithm
+(best short side fit heuristic), which can be used e.g. to pack images into a
+texture atlas (sprite sheet).
+
+If the rectangles do not fit into a single bin of the maximum size, additional
+bins are created.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+str = unicode
+
+#===============================================================================
+
+
+class RectangleTooLargeError(ValueError):
+  
+  def __init__(self, message, key=None):
+    super(RectangleTooLargeError, self).__init__(message)
+    
+    self.key = key
+
+
+#===============================================================================
+
+
+class PackedRectangle(object):
+  
+  """
+  This class represents a rectangle placed in a bin.
+  
+  Attributes:
+  
+  * `key` - Object identifying the rectangle, as passed to `pack()`.
+  
+  * `x`, `y` - Position of the top-left corner of the rectangle in the bin.
+  
+  * `width`, `height` - Size of the rectangle, excluding padding.
+  """
+  
+  def __init__(self, key, x, y, width, height):
+    self.key = key
+    self.x = x
+    self.y = y
+    self.width = width
+    self.height = height
+  
+  def __str__(self):
+    return "<{0} '{1}' ({2}, {3}, {4}, {5})>".format(
+      type(self).__name__, self.key, self.x, self.y, self.width, self.height)
+
+
+class Bin(object):
+  
+  """
+  This class represents a single bin (e.g. an atlas image) that rectangles are
+  packed into.
+  
+  Attributes:
+  
+  * `max_width`, `max_height` (read-only) - Maximum size of the bin.
+  
+  * `padding` (read-only) - Number of pixels separating packed rectangles.
+  
+  * `rectangles` (read-only) - List of `PackedRectangle` objects in the order
+    they were inserted.
+  
+  * `width`, `height` (read-only) - Size of the bin actually occupied by the
+    packed rectangles.
+  """
+  
+  def __init__(self, max_width, max_height, padding=0):
+    self._max_width = max_width
+    self._max_height = max_height
+    self._padding = padding
+    
+    self._rectangles = []
+    
+    # Trailing padding of rectangles at the right and bottom edges of the bin
+    # may exceed the bin size, hence the extra space.
+    self._free_rectangles = [(0, 0, self._max_width + self._padding, self._max_height + self._padding)]
+  
+  @property
+  def max_width(self):
+    return self._max_width
+  
+  @property
+  def max_height(self):
+    return self._max_height
+  
+  @property
+  def padding(self):
+    return self._padding
+  
+  @property
+  def rectangles(self):
+    return self._rectangles
+  
+  @property
+  def width(self):
+    return max([rect.x + rect.width for rect in self._rectangles]) if self._rectangles else 0
+  
+  @property
+  def height(self):
+    return max([rect.y + rect.height for rect in self._rectangles]) if self._rectangles else 0
+  
+  def insert(self, key, width, height):
+    """
+    Insert a rectangle into the bin. Return the `PackedRectangle` object if
+    there is enough space in the bin, None otherwise.
+    """
+    
+    free_rectangle = self._find_position(width + self._padding, height + self._padding)
+    if free_rectangle is None:
+      return None
+    
+    x, y = free_rectangle[0], free_rectangle[1]
+    self._place((x, y, width + self._padding, height + self._padding))
+    
+    packed_rectangle = PackedRectangle(key, x, y, width, height)
+    self._rectangles.append(packed_rectangle)
+    
+    return packed_rectangle
+  
+  def _find_position(self, width, height):
+    best_free_rectangle = None
+    best_short_side_fit = None
+    best_long_side_fit = None
+    
+    for free_rectangle in self._free_rectangles:
+      free_width, free_height = free_rectangle[2], free_rectangle[3]
+      if free_width >= width and free_height >= height:
+        leftover_horizontal = free_width - width
+        leftover_vertical = free_height - height
+        short_side_fit = min(leftover_horizontal, leftover_vertical)
+        long_side_fit = max(leftover_horizontal, leftover_vertical)
+        
+        if (best_free_rectangle is None
+            or short_side_fit < best_short_side_fit
+            or (short_side_fit == best_short_side_fit and long_side_fit < best_long_side_fit)):
+          best_free_rectangle = free_rectangle
+          best_short_side_fit = short_side_fit
+          best_long_side_fit = long_side_fit
+    
+    return best_free_rectangle
+  
+  def _place(self, used_rectangle):
+    new_free_rectangles = []
+    
+    for free_rectangle in self._free_rectangles:
+      if _intersects(free_rectangle, used_rectangle):
+        new_free_rectangles.extend(_split(free_rectangle, used_rectangle))
+      else:
+        new_free_rectangles.append(free_rectangle)
+    
+    self._free_rectangles = _prune_contained(new_free_rectangles)
+
+
+#===============================================================================
+
+
+def pack(rectangles, max_width, max_height, padding=0):
+  """
+  Pack the specified rectangles into as few bins as possible. Return a list of
+  `Bin` objects.
+  
+  `rectangles` is a list of (key, width, height) tuples. `key` identifies the
+  rectangle and can be any object.
+  
+  `padding` is the number of pixels separating the packed rectangles.
+  
+  Rectangles are inserted from the largest to the smallest (by their longer
+  side), which generally yields tighter packing.
+  
+  Raises:
+  
+  * `RectangleTooLargeError` - A rectangle cannot fit into a bin of the maximum
+    size.
+  """
+  
+  for key, width, height in rectangles:
+    if width > max_width or height > max_height:
+      raise RectangleTooLargeError(
+        "rectangle '{0}' ({1}x{2}) exceeds the maximum bin size ({3}x{4})".format(
+          key, width, height, max_width, max_height), key)
+  
+  sorted_rectangles = sorted(
+    rectangles, key=lambda rectangle: (max(rectangle[1], rectangle[2]), rectangle[1] * rectangle[2]),
+    reverse=True)
+  
+  bins = []
+  
+  for key, width, height in sorted_rectangles:
+    for bin_ in bins:
+      if bin_.insert(key, width, height) is not None:
+        break
+    else:
+      bin_ = Bin(max_width, max_height, padding)
+      bin_.insert(key, width, height)
+      bins.append(bin_)
+  
+  return bins
+
+
+#===============================================================================
+
+
+def _intersects(rectangle1, rectangle2):
+  return not (
+    rectangle2[0] >= rectangle1[0] + rectangle1[2] or rectangle2[0] + rectangle2[2] <= rectangle1[0]
+    or rectangle2[1] >= rectangle1[1] + rectangle1[3] or rectangle2[1] + rectangle2[3] <= rectangle1[1])
+
+
+def _split(free_rectangle, used_rectangle):
+  """
+  Return the parts of `free_rectangle` not covered by `used_rectangle` as
+  (possibly overlapping) maximal rectangles.
+  """
+  
+  free_x, free_y, free_width, free_height = free_rectangle
+  used_x, used_y, used_width, used_height = used_rectangle
+  
+  split_rectangles = []
+  
+  if used_x > free_x:
+    split_rectangles.append((free_x, free_y, used_x - free_x, free_height))
+  if used_x + used_width < free_x + free_width:
+    split_rectangles.append(
+      (used_x + used_width, free_y, free_x + free_width - (used_x + used_width), free_height))
+  if used_y > free_y:
+    split_rectangles.append((free_x, free_y, free_width, used_y - free_y))
+  if used_y + used_height < free_y + free_height:
+    split_rectangles.append(
+      (free_x, used_y + used_height, free_width, free_y + free_height - (used_y + used_height)))
+  
+  return split_rectangles
+
+
+def _prune_contained(rectangles):
+  """
+  Remove rectangles that are fully contained in other rectangles.
+  """
+  
+  def _contains(outer, inner):
+    return (outer[0] <= inner[0] and outer[1] <= inner[1]
+            and outer[0] + outer[2] >= inner[0] + inner[2]
+            and outer[1] + outer[3] >= inner[1] + inner[3])
+  
+  pruned_rectangles = []
+  
+  for i, rectangle in enumerate(rectangles):
+    is_contained = False
+    for j, other_rectangle in enumerate(rectangles):
+      if i != j and _contains(other_rectangle, rectangle):
+        # For identical rectangles, keep only the first one.
+        if rectangle != other_rectangle or j < i:
+          is_contained = True
+          break
+    
+    if not is_contained:
+      pruned_rectangles.append(rectangle)
+  
+  return pruned_rectangles
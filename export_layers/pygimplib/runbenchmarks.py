@@ -0,0 +1,252 @@
+#
+# This file is part of pygimplib.
+#
+# Copyright (C) 2014-2016 khalim19 <khalim19@gmail.com>
+#
+# pygimplib is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pygimplib is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pygimplib.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+This module can be used to run performance benchmarks, similarly to how
+`runtests` runs unit tests.
+
+All modules starting with the "bench_" prefix and defining the
+`get_benchmarks` function are considered benchmark modules. `get_benchmarks`
+accepts benchmark parameters as keyword arguments (see `DEFAULT_PARAMETERS`)
+and returns a dictionary of {benchmark name: function} pairs. Each function is
+called repeatedly and the shortest time is recorded.
+
+Results can be saved to a JSON file and compared against results from a
+previous run (baseline). A benchmark whose time exceeds the baseline time by
+more than the regression threshold is reported as a regression.
+
+To run benchmarks in GIMP, set up the paths in the Python-Fu console as
+described in `runtests`, then run:
+
+
+import runbenchmarks
+runbenchmarks.run_benchmarks(path=plugins_path, output_filepath=<path to JSON file>)
+
+
+To compare the results against a baseline, pass
+`baseline_filepath=<path to JSON file from a previous run>`.
+
+Outside GIMP, the benchmarks can be run from the command line (see `--help`),
+provided that the `gimp` module can be imported.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+str = unicode
+
+import argparse
+import io
+import json
+import pkgutil
+import sys
+import timeit
+
+try:
+  from . import runtests
+except ValueError:
+  # This module is imported as a top-level module (e.g. in the GIMP Python-Fu
+  # console as described in `runtests`).
+  import runtests
+
+#===============================================================================
+
+DEFAULT_PARAMETERS = {
+  "num_layers": 1000,
+  "depth": 3,
+  "duplicate_name_ratio": 0.2,
+  "tag_density": 0.1,
+}
+
+DEFAULT_REGRESSION_THRESHOLD = 0.2
+
+#===============================================================================
+
+
+def run_benchmark(benchmark_func, num_repeats=5):
+  """
+  Call `benchmark_func` `num_repeats` times and return the shortest time in
+  seconds.
+  """
+  
+  return min(timeit.repeat(benchmark_func, repeat=num_repeats, number=1))
+
+
+def run_benchmarks(path, benchmark_module_name_prefix="bench_", modules=None, ignored_modules=None,
+                   parameters=None, num_repeats=5, output_filepath=None, baseline_filepath=None,
+                   regression_threshold=DEFAULT_REGRESSION_THRESHOLD, output_stream=sys.stderr):
+  """
+  Run benchmarks from all benchmark modules located in the `path` directory and
+  return a tuple of (results, regressions).
+  
+  `results` is a dictionary of {"parameters": benchmark parameters,
+  "benchmarks": {benchmark name: time in seconds}}. Benchmark names are
+  prefixed with their module name.
+  
+  `regressions` is a list of regressions compared to the baseline (see
+  `get_regressions`). If `baseline_filepath` is None, the list is empty.
+  
+  Parameters:
+  
+  * `modules`, `ignored_modules` - Prefixes of modules or packages to include or
+    exclude, respectively. See `runtests.run_tests` for more information.
+  
+  * `parameters` - Dictionary of benchmark parameters overriding
+    `DEFAULT_PARAMETERS`.
+  
+  * `num_repeats` - Number of times each benchmark is run.
+  
+  * `output_filepath` - If not None, save results to the specified JSON file.
+  
+  * `baseline_filepath` - If not None, compare results against results loaded
+    from the specified JSON file.
+  
+  * `regression_threshold` - Relative increase in time over the baseline time
+    considered a regression (e.g. 0.2 means 20%).
+  
+  * `output_stream` - Stream to print the results and regressions to.
+  """
+  
+  benchmark_parameters = dict(DEFAULT_PARAMETERS)
+  if parameters is not None:
+    benchmark_parameters.update(parameters)
+  
+  benchmark_times = {}
+  
+  for module in _load_benchmark_modules(path, benchmark_module_name_prefix, modules, ignored_modules):
+    for benchmark_name, benchmark_func in sorted(module.get_benchmarks(**benchmark_parameters).items()):
+      full_benchmark_name = "{0}.{1}".format(module.__name__, benchmark_name)
+      benchmark_times[full_benchmark_name] = run_benchmark(benchmark_func, num_repeats)
+      print("{0}: {1:.6f} s".format(full_benchmark_name, benchmark_times[full_benchmark_name]), file=output_stream)
+  
+  results = {"parameters": benchmark_parameters, "benchmarks": benchmark_times}
+  
+  if output_filepath is not None:
+    save_results(results, output_filepath)
+  
+  if baseline_filepath is not None:
+    regressions = get_regressions(results, load_results(baseline_filepath), regression_threshold)
+    _print_regressions(regressions, regression_threshold, output_stream)
+  else:
+    regressions = []
+  
+  return results, regressions
+
+
+def get_regressions(results, baseline_results, regression_threshold=DEFAULT_REGRESSION_THRESHOLD):
+  """
+  Return a list of (benchmark name, baseline time, time) tuples for benchmarks
+  whose time exceeds the baseline time by more than `regression_threshold`.
+  
+  Benchmarks missing in either `results` or `baseline_results` are ignored. If
+  the benchmark parameters differ, raise `ValueError` as the times are not
+  comparable.
+  """
+  
+  if results["parameters"] != baseline_results["parameters"]:
+    raise ValueError(
+      "benchmark parameters {0} differ from baseline parameters {1}".format(
+        results["parameters"], baseline_results["parameters"]))
+  
+  regressions = []
+  
+  for benchmark_name, benchmark_time in sorted(results["benchmarks"].items()):
+    baseline_time = baseline_results["benchmarks"].get(benchmark_name)
+    if baseline_time is not None and benchmark_time > baseline_time * (1 + regression_threshold):
+      regressions.append((benchmark_name, baseline_time, benchmark_time))
+  
+  return regressions
+
+
+def save_results(results, filepath):
+  with io.open(filepath, "w", encoding="utf-8") as results_file:
+    results_file.write(str(json.dumps(results, indent=2, sort_keys=True)))
+
+
+def load_results(filepath):
+  with io.open(filepath, "r", encoding="utf-8") as results_file:
+    return json.load(results_file)
+
+
+def _load_benchmark_modules(path, benchmark_module_name_prefix, modules, ignored_modules):
+  if ignored_modules is None:
+    ignored_modules = []
+  
+  benchmark_modules = []
+  
+  for _unused, module_name, _unused in pkgutil.walk_packages(path=[path]):
+    if not module_name.split(".")[-1].startswith(benchmark_module_name_prefix):
+      continue
+    
+    if ((modules is None or any(module_name.startswith(module) for module in modules))
+        and not any(module_name.startswith(ignored_module) for ignored_module in ignored_modules)):
+      module = runtests.load_module(module_name)
+      if hasattr(module, "get_benchmarks"):
+        benchmark_modules.append(module)
+  
+  return benchmark_modules
+
+
+def _print_regressions(regressions, regression_threshold, output_stream):
+  if not regressions:
+    print("No regressions (threshold: {0:.0%})".format(regression_threshold), file=output_stream)
+    return
+  
+  print("Regressions (threshold: {0:.0%}):".format(regression_threshold), file=output_stream)
+  for benchmark_name, baseline_time, benchmark_time in regressions:
+    print(
+      "  {0}: {1:.6f} s -> {2:.6f} s (+{3:.0%})".format(
+        benchmark_name, baseline_time, benchmark_time, benchmark_time / baseline_time - 1),
+      file=output_stream)
+
+
+#===============================================================================
+
+
+def main():
+  parser = argparse.ArgumentParser(description="Run benchmarks and compare the results against a baseline.")
+  parser.add_argument("path", help="directory containing packages with benchmark modules")
+  parser.add_argument("--modules", nargs="*", help="prefixes of modules or packages to include")
+  parser.add_argument("--ignored-modules", nargs="*", help="prefixes of modules or packages to exclude")
+  parser.add_argument("--output", help="JSON file to save the results to")
+  parser.add_argument("--baseline", help="JSON file with results to compare against")
+  parser.add_argument(
+    "--threshold", type=float, default=DEFAULT_REGRESSION_THRESHOLD,
+    help="relative increase in time considered a regression")
+  parser.add_argument("--repeats", type=int, default=5, help="number of times each benchmark is run")
+  for parameter_name, default_value in sorted(DEFAULT_PARAMETERS.items()):
+    parser.add_argument(
+      "--" + parameter_name.replace("_", "-"), type=type(default_value), default=default_value)
+  
+  args = parser.parse_args()
+  
+  parameters = {parameter_name: getattr(args, parameter_name) for parameter_name in DEFAULT_PARAMETERS}
+  
+  _unused, regressions = run_benchmarks(
+    args.path, modules=args.modules, ignored_modules=args.ignored_modules, parameters=parameters,
+    num_repeats=args.repeats, output_filepath=args.output, baseline_filepath=args.baseline,
+    regression_threshold=args.threshold, output_stream=sys.stdout)
+  
+  sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+  main()
@@ -52,6 +52,13 @@ runtests.run_tests(path=plugins_path)
 
 
 The `_` is vital if you are using the `gettext` module for internationalization.
+
+Test modules can also be run in parallel from the command line via
+`run_tests_in_parallel` (see `--help`). Test modules are distributed across
+multiple Python worker processes. Modules that cannot be imported outside GIMP
+(or modules specified explicitly) are run in separate GIMP instances in batch
+mode (`gimp -i`). The results are aggregated and reported along with the
+slowest tests.
 """
 
 from __future__ import absolute_import
@@ -61,14 +68,32 @@ from __future__ import unicode_literals
 
 str = unicode
 
+import argparse
 import importlib
+import io
+import json
+import multiprocessing
+import os
 import pkgutil
+import shutil
+import subprocess
 import sys
+import tempfile
+import time
+import traceback
 import types
 import unittest
 
 #===============================================================================
 
+# Modules available when running inside GIMP, but possibly missing outside GIMP.
+GIMP_MODULE_NAMES = [
+  "gimp", "gimpenums", "gimpfu", "gimpplugin", "gimpshelf", "gimpui", "gobject", "gtk", "pango"]
+
+DEFAULT_NUM_SLOWEST_TESTS = 10
+
+#===============================================================================
+
 
 def _fix_streams_for_unittest():
   # In the GIMP Python-Fu console, `sys.stdout` and `sys.stderr` are missing
@@ -121,6 +146,13 @@ def run_tests(path, test_module_name_prefix="test_", modules=None, ignored_modul
   
   _fix_streams_for_unittest()
   
+  for module_name in _get_module_names(path, modules, ignored_modules):
+    module = load_module(module_name)
+    if module_name.split(".")[-1].startswith(test_module_name_prefix):
+      run_test(module, stream=output_stream)
+
+
+def _get_module_names(path, modules=None, ignored_modules=None):
   module_names = []
   
   if ignored_modules is None:
@@ -138,7 +170,349 @@ def run_tests(path, test_module_name_prefix="test_", modules=None, ignored_modul
     if should_append(module_name):
       module_names.append(module_name)
   
-  for module_name in module_names:
-    module = load_module(module_name)
-    if module_name.split(".")[-1].startswith(test_module_name_prefix):
-      run_test(module, stream=output_stream)
+  return module_names
+
+
+#===============================================================================
+
+
+def run_tests_in_parallel(path, test_module_name_prefix="test_", modules=None, ignored_modules=None,
+                          num_processes=None, gimp_modules=None, num_gimp_processes=1,
+                          gimp_executable="gimp", num_slowest_tests=DEFAULT_NUM_SLOWEST_TESTS,
+                          output_stream=sys.stderr):
+  """
+  Execute unit test modules located in the `path` directory in parallel. Return
+  a list of results for each module (see `run_module_tests`).
+  
+  Each test module is run in a separate Python worker process. Modules that
+  cannot be imported due to missing GIMP modules and modules matching the
+  prefixes in `gimp_modules` are run in GIMP instances in batch mode instead.
+  
+  Parameters:
+  
+  * `test_module_name_prefix`, `modules`, `ignored_modules` - See `run_tests`.
+  
+  * `num_processes` - Number of Python worker processes. If None, use the
+    number of CPUs. If 1, run the tests in the current process.
+  
+  * `num_gimp_processes` - Maximum number of GIMP instances running
+    simultaneously.
+  
+  * `gimp_executable` - Path to the GIMP executable.
+  
+  * `num_slowest_tests` - Number of the slowest tests to report.
+  
+  * `output_stream` - Stream to print the results to.
+  """
+  
+  if gimp_modules is None:
+    gimp_modules = []
+  
+  start_time = time.time()
+  
+  if path not in sys.path:
+    sys.path.insert(0, path)
+  
+  test_module_names = [
+    module_name for module_name in _get_module_names(path, modules, ignored_modules)
+    if module_name.split(".")[-1].startswith(test_module_name_prefix)]
+  
+  gimp_module_names = [
+    module_name for module_name in test_module_names
+    if any(module_name.startswith(gimp_module) for gimp_module in gimp_modules)]
+  
+  module_results = []
+  
+  python_module_names = [name for name in test_module_names if name not in gimp_module_names]
+  
+  # Daemonic processes (e.g. workers running this function from a test) are
+  # not allowed to create child processes.
+  if num_processes == 1 or multiprocessing.current_process().daemon:
+    pool = None
+    python_module_results = (run_module_tests(module_name) for module_name in python_module_names)
+  else:
+    pool = multiprocessing.Pool(num_processes)
+    python_module_results = pool.imap_unordered(run_module_tests, python_module_names)
+  
+  try:
+    for module_result in python_module_results:
+      if module_result["requires_gimp"]:
+        gimp_module_names.append(module_result["module"])
+      else:
+        _print_module_result(module_result, output_stream)
+        module_results.append(module_result)
+  finally:
+    if pool is not None:
+      pool.close()
+      pool.join()
+  
+  for module_result in _run_modules_in_gimp(path, gimp_module_names, num_gimp_processes, gimp_executable):
+    _print_module_result(module_result, output_stream)
+    module_results.append(module_result)
+  
+  _print_summary(module_results, time.time() - start_time, num_slowest_tests, output_stream)
+  
+  return module_results
+
+
+def run_module_tests(module_name):
+  """
+  Import the specified test module, run its tests and return the results as a
+  dictionary containing:
+  
+  * `"module"` - module name,
+  
+  * `"requires_gimp"` - True if the module could not be imported due to a
+    missing GIMP module, False otherwise,
+  
+  * `"error"` - formatted exception if the module could not be imported, None
+    otherwise,
+  
+  * `"tests"` - list of dictionaries containing the test name (`"name"`),
+    duration in seconds (`"duration"`), outcome (`"outcome"`) and formatted
+    exception or skip reason (`"details"`).
+  """
+  
+  module_result = {"module": module_name, "requires_gimp": False, "error": None, "tests": []}
+  
+  try:
+    module = importlib.import_module(module_name)
+  except ImportError as e:
+    if str(e).split(" ")[-1] in GIMP_MODULE_NAMES:
+      module_result["requires_gimp"] = True
+    else:
+      module_result["error"] = _to_unicode(traceback.format_exc())
+    return module_result
+  except Exception:
+    module_result["error"] = _to_unicode(traceback.format_exc())
+    return module_result
+  
+  test_result = _TimingTestResult()
+  unittest.TestLoader().loadTestsFromModule(module).run(test_result)
+  module_result["tests"] = test_result.test_results
+  
+  return module_result
+
+
+def run_module_tests_to_file(module_names, output_filepath):
+  """
+  Run tests from the specified modules (see `run_module_tests`) and save the
+  list of results to a JSON file. This function is invoked by GIMP instances in
+  batch mode.
+  """
+  
+  _fix_streams_for_unittest()
+  
+  module_results = [run_module_tests(module_name) for module_name in module_names]
+  
+  with io.open(output_filepath, "w", encoding="utf-8") as output_file:
+    output_file.write(str(json.dumps(module_results)))
+
+
+class _TimingTestResult(unittest.TestResult):
+  
+  def __init__(self):
+    super(_TimingTestResult, self).__init__()
+    
+    self.test_results = []
+    
+    self._start_time = None
+  
+  def startTest(self, test):
+    super(_TimingTestResult, self).startTest(test)
+    self._start_time = time.time()
+  
+  def addSuccess(self, test):
+    super(_TimingTestResult, self).addSuccess(test)
+    self._add_test_result(test, "success")
+  
+  def addFailure(self, test, err):
+    super(_TimingTestResult, self).addFailure(test, err)
+    self._add_test_result(test, "failure", self.failures[-1][1])
+  
+  def addError(self, test, err):
+    super(_TimingTestResult, self).addError(test, err)
+    self._add_test_result(test, "error", self.errors[-1][1])
+  
+  def addSkip(self, test, reason):
+    super(_TimingTestResult, self).addSkip(test, reason)
+    self._add_test_result(test, "skipped", reason)
+  
+  def addExpectedFailure(self, test, err):
+    super(_TimingTestResult, self).addExpectedFailure(test, err)
+    self._add_test_result(test, "expected_failure")
+  
+  def addUnexpectedSuccess(self, test):
+    super(_TimingTestResult, self).addUnexpectedSuccess(test)
+    self._add_test_result(test, "unexpected_success")
+  
+  def _add_test_result(self, test, outcome, details=None):
+    duration = time.time() - self._start_time if self._start_time is not None else 0.0
+    self.test_results.append(
+      {"name": str(test.id()), "duration": duration, "outcome": outcome,
+       "details": _to_unicode(details) if details is not None else None})
+
+
+def _to_unicode(str_):
+  return str_ if isinstance(str_, str) else str_.decode("utf-8", "replace")
+
+
+def _run_modules_in_gimp(path, module_names, num_gimp_processes, gimp_executable):
+  if not module_names:
+    return []
+  
+  temp_dirname = tempfile.mkdtemp()
+  
+  try:
+    gimp_processes = []
+    
+    for process_index in range(min(num_gimp_processes, len(module_names))):
+      process_module_names = module_names[process_index::num_gimp_processes]
+      output_filepath = os.path.join(temp_dirname, "results_{0}.json".format(process_index))
+      log_filepath = os.path.join(temp_dirname, "gimp_{0}.log".format(process_index))
+      
+      batch_command = (
+        "import sys; sys.path[:0] = [{0!r}, {1!r}]; import runtests; "
+        "runtests.run_module_tests_to_file({2!r}, {3!r})").format(
+          path, os.path.dirname(os.path.abspath(__file__)), process_module_names, output_filepath)
+      
+      with open(log_filepath, "wb") as log_file:
+        try:
+          gimp_process = subprocess.Popen(
+            [arg.encode(sys.getfilesystemencoding() or "utf-8")
+             for arg in [gimp_executable, "-i", "--batch-interpreter", "python-fu-eval",
+                         "-b", batch_command, "-b", "pdb.gimp_quit(1)"]],
+            stdout=log_file, stderr=subprocess.STDOUT)
+        except OSError:
+          gimp_process = None
+      
+      gimp_processes.append((gimp_process, process_module_names, output_filepath, log_filepath))
+    
+    module_results = []
+    for gimp_process, process_module_names, output_filepath, log_filepath in gimp_processes:
+      module_results.extend(
+        _get_module_results_from_gimp(
+          gimp_process, process_module_names, output_filepath, log_filepath, gimp_executable))
+    
+    return module_results
+  finally:
+    shutil.rmtree(temp_dirname)
+
+
+def _get_module_results_from_gimp(gimp_process, module_names, output_filepath, log_filepath, gimp_executable):
+  if gimp_process is None:
+    error = "GIMP executable '{0}' could not be run".format(gimp_executable)
+  else:
+    gimp_process.wait()
+    
+    if os.path.isfile(output_filepath):
+      with io.open(output_filepath, "r", encoding="utf-8") as output_file:
+        return json.load(output_file)
+    
+    with io.open(log_filepath, "r", encoding="utf-8", errors="replace") as log_file:
+      error = "GIMP did not produce test results, output:\n{0}".format(log_file.read())
+  
+  return [
+    {"module": module_name, "requires_gimp": True, "error": error, "tests": []}
+    for module_name in module_names]
+
+
+def _print_module_result(module_result, output_stream):
+  if module_result["error"] is not None:
+    status = "ERROR"
+  elif any(test["outcome"] in ["failure", "error", "unexpected_success"] for test in module_result["tests"]):
+    status = "FAILED"
+  else:
+    status = "OK"
+  
+  print(
+    "{0}{1}: {2} ({3} tests, {4:.3f} s)".format(
+      module_result["module"], " [GIMP]" if module_result["requires_gimp"] else "", status,
+      len(module_result["tests"]), sum(test["duration"] for test in module_result["tests"])),
+    file=output_stream)
+
+
+def _print_summary(module_results, elapsed_time, num_slowest_tests, output_stream):
+  test_results = [test for module_result in module_results for test in module_result["tests"]]
+  
+  separator = "=" * 70
+  
+  for module_result in module_results:
+    if module_result["error"] is not None:
+      print(separator, file=output_stream)
+      print("ERROR: {0}".format(module_result["module"]), file=output_stream)
+      print(module_result["error"], file=output_stream)
+  
+  for test in test_results:
+    if test["outcome"] in ["failure", "error"]:
+      print(separator, file=output_stream)
+      print("{0}: {1}".format(test["outcome"].upper(), test["name"]), file=output_stream)
+      print(test["details"], file=output_stream)
+  
+  if num_slowest_tests > 0 and test_results:
+    print("\nSlowest tests:", file=output_stream)
+    for test in sorted(test_results, key=lambda test: test["duration"], reverse=True)[:num_slowest_tests]:
+      print("  {0:.3f} s  {1}".format(test["duration"], test["name"]), file=output_stream)
+  
+  print(
+    "\nRan {0} tests in {1} modules in {2:.3f} s".format(len(test_results), len(module_results), elapsed_time),
+    file=output_stream)
+  
+  num_problems = {
+    "failures": sum(1 for test in test_results if test["outcome"] == "failure"),
+    "errors": sum(1 for test in test_results if test["outcome"] == "error"),
+    "module errors": sum(1 for module_result in module_results if module_result["error"] is not None),
+    "skipped": sum(1 for test in test_results if test["outcome"] == "skipped"),
+    "unexpected successes": sum(1 for test in test_results if test["outcome"] == "unexpected_success"),
+  }
+  
+  problems_str = ", ".join(
+    "{0}={1}".format(key, value) for key, value in sorted(num_problems.items()) if value)
+  
+  print(
+    "{0}{1}".format("OK" if is_successful(module_results) else "FAILED", " ({0})".format(problems_str) if problems_str else ""),
+    file=output_stream)
+
+
+def is_successful(module_results):
+  """
+  Return True if all modules were imported and no test failed, False
+  otherwise.
+  """
+  
+  return all(
+    module_result["error"] is None
+    and all(test["outcome"] not in ["failure", "error", "unexpected_success"]
+            for test in module_result["tests"])
+    for module_result in module_results)
+
+
+#===============================================================================
+
+
+def main():
+  parser = argparse.ArgumentParser(description="Run unit tests in parallel.")
+  parser.add_argument("path", help="directory containing packages with test modules")
+  parser.add_argument("--modules", nargs="*", help="prefixes of modules or packages to include")
+  parser.add_argument("--ignored-modules", nargs="*", help="prefixes of modules or packages to exclude")
+  parser.add_argument(
+    "--processes", type=int, default=None, help="number of Python worker processes (default: number of CPUs)")
+  parser.add_argument(
+    "--gimp-modules", nargs="*", help="prefixes of modules or packages to always run in GIMP")
+  parser.add_argument("--gimp-processes", type=int, default=1, help="number of GIMP instances")
+  parser.add_argument("--gimp-executable", default="gimp", help="path to the GIMP executable")
+  parser.add_argument(
+    "--slowest", type=int, default=DEFAULT_NUM_SLOWEST_TESTS, help="number of the slowest tests to report")
+  
+  args = parser.parse_args()
+  
+  module_results = run_tests_in_parallel(
+    args.path, modules=args.modules, ignored_modules=args.ignored_modules, num_processes=args.processes,
+    gimp_modules=args.gimp_modules, num_gimp_processes=args.gimp_processes,
+    gimp_executable=args.gimp_executable, num_slowest_tests=args.slowest)
+  
+  sys.exit(0 if is_successful(module_results) else 1)
+
+
+if __name__ == "__main__":
+  main()
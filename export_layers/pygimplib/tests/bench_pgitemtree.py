@@ -0,0 +1,195 @@
+#
+# This file is part of pygimplib.
+#
+# Copyright (C) 2014-2016 khalim19 <khalim19@gmail.com>
+#
+# pygimplib is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pygimplib is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pygimplib.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+This module compares memory usage and time of construction and iteration of
+item trees created with the default and the compact storage of item tree
+elements.
+
+To run the benchmark in GIMP, run the following in the Python-Fu console
+(see `runtests` for setting up the paths):
+
+
+from pygimplib.tests import bench_pgitemtree
+bench_pgitemtree.run_benchmark()
+
+
+Outside GIMP, the benchmark can be run as a module, provided that the `gimp`
+module can be imported.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+str = unicode
+
+import gc
+import sys
+import timeit
+import types
+
+from ..lib import mock
+
+from . import gimpstubs
+from .. import pgitemtree
+
+#===============================================================================
+
+LIB_NAME = ".".join(__name__.split(".")[:-2])
+
+#===============================================================================
+
+
+def create_image(num_groups, num_layers_per_group, depth):
+  """
+  Create an image stub containing `num_groups` layer groups at each of the
+  `depth` levels, each group containing `num_layers_per_group` layers.
+  """
+  
+  image = gimpstubs.ImageStub()
+  
+  parents = [image]
+  for level in range(depth):
+    new_parents = []
+    for parent_index, parent in enumerate(parents):
+      for group_index in range(num_groups):
+        group = gimpstubs.LayerGroupStub("group {0}-{1}-{2}".format(level, parent_index, group_index))
+        for layer_index in range(num_layers_per_group):
+          group.layers.append(gimpstubs.LayerStub("layer {0}".format(layer_index)))
+        parent.layers.append(group)
+        new_parents.append(group)
+    parents = new_parents
+  
+  return image
+
+
+def get_deep_size(obj, excluded_types=(gimpstubs.ParasiteFunctionsStub,)):
+  """
+  Return the approximate size of `obj` in bytes, including all objects
+  referenced by `obj`. Objects of types in `excluded_types` (e.g. wrapped GIMP
+  items), classes, functions and modules are not counted.
+  """
+  
+  ignored_types = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType) + excluded_types
+  
+  size = 0
+  seen_object_ids = set()
+  objects = [obj]
+  
+  while objects:
+    obj = objects.pop()
+    if id(obj) in seen_object_ids or isinstance(obj, ignored_types):
+      continue
+    
+    seen_object_ids.add(id(obj))
+    size += sys.getsizeof(obj)
+    objects.extend(gc.get_referents(obj))
+  
+  return size
+
+
+@mock.patch(LIB_NAME + ".pgitemtree.pdb", new=gimpstubs.PdbStub())
+@mock.patch(LIB_NAME + ".pgitemtree.gimp.GroupLayer", new=gimpstubs.LayerGroupStub)
+def run_benchmark(num_groups=10, num_layers_per_group=20, depth=3, num_repeats=3, output_stream=sys.stdout):
+  """
+  Print the construction time, iteration time and approximate memory usage of
+  item trees with the default and the compact storage.
+  """
+  
+  image = create_image(num_groups, num_layers_per_group, depth)
+  
+  def _iterate(layer_tree):
+    for layer_elem in layer_tree:
+      layer_elem.name
+      layer_elem.item_type
+      layer_elem.path_visible
+      layer_elem.get_path_components()
+  
+  results = []
+  
+  for compact in [False, True]:
+    layer_tree = pgitemtree.LayerTree(image, compact=compact)
+    
+    construction_time = min(timeit.repeat(
+      lambda: pgitemtree.LayerTree(image, compact=compact), repeat=num_repeats, number=1))
+    iteration_time = min(timeit.repeat(lambda: _iterate(layer_tree), repeat=num_repeats, number=1))
+    size = get_deep_size(layer_tree._itemtree)
+    
+    results.append((compact, len(layer_tree), construction_time, iteration_time, size))
+  
+  for compact, num_items, construction_time, iteration_time, size in results:
+    print(
+      "{0:<8} items: {1}, construction: {2:.3f} s, iteration: {3:.3f} s, memory: {4:.1f} KiB".format(
+        "compact" if compact else "default", num_items, construction_time, iteration_time, size / 1024),
+      file=output_stream)
+  
+  return results
+
+
+def get_benchmarks(num_layers, depth, duplicate_name_ratio, tag_density, **kwargs):
+  """
+  Return benchmarks of item tree construction, filtered iteration and name
+  uniquification for `runbenchmarks`.
+  """
+  
+  image = gimpstubs.create_image(
+    num_layers, depth=depth, duplicate_name_ratio=duplicate_name_ratio, tag_density=tag_density)
+  
+  def _has_no_tags(layer_elem):
+    return not layer_elem.tags
+  
+  def _is_path_visible(layer_elem):
+    return layer_elem.path_visible
+  
+  @mock.patch(LIB_NAME + ".pgitemtree.pdb", new=gimpstubs.PdbStub())
+  @mock.patch(LIB_NAME + ".pgitemtree.gimp.GroupLayer", new=gimpstubs.LayerGroupStub)
+  def _create_layer_tree(compact=False):
+    return pgitemtree.LayerTree(image, is_filtered=True, compact=compact)
+  
+  def _iterate_filtered(layer_tree):
+    layer_tree.filter.add_rule(_is_path_visible)
+    layer_tree.filter.add_rule(_has_no_tags)
+    try:
+      for _unused in layer_tree:
+        pass
+    finally:
+      layer_tree.reset_filter()
+  
+  def _uniquify_names(layer_tree):
+    layer_tree.reset_item_elements()
+    for layer_elem in layer_tree:
+      layer_tree.uniquify_name(layer_elem)
+  
+  layer_tree = _create_layer_tree()
+  
+  return {
+    "layer_tree_construction": _create_layer_tree,
+    "layer_tree_construction_compact": lambda: _create_layer_tree(compact=True),
+    "object_filter_iteration": lambda: _iterate_filtered(layer_tree),
+    "uniquify_name": lambda: _uniquify_names(layer_tree),
+  }
+
+
+#===============================================================================
+
+
+if __name__ == "__main__":
+  run_benchmark()
@@ -0,0 +1,72 @@
+#
+# This file is part of pygimplib.
+#
+# Copyright (C) 2014-2016 khalim19 <khalim19@gmail.com>
+#
+# pygimplib is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pygimplib is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pygimplib.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+This module contains benchmarks of string and filename functions applied to
+layer names, run via `runbenchmarks`.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+str = unicode
+
+from . import gimpstubs
+from .. import pgpath
+
+#===============================================================================
+
+
+def get_benchmarks(num_layers, duplicate_name_ratio, **kwargs):
+  """
+  Return benchmarks of filename validation, filename pattern generation and
+  file extension parsing for the names of `num_layers` layers.
+  """
+  
+  image = gimpstubs.create_image(num_layers, duplicate_name_ratio=duplicate_name_ratio)
+  
+  # Add file extensions (some invalid for filenames) to every other name.
+  layer_names = [
+    layer.name.decode() + (".png" if index % 4 == 0 else ".<jpg>" if index % 4 == 2 else "")
+    for index, layer in enumerate(image.layers)]
+  
+  def _validate_filenames():
+    for layer_name in layer_names:
+      pgpath.FilenameValidator.validate(layer_name)
+  
+  def _generate_filenames():
+    current_layer_name = [None]
+    pattern_generator = pgpath.StringPatternGenerator(
+      "image_[001]_[layer name]", fields={"layer name": lambda: current_layer_name[0]})
+    
+    for layer_name in layer_names:
+      current_layer_name[0] = layer_name
+      pattern_generator.generate()
+  
+  def _get_file_extensions():
+    for layer_name in layer_names:
+      pgpath.get_file_extension(layer_name)
+  
+  return {
+    "filename_validator_validate": _validate_filenames,
+    "string_pattern_generator_generate": _generate_filenames,
+    "get_file_extension": _get_file_extensions,
+  }
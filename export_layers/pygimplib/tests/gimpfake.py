@@ -0,0 +1,958 @@
+#
+# This file is part of pygimplib.
+#
+# Copyright (C) 2014-2016 khalim19 <khalim19@gmail.com>
+#
+# pygimplib is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pygimplib is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pygimplib.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+This module provides an in-memory fake of the GIMP Python API whose images and
+layers hold actual pixels stored in NumPy arrays. Unlike `gimpstubs`, the fake
+allows running code manipulating layer contents (e.g. `LayerExporter`)
+end-to-end without GIMP.
+
+Only the subset of the GIMP API used by the plug-in is implemented:
+* images and layers (including layer groups) with the most common attributes,
+* PDB procedures inserting, copying, removing, reordering, merging, cropping,
+  resizing and scaling layers and images,
+* saving to and loading from PNG files, saving to raw image data files.
+
+Layers are always RGBA. Layer modes other than the normal mode are composited
+as the normal mode. Calling a PDB procedure that is not implemented raises
+`AttributeError`.
+
+Use the `installed` context manager to replace the GIMP modules with the fake:
+
+
+from export_layers.pygimplib.tests import gimpfake
+
+with gimpfake.installed() as gimp:
+  from export_layers import exportlayers
+  image = gimpfake.create_image(...)
+  ...
+
+
+The modules of the plug-in package are imported again within the `with` block
+so that they use the fake. If PyGObject is not installed, a minimal fake
+`gobject` module is installed as well.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+str = unicode
+
+import contextlib
+import itertools
+import os
+import random
+import struct
+import sys
+import tempfile
+import types
+import zlib
+
+import numpy
+
+from . import gimpstubs
+from . import importtime
+
+#===============================================================================
+
+PACKAGE_NAME = __name__.split(".")[0]
+
+#===============================================================================
+
+
+def _create_gimpenums_module():
+  gimpenums = types.ModuleType(b"gimpenums")
+  
+  constants = {
+    "RUN_INTERACTIVE": 0,
+    "RUN_NONINTERACTIVE": 1,
+    "RUN_WITH_LAST_VALS": 2,
+    "RGB": 0,
+    "GRAY": 1,
+    "INDEXED": 2,
+    "RGB_IMAGE": 0,
+    "RGBA_IMAGE": 1,
+    "NORMAL_MODE": 0,
+    "DIFFERENCE_MODE": 6,
+    "EXPAND_AS_NECESSARY": 0,
+    "CLIP_TO_IMAGE": 1,
+    "CLIP_TO_BOTTOM_LAYER": 2,
+    "ADD_ALPHA_MASK": 2,
+    "MASK_APPLY": 0,
+    "MASK_DISCARD": 1,
+    "WHITE_FILL": 2,
+    "INTERPOLATION_NONE": 0,
+    "HISTOGRAM_VALUE": 0,
+    "ERROR_CONSOLE": 2,
+    "PARASITE_PERSISTENT": 1,
+    "PARASITE_UNDOABLE": 2,
+    "PLUGIN": 1,
+  }
+  
+  pdb_types = [
+    "PDB_INT32", "PDB_INT16", "PDB_INT8", "PDB_FLOAT", "PDB_STRING", "PDB_INT32ARRAY", "PDB_INT16ARRAY",
+    "PDB_INT8ARRAY", "PDB_FLOATARRAY", "PDB_STRINGARRAY", "PDB_COLOR", "PDB_ITEM", "PDB_DISPLAY",
+    "PDB_IMAGE", "PDB_LAYER", "PDB_CHANNEL", "PDB_DRAWABLE", "PDB_SELECTION", "PDB_COLORARRAY",
+    "PDB_VECTORS", "PDB_PARASITE", "PDB_STATUS"]
+  constants.update({pdb_type: value for value, pdb_type in enumerate(pdb_types)})
+  
+  for name, value in constants.items():
+    setattr(gimpenums, name.encode(), value)
+  
+  return gimpenums
+
+
+gimpenums = _create_gimpenums_module()
+
+_item_ids = itertools.count(1)
+_image_ids = itertools.count(1)
+
+#===============================================================================
+
+
+class FakeImage(gimpstubs.ParasiteFunctionsStub):
+  
+  """
+  This class is a fake of `gimp.Image`.
+  """
+  
+  def __init__(self, width, height, base_type=gimpenums.RGB):
+    super(FakeImage, self).__init__()
+    
+    self.ID = next(_image_ids)
+    self.width = width
+    self.height = height
+    self.base_type = base_type
+    self.layers = []
+    self.active_layer = None
+    self.name = b"Untitled"
+    self.filename = None
+    self.uri = None
+    self.valid = True
+    self.resolution = (72.0, 72.0)
+    self.unit = 0
+  
+  @property
+  def children(self):
+    return self.layers
+
+
+class FakeLayer(gimpstubs.ParasiteFunctionsStub):
+  
+  """
+  This class is a fake of `gimp.Layer`. Pixels are stored in the `pixels`
+  attribute as a NumPy array of shape (height, width, 4) with RGBA values.
+  """
+  
+  def __init__(self, image, name, width, height, type_=gimpenums.RGBA_IMAGE, opacity=100.0,
+               mode=gimpenums.NORMAL_MODE):
+    super(FakeLayer, self).__init__()
+    
+    self.ID = next(_item_ids)
+    self.image = image
+    self.parent = None
+    self.name = name.encode() if isinstance(name, str) else name
+    self.type = type_
+    self.opacity = opacity
+    self.mode = mode
+    self.visible = True
+    self.linked = False
+    self.valid = True
+    self.mask = None
+    self.pixels = numpy.zeros((height, width, 4), dtype=numpy.uint8)
+    self._offsets = (0, 0)
+  
+  @property
+  def width(self):
+    return self.pixels.shape[1]
+  
+  @property
+  def height(self):
+    return self.pixels.shape[0]
+  
+  @property
+  def offsets(self):
+    return self._offsets
+  
+  @property
+  def bpp(self):
+    return 4
+  
+  @property
+  def has_alpha(self):
+    return True
+  
+  @property
+  def is_rgb(self):
+    return True
+  
+  @property
+  def is_gray(self):
+    return False
+  
+  @property
+  def is_indexed(self):
+    return False
+  
+  @property
+  def children(self):
+    return []
+  
+  @property
+  def tattoo(self):
+    return self.ID
+  
+  def set_offsets(self, offset_x, offset_y):
+    self._offsets = (offset_x, offset_y)
+  
+  def get_pixel_rgn(self, x, y, width, height, dirty=True, shadow=False):
+    return FakePixelRegion(self, x, y, width, height)
+  
+  def flush(self):
+    pass
+  
+  def update(self, x, y, width, height):
+    pass
+  
+  def _get_bounds(self):
+    return self._offsets[0], self._offsets[1], self.width, self.height
+  
+  def _get_projection(self):
+    return self.pixels
+  
+  def _copy(self, image):
+    layer_copy = FakeLayer(image, self.name + b" copy", 0, 0, self.type, self.opacity, self.mode)
+    layer_copy.visible = self.visible
+    layer_copy.pixels = self.pixels.copy()
+    layer_copy.set_offsets(*self._offsets)
+    return layer_copy
+  
+  def _scale(self, scale_x, scale_y):
+    new_width = max(int(round(self.width * scale_x)), 1)
+    new_height = max(int(round(self.height * scale_y)), 1)
+    
+    # Nearest-neighbor interpolation
+    rows = numpy.minimum((numpy.arange(new_height) / scale_y).astype(numpy.intp), self.height - 1)
+    columns = numpy.minimum((numpy.arange(new_width) / scale_x).astype(numpy.intp), self.width - 1)
+    self.pixels = self.pixels[rows][:, columns]
+    
+    self._offsets = (int(round(self._offsets[0] * scale_x)), int(round(self._offsets[1] * scale_y)))
+
+
+class FakeLayerGroup(FakeLayer):
+  
+  """
+  This class is a fake of `gimp.GroupLayer`. The size and offsets of the group
+  are determined by its children.
+  """
+  
+  def __init__(self, image, name=b""):
+    super(FakeLayerGroup, self).__init__(image, name, 0, 0)
+    
+    self.layers = []
+  
+  @property
+  def children(self):
+    return self.layers
+  
+  @property
+  def width(self):
+    return self._get_bounds()[2]
+  
+  @property
+  def height(self):
+    return self._get_bounds()[3]
+  
+  @property
+  def offsets(self):
+    return self._get_bounds()[:2]
+  
+  def set_offsets(self, offset_x, offset_y):
+    orig_offset_x, orig_offset_y = self.offsets
+    for layer in self.layers:
+      layer.set_offsets(
+        layer.offsets[0] + offset_x - orig_offset_x, layer.offsets[1] + offset_y - orig_offset_y)
+  
+  def _get_bounds(self):
+    if not self.layers:
+      return 0, 0, 1, 1
+    
+    return _get_union_bounds([layer._get_bounds() for layer in self.layers])
+  
+  def _get_projection(self):
+    return _composite(self.layers, self._get_bounds())
+  
+  def _copy(self, image):
+    group_copy = FakeLayerGroup(image, self.name + b" copy")
+    group_copy.visible = self.visible
+    group_copy.opacity = self.opacity
+    group_copy.mode = self.mode
+    
+    for layer in self.layers:
+      child_copy = layer._copy(image)
+      child_copy.name = layer.name
+      child_copy.parent = group_copy
+      group_copy.layers.append(child_copy)
+    
+    return group_copy
+  
+  def _scale(self, scale_x, scale_y):
+    for layer in self.layers:
+      layer._scale(scale_x, scale_y)
+
+
+class FakePixelRegion(object):
+  
+  """
+  This class is a fake of `gimp.PixelRgn`. Slices are in layer coordinates and
+  pixel data are returned as a string of bytes, as in GIMP.
+  """
+  
+  def __init__(self, layer, x, y, width, height):
+    self._layer = layer
+    self.x = x
+    self.y = y
+    self.w = width
+    self.h = height
+    self.bpp = layer.bpp
+  
+  def __getitem__(self, slices):
+    slice_x, slice_y = slices
+    return self._layer.pixels[slice_y, slice_x].tobytes()
+  
+  def __setitem__(self, slices, data):
+    slice_x, slice_y = slices
+    region = self._layer.pixels[slice_y, slice_x]
+    region[...] = numpy.frombuffer(data, dtype=numpy.uint8).reshape(region.shape)
+
+
+#===============================================================================
+
+
+def _get_union_bounds(bounds_list):
+  x1 = min(bounds[0] for bounds in bounds_list)
+  y1 = min(bounds[1] for bounds in bounds_list)
+  x2 = max(bounds[0] + bounds[2] for bounds in bounds_list)
+  y2 = max(bounds[1] + bounds[3] for bounds in bounds_list)
+  
+  return x1, y1, x2 - x1, y2 - y1
+
+
+def _composite(layers, bounds):
+  """
+  Composite visible layers (ordered from top to bottom as in GIMP) into a new
+  RGBA array covering `bounds` (x, y, width, height).
+  """
+  
+  x, y, width, height = bounds
+  result = numpy.zeros((height, width, 4), dtype=numpy.float32)
+  
+  for layer in reversed(layers):
+    if not layer.visible:
+      continue
+    
+    layer_x, layer_y, layer_width, layer_height = layer._get_bounds()
+    
+    dest_x1, dest_y1 = max(layer_x, x), max(layer_y, y)
+    dest_x2, dest_y2 = min(layer_x + layer_width, x + width), min(layer_y + layer_height, y + height)
+    if dest_x1 >= dest_x2 or dest_y1 >= dest_y2:
+      continue
+    
+    src = layer._get_projection()[
+      dest_y1 - layer_y:dest_y2 - layer_y, dest_x1 - layer_x:dest_x2 - layer_x].astype(numpy.float32) / 255
+    dest = result[dest_y1 - y:dest_y2 - y, dest_x1 - x:dest_x2 - x]
+    
+    src_alpha = src[..., 3:] * (layer.opacity / 100.0)
+    dest_alpha = dest[..., 3:]
+    result_alpha = src_alpha + dest_alpha * (1 - src_alpha)
+    
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+      result_color = numpy.where(
+        result_alpha > 0,
+        (src[..., :3] * src_alpha + dest[..., :3] * dest_alpha * (1 - src_alpha)) / result_alpha,
+        0)
+    
+    dest[..., :3] = result_color
+    dest[..., 3:] = result_alpha
+  
+  return numpy.around(result * 255).astype(numpy.uint8)
+
+
+def _get_parent_layers(image, parent):
+  return parent.layers if parent is not None else image.layers
+
+
+def _iterate_layers(layers):
+  for layer in layers:
+    yield layer
+    for child in _iterate_layers(layer.children):
+      yield child
+
+
+#===============================================================================
+
+
+class FakePdb(object):
+  
+  """
+  This class is a fake of `gimp.pdb` implementing PDB procedures used by the
+  plug-in.
+  """
+  
+  _SAVE_PROCEDURES = ["gimp_file_save", "file_png_save2", "file_png_save_defaults", "file_raw_save"]
+  
+  def __init__(self):
+    self._images = []
+  
+  def __getattr__(self, name):
+    raise AttributeError("PDB procedure '{0}' is not implemented in the fake".format(name))
+  
+  @property
+  def images(self):
+    return [image for image in self._images if image.valid]
+  
+  #-----------------------------------------------------------------------------
+  # Images
+  
+  def gimp_image_new(self, width, height, image_type):
+    image = FakeImage(width, height, image_type)
+    self._images.append(image)
+    return image
+  
+  def gimp_image_duplicate(self, image):
+    image_copy = self.gimp_image_new(image.width, image.height, image.base_type)
+    image_copy.resolution = image.resolution
+    image_copy.unit = image.unit
+    
+    for name in image.parasite_list():
+      image_copy.parasite_attach(image.parasite_find(name))
+    
+    for layer in image.layers:
+      layer_copy = layer._copy(image_copy)
+      layer_copy.name = layer.name
+      image_copy.layers.append(layer_copy)
+    
+    return image_copy
+  
+  def gimp_image_delete(self, image):
+    image.valid = False
+    for layer in _iterate_layers(image.layers):
+      layer.valid = False
+  
+  def gimp_image_is_valid(self, image):
+    return image is not None and image.valid
+  
+  def gimp_image_get_resolution(self, image):
+    return image.resolution
+  
+  def gimp_image_set_resolution(self, image, x_resolution, y_resolution):
+    image.resolution = (x_resolution, y_resolution)
+  
+  def gimp_image_get_unit(self, image):
+    return image.unit
+  
+  def gimp_image_set_unit(self, image, unit):
+    image.unit = unit
+  
+  def gimp_image_get_parasite_list(self, image):
+    parasite_names = image.parasite_list()
+    return len(parasite_names), parasite_names
+  
+  def gimp_image_undo_freeze(self, image):
+    pass
+  
+  def gimp_image_undo_thaw(self, image):
+    pass
+  
+  def gimp_image_undo_group_start(self, image):
+    pass
+  
+  def gimp_image_undo_group_end(self, image):
+    pass
+  
+  def gimp_image_resize(self, image, width, height, offset_x, offset_y):
+    image.width = width
+    image.height = height
+    
+    for layer in image.layers:
+      layer.set_offsets(layer.offsets[0] + offset_x, layer.offsets[1] + offset_y)
+  
+  def gimp_image_resize_to_layers(self, image):
+    if not image.layers:
+      return
+    
+    offset_x, offset_y, image.width, image.height = _get_union_bounds(
+      [layer._get_bounds() for layer in image.layers])
+    
+    for layer in image.layers:
+      layer.set_offsets(layer.offsets[0] - offset_x, layer.offsets[1] - offset_y)
+  
+  def gimp_image_scale(self, image, width, height):
+    scale_x, scale_y = width / image.width, height / image.height
+    
+    image.width = width
+    image.height = height
+    
+    for layer in image.layers:
+      layer._scale(scale_x, scale_y)
+  
+  #-----------------------------------------------------------------------------
+  # Layers
+  
+  def gimp_layer_new(self, image, width, height, type_, name, opacity, mode):
+    return FakeLayer(image, name, width, height, type_, opacity, mode)
+  
+  def gimp_layer_group_new(self, image):
+    return FakeLayerGroup(image)
+  
+  def gimp_layer_new_from_drawable(self, drawable, image):
+    return drawable._copy(image)
+  
+  def gimp_layer_copy(self, layer, add_alpha):
+    return layer._copy(layer.image)
+  
+  def gimp_image_insert_layer(self, image, layer, parent, position):
+    layer.image = image
+    layer.parent = parent
+    _get_parent_layers(image, parent).insert(max(position, 0), layer)
+    
+    if image.active_layer is None:
+      image.active_layer = layer
+  
+  def gimp_image_remove_layer(self, image, layer):
+    _get_parent_layers(image, layer.parent).remove(layer)
+    
+    for item in _iterate_layers([layer]):
+      item.valid = False
+    
+    if image.active_layer is layer:
+      image.active_layer = image.layers[0] if image.layers else None
+  
+  def gimp_image_get_item_position(self, image, item):
+    return _get_parent_layers(image, item.parent).index(item)
+  
+  def gimp_image_reorder_item(self, image, item, parent, position):
+    _get_parent_layers(image, item.parent).remove(item)
+    item.parent = parent
+    _get_parent_layers(image, parent).insert(max(position, 0), item)
+  
+  def gimp_item_is_group(self, item):
+    return isinstance(item, FakeLayerGroup)
+  
+  def gimp_item_is_valid(self, item):
+    return item is not None and item.valid
+  
+  def gimp_item_delete(self, item):
+    for layer in _iterate_layers([item]):
+      layer.valid = False
+  
+  def gimp_item_set_visible(self, item, visible):
+    item.visible = visible
+  
+  def gimp_drawable_has_alpha(self, drawable):
+    return drawable.has_alpha
+  
+  def gimp_layer_set_offsets(self, layer, offset_x, offset_y):
+    layer.set_offsets(offset_x, offset_y)
+  
+  def gimp_layer_resize_to_image_size(self, layer):
+    image = layer.image
+    offset_x, offset_y = layer.offsets
+    
+    pixels = numpy.zeros((image.height, image.width, 4), dtype=numpy.uint8)
+    
+    dest_x1, dest_y1 = max(offset_x, 0), max(offset_y, 0)
+    dest_x2, dest_y2 = min(offset_x + layer.width, image.width), min(offset_y + layer.height, image.height)
+    if dest_x1 < dest_x2 and dest_y1 < dest_y2:
+      pixels[dest_y1:dest_y2, dest_x1:dest_x2] = layer.pixels[
+        dest_y1 - offset_y:dest_y2 - offset_y, dest_x1 - offset_x:dest_x2 - offset_x]
+    
+    layer.pixels = pixels
+    layer.set_offsets(0, 0)
+  
+  def gimp_image_merge_visible_layers(self, image, merge_type):
+    visible_layers = [layer for layer in image.layers if layer.visible]
+    if not visible_layers:
+      raise RuntimeError("procedure 'gimp-image-merge-visible-layers' returned no return values")
+    
+    bottom_layer = visible_layers[-1]
+    
+    if merge_type == gimpenums.CLIP_TO_IMAGE:
+      bounds = (0, 0, image.width, image.height)
+    elif merge_type == gimpenums.CLIP_TO_BOTTOM_LAYER:
+      bounds = bottom_layer._get_bounds()
+    else:
+      bounds = _get_union_bounds([layer._get_bounds() for layer in visible_layers])
+    
+    merged_layer = FakeLayer(image, bottom_layer.name, 0, 0)
+    merged_layer.pixels = _composite(visible_layers, bounds)
+    merged_layer.set_offsets(bounds[0], bounds[1])
+    
+    image.layers[image.layers.index(bottom_layer)] = merged_layer
+    for layer in visible_layers[:-1]:
+      self.gimp_image_remove_layer(image, layer)
+    for item in _iterate_layers([bottom_layer]):
+      item.valid = False
+    
+    image.active_layer = merged_layer
+    
+    return merged_layer
+  
+  def plug_in_autocrop_layer(self, image, layer, run_mode=gimpenums.RUN_NONINTERACTIVE):
+    nonempty_rows = numpy.flatnonzero(layer.pixels[..., 3].any(axis=1))
+    nonempty_columns = numpy.flatnonzero(layer.pixels[..., 3].any(axis=0))
+    if not len(nonempty_rows) or not len(nonempty_columns):
+      return
+    
+    y1, y2 = nonempty_rows[0], nonempty_rows[-1] + 1
+    x1, x2 = nonempty_columns[0], nonempty_columns[-1] + 1
+    
+    layer.pixels = layer.pixels[y1:y2, x1:x2].copy()
+    layer.set_offsets(layer.offsets[0] + int(x1), layer.offsets[1] + int(y1))
+  
+  #-----------------------------------------------------------------------------
+  # Files
+  
+  def gimp_procedural_db_proc_exists(self, procedure_name):
+    return procedure_name in self._SAVE_PROCEDURES
+  
+  def gimp_file_save(self, image, drawable, filename, raw_filename, run_mode=gimpenums.RUN_NONINTERACTIVE):
+    file_extension = os.path.splitext(filename)[1].lower()
+    
+    if file_extension == b".png":
+      write_png(filename, drawable.pixels)
+    elif file_extension in [b".raw", b".data"]:
+      self.file_raw_save(image, drawable, filename, raw_filename, run_mode=run_mode)
+    else:
+      raise RuntimeError("Unknown file type")
+  
+  def file_png_save_defaults(self, image, drawable, filename, raw_filename,
+                             run_mode=gimpenums.RUN_NONINTERACTIVE):
+    write_png(filename, drawable.pixels)
+  
+  def file_png_save2(self, image, drawable, filename, raw_filename, interlace, compression, *args, **kwargs):
+    write_png(filename, drawable.pixels, compression)
+  
+  def file_raw_save(self, image, drawable, filename, raw_filename, run_mode=gimpenums.RUN_NONINTERACTIVE):
+    with open(filename, "wb") as file_:
+      file_.write(drawable.pixels.tostring())
+  
+  def gimp_file_load(self, filename, raw_filename, run_mode=gimpenums.RUN_NONINTERACTIVE):
+    pixels = read_png(filename)
+    
+    image = self.gimp_image_new(pixels.shape[1], pixels.shape[0], gimpenums.RGB)
+    image.filename = filename
+    image.name = os.path.basename(filename)
+    
+    layer = FakeLayer(image, image.name, 0, 0)
+    layer.pixels = pixels
+    self.gimp_image_insert_layer(image, layer, None, 0)
+    
+    return image
+  
+  #-----------------------------------------------------------------------------
+  # Miscellaneous
+  
+  def gimp_context_push(self):
+    pass
+  
+  def gimp_context_pop(self):
+    pass
+  
+  def gimp_displays_flush(self):
+    pass
+
+
+#===============================================================================
+
+
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# key: PNG color type; value: number of channels
+_PNG_COLOR_TYPE_CHANNELS = {0: 1, 2: 3, 4: 2, 6: 4}
+
+
+def write_png(filename, pixels, compression=6):
+  """
+  Write an RGBA array of shape (height, width, 4) to a PNG file.
+  """
+  
+  height, width = pixels.shape[:2]
+  
+  def _chunk(chunk_type, data):
+    return (
+      struct.pack(b">I", len(data)) + chunk_type + data
+      + struct.pack(b">I", zlib.crc32(chunk_type + data) & 0xffffffff))
+  
+  # Prepend each row with filter type 0 (no filtering).
+  raw_data = numpy.insert(numpy.ascontiguousarray(pixels).reshape(height, width * 4), 0, 0, axis=1)
+  
+  with open(filename, "wb") as png_file:
+    png_file.write(_PNG_SIGNATURE)
+    png_file.write(_chunk(b"IHDR", struct.pack(b">IIBBBBB", width, height, 8, 6, 0, 0, 0)))
+    png_file.write(_chunk(b"IDAT", zlib.compress(raw_data.tobytes(), compression)))
+    png_file.write(_chunk(b"IEND", b""))
+
+
+def read_png(filename):
+  """
+  Read a non-interlaced 8-bit grayscale or RGB PNG file with or without alpha
+  and return an RGBA array of shape (height, width, 4).
+  """
+  
+  with open(filename, "rb") as png_file:
+    data = png_file.read()
+  
+  if not data.startswith(_PNG_SIGNATURE):
+    raise ValueError("'{0}': not a PNG file".format(filename))
+  
+  position = len(_PNG_SIGNATURE)
+  compressed_data = []
+  
+  while position < len(data):
+    chunk_length, chunk_type = struct.unpack(b">I4s", data[position:position + 8])
+    chunk_data = data[position + 8:position + 8 + chunk_length]
+    position += 12 + chunk_length
+    
+    if chunk_type == b"IHDR":
+      width, height, bit_depth, color_type, _unused, _unused, interlace = struct.unpack(b">IIBBBBB", chunk_data)
+      if bit_depth != 8 or color_type not in _PNG_COLOR_TYPE_CHANNELS or interlace:
+        raise ValueError("'{0}': unsupported PNG format".format(filename))
+    elif chunk_type == b"IDAT":
+      compressed_data.append(chunk_data)
+    elif chunk_type == b"IEND":
+      break
+  
+  num_channels = _PNG_COLOR_TYPE_CHANNELS[color_type]
+  row_length = width * num_channels
+  
+  raw_data = numpy.frombuffer(zlib.decompress(b"".join(compressed_data)), dtype=numpy.uint8)
+  raw_rows = raw_data.reshape(height, row_length + 1)
+  
+  pixels = numpy.zeros((height, row_length), dtype=numpy.uint8)
+  previous_row = numpy.zeros(row_length, dtype=numpy.int32)
+  
+  for row_index in range(height):
+    filter_type = raw_rows[row_index, 0]
+    row = raw_rows[row_index, 1:].astype(numpy.int32)
+    
+    if filter_type == 1:
+      row = _unfilter_sequentially(row, num_channels, lambda left, up, up_left: left)
+    elif filter_type == 2:
+      row = (row + previous_row) & 0xff
+    elif filter_type == 3:
+      row = _unfilter_sequentially(
+        row, num_channels, lambda left, up, up_left: (left + up) // 2, previous_row)
+    elif filter_type == 4:
+      row = _unfilter_sequentially(row, num_channels, _paeth_predictor, previous_row)
+    
+    pixels[row_index] = row
+    previous_row = row
+  
+  pixels = pixels.reshape(height, width, num_channels)
+  
+  if num_channels == 4:
+    return pixels
+  else:
+    rgba_pixels = numpy.full((height, width, 4), 255, dtype=numpy.uint8)
+    if num_channels in [1, 2]:
+      rgba_pixels[..., :3] = pixels[..., :1]
+    else:
+      rgba_pixels[..., :3] = pixels[..., :3]
+    if num_channels in [2, 4]:
+      rgba_pixels[..., 3] = pixels[..., -1]
+    return rgba_pixels
+
+
+def _unfilter_sequentially(row, num_channels, predictor, previous_row=None):
+  if previous_row is None:
+    previous_row = numpy.zeros(len(row), dtype=numpy.int32)
+  
+  row = row.tolist()
+  previous_row = previous_row.tolist()
+  
+  for index in range(len(row)):
+    left = row[index - num_channels] if index >= num_channels else 0
+    up_left = previous_row[index - num_channels] if index >= num_channels else 0
+    row[index] = (row[index] + predictor(left, previous_row[index], up_left)) & 0xff
+  
+  return numpy.array(row, dtype=numpy.int32)
+
+
+def _paeth_predictor(left, up, up_left):
+  estimate = left + up - up_left
+  distance_left, distance_up, distance_up_left = abs(estimate - left), abs(estimate - up), abs(estimate - up_left)
+  
+  if distance_left <= distance_up and distance_left <= distance_up_left:
+    return left
+  elif distance_up <= distance_up_left:
+    return up
+  else:
+    return up_left
+
+
+#===============================================================================
+
+
+def create_modules(gimp_directory=None):
+  """
+  Create fake `gimp`, `gimpenums`, `gimpplugin` and `gimpshelf` modules and
+  return them as a dictionary of {module name: module} pairs.
+  
+  `gimp_directory` is the value of `gimp.directory` (the GIMP user directory).
+  If None, a new temporary directory is used.
+  """
+  
+  pdb = FakePdb()
+  global_parasites = gimpstubs.ParasiteFunctionsStub()
+  
+  if gimp_directory is None:
+    gimp_directory = tempfile.mkdtemp()
+  
+  gimp = types.ModuleType(b"gimp")
+  gimp.pdb = pdb
+  gimp.directory = gimp_directory
+  gimp.Image = FakeImage
+  gimp.Item = FakeLayer
+  gimp.Drawable = FakeLayer
+  gimp.Layer = FakeLayer
+  gimp.GroupLayer = FakeLayerGroup
+  gimp.Channel = type(b"FakeChannel", (FakeLayer,), {})
+  gimp.Parasite = gimpstubs.ParasiteStub
+  gimp.PixelRgn = FakePixelRegion
+  gimp.image_list = lambda: pdb.images
+  gimp.user_directory = lambda type_: gimp_directory
+  gimp.parasite_find = global_parasites.parasite_find
+  gimp.parasite_attach = global_parasites.parasite_attach
+  gimp.parasite_detach = global_parasites.parasite_detach
+  gimp.parasite_list = global_parasites.parasite_list
+  gimp.message = lambda message: print(message, file=sys.stderr)
+  gimp.progress_install = lambda *args: None
+  gimp.progress_uninstall = lambda *args: None
+  gimp.domain_register = lambda *args: None
+  
+  gimpplugin = types.ModuleType(b"gimpplugin")
+  gimpplugin.plugin = type(b"plugin", (object,), {})
+  
+  gimpshelf = types.ModuleType(b"gimpshelf")
+  gimpshelf.shelf = gimpstubs.ShelfStub()
+  
+  fake_modules = {"gimp": gimp, "gimpenums": gimpenums, "gimpplugin": gimpplugin, "gimpshelf": gimpshelf}
+  
+  try:
+    import gobject
+  except ImportError:
+    fake_modules["gobject"] = _create_gobject_module()
+  
+  return fake_modules
+
+
+def _create_gobject_module():
+  """
+  Create a fake `gobject` module for environments without PyGObject. Scheduled
+  callbacks are never invoked as there is no main loop.
+  """
+  
+  gobject = types.ModuleType(b"gobject")
+  gobject.PRIORITY_DEFAULT_IDLE = 200
+  gobject.timeout_add = lambda *args, **kwargs: 0
+  gobject.idle_add = lambda *args, **kwargs: 0
+  gobject.source_remove = lambda source_id: True
+  
+  return gobject
+
+
+@contextlib.contextmanager
+def installed(package_names=None, gimp_directory=None):
+  """
+  Replace GIMP modules with fake modules (see `create_modules`) within the
+  `with` block and yield the fake `gimp` module.
+  
+  Modules of `package_names` (by default the top-level package containing this
+  module) are imported again within the `with` block, so that they use the fake
+  modules. Modules imported outside the `with` block are not affected. The
+  original GIMP modules (if any) are restored afterwards.
+  """
+  
+  if package_names is None:
+    package_names = [PACKAGE_NAME]
+  
+  fake_modules = create_modules(gimp_directory)
+  orig_modules = {module_name: sys.modules.get(module_name) for module_name in fake_modules}
+  
+  sys.modules.update(fake_modules)
+  
+  try:
+    with importtime.isolated_imports(package_names):
+      yield fake_modules["gimp"]
+  finally:
+    for module_name, orig_module in orig_modules.items():
+      if orig_module is not None:
+        sys.modules[module_name] = orig_module
+      else:
+        del sys.modules[module_name]
+
+
+#===============================================================================
+
+
+def create_image(width, height, num_layers, layer_size_range=(8, 64), depth=1, num_groups_per_parent=4,
+                 seed=0):
+  """
+  Create a fake image containing layers of random sizes and positions, each
+  filled with a random color with random transparent areas.
+  
+  If `depth` is greater than 1, layers are distributed in nested layer groups
+  as in `gimpstubs.create_image`.
+  """
+  
+  random_generator = random.Random(seed)
+  pdb = FakePdb()
+  
+  image = pdb.gimp_image_new(width, height, gimpenums.RGB)
+  image.name = b"image.xcf"
+  
+  parents = [None]
+  for level in range(depth - 1):
+    new_parents = []
+    for parent_index, parent in enumerate(parents):
+      for group_index in range(num_groups_per_parent):
+        group = FakeLayerGroup(image, "group {0}-{1}-{2}".format(level, parent_index, group_index))
+        pdb.gimp_image_insert_layer(image, group, parent, len(_get_parent_layers(image, parent)))
+        new_parents.append(group)
+    parents = new_parents
+  
+  for layer_index in range(num_layers):
+    layer_width = random_generator.randint(*layer_size_range)
+    layer_height = random_generator.randint(*layer_size_range)
+    
+    layer = FakeLayer(image, "layer {0}".format(layer_index), layer_width, layer_height)
+    layer.pixels[...] = [random_generator.randint(0, 255) for _unused in range(3)] + [255]
+    # Make a random rectangle transparent to exercise autocrop and compositing.
+    layer.pixels[:random_generator.randint(0, layer_height // 2), :random_generator.randint(0, layer_width // 2)] = 0
+    layer.set_offsets(
+      random_generator.randint(-layer_width // 2, width - layer_width // 2),
+      random_generator.randint(-layer_height // 2, height - layer_height // 2))
+    
+    parent = parents[layer_index % len(parents)]
+    pdb.gimp_image_insert_layer(image, layer, parent, len(_get_parent_layers(image, parent)))
+  
+  return image
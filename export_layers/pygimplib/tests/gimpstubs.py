@@ -29,6 +29,9 @@ from __future__ import unicode_literals
 
 str = unicode
 
+import pickle
+import random
+
 #===============================================================================
 
 
@@ -204,3 +207,66 @@ class ShelfStub(object):
   
   def has_key(self, key):
     return key in self._shelf
+
+
+#===============================================================================
+
+
+def create_image(num_layers, depth=1, num_groups_per_parent=4, duplicate_name_ratio=0.0,
+                 tag_density=0.0, tags=("background", "foreground"), tags_source_name="tags", seed=0):
+  """
+  Create an image stub containing a synthetic layer tree.
+  
+  Parameters:
+  
+  * `num_layers` - Number of layers (excluding layer groups).
+  
+  * `depth` - Number of levels of the layer tree. If greater than 1, each group
+    (and the image) at levels above the last one contains
+    `num_groups_per_parent` layer groups. Layers are distributed evenly among
+    the groups at the last level.
+  
+  * `duplicate_name_ratio` - Fraction of layers whose name is the same as the
+    name of another layer.
+  
+  * `tag_density` - Fraction of layers and groups with a tag from `tags`. Tags
+    are stored in parasites named `tags_source_name`, as in
+    `pgitemtree._ItemTreeElement`.
+  
+  * `seed` - Seed for the random choice of duplicate names and tags, making the
+    layer tree reproducible.
+  """
+  
+  random_generator = random.Random(seed)
+  
+  def _add_tag(item):
+    if tags and random_generator.random() < tag_density:
+      item.parasite_attach(ParasiteStub(
+        tags_source_name, 0, pickle.dumps(set([random_generator.choice(tags)]))))
+  
+  image = ImageStub()
+  
+  parents = [image]
+  for level in range(depth - 1):
+    new_parents = []
+    for parent_index, parent in enumerate(parents):
+      for group_index in range(num_groups_per_parent):
+        group = LayerGroupStub("group {0}-{1}-{2}".format(level, parent_index, group_index))
+        _add_tag(group)
+        parent.layers.append(group)
+        new_parents.append(group)
+    parents = new_parents
+  
+  layer_names = []
+  for layer_index in range(num_layers):
+    if layer_names and random_generator.random() < duplicate_name_ratio:
+      layer_name = random_generator.choice(layer_names)
+    else:
+      layer_name = "layer {0}".format(layer_index)
+    layer_names.append(layer_name)
+    
+    layer = LayerStub(layer_name)
+    _add_tag(layer)
+    parents[layer_index % len(parents)].layers.append(layer)
+  
+  return image
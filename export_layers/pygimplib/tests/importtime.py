@@ -0,0 +1,129 @@
+#
+# This file is part of pygimplib.
+#
+# Copyright (C) 2014-2016 khalim19 <khalim19@gmail.com>
+#
+# pygimplib is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pygimplib is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pygimplib.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+This module measures the time to import modules and determines which modules
+are imported as a result.
+
+To measure the import time in GIMP, run the following in the Python-Fu console
+(see `runtests` for setting up the paths):
+
+
+from pygimplib.tests import importtime
+importtime.print_import_time("export_layers.exportlayers")
+
+
+Modules of the measured package that are already imported are imported again
+during the measurement, but modules outside the package (e.g. `gtk`) are not.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+str = unicode
+
+import contextlib
+import importlib
+import sys
+import time
+
+#===============================================================================
+
+
+@contextlib.contextmanager
+def isolated_imports(package_names):
+  """
+  Temporarily remove already imported modules belonging to the specified
+  packages from `sys.modules` so that they are imported again within the `with`
+  block.
+  
+  Yield a set that is filled with names of modules imported within the `with`
+  block once the block is exited. The original modules are restored afterwards.
+  """
+  
+  def _belongs_to_packages(module_name):
+    return any(
+      module_name == package_name or module_name.startswith(package_name + ".")
+      for package_name in package_names)
+  
+  orig_module_names = set(sys.modules)
+  orig_package_modules = {
+    module_name: module for module_name, module in sys.modules.items() if _belongs_to_packages(module_name)}
+  
+  for module_name in orig_package_modules:
+    del sys.modules[module_name]
+  
+  imported_module_names = set()
+  
+  try:
+    yield imported_module_names
+  finally:
+    imported_module_names.update(
+      module_name for module_name, module in sys.modules.items()
+      # Python 2 inserts None for failed relative imports of top-level modules.
+      if module is not None and (module_name not in orig_module_names or module_name in orig_package_modules))
+    
+    for module_name in list(sys.modules):
+      if _belongs_to_packages(module_name):
+        del sys.modules[module_name]
+    
+    sys.modules.update(orig_package_modules)
+
+
+def measure_import(module_name, package_names=None):
+  """
+  Import the specified module and return a tuple of (import time in seconds,
+  set of names of imported modules).
+  
+  Modules belonging to `package_names` are imported again (see
+  `isolated_imports`). If `package_names` is None, the top-level package of
+  `module_name` is used.
+  """
+  
+  if package_names is None:
+    package_names = [module_name.split(".")[0]]
+  
+  with isolated_imports(package_names) as imported_module_names:
+    start_time = time.time()
+    importlib.import_module(module_name)
+    import_time = time.time() - start_time
+  
+  return import_time, imported_module_names
+
+
+def print_import_time(module_name, package_names=None, output_stream=sys.stdout):
+  """
+  Print the import time of the specified module and the modules it imports.
+  """
+  
+  import_time, imported_module_names = measure_import(module_name, package_names)
+  
+  print("{0}: {1:.3f} s".format(module_name, import_time), file=output_stream)
+  for imported_module_name in sorted(imported_module_names):
+    print("  {0}".format(imported_module_name), file=output_stream)
+
+
+#===============================================================================
+
+
+if __name__ == "__main__":
+  for module_name_arg in sys.argv[1:]:
+    print_import_time(module_name_arg)
@@ -0,0 +1,143 @@
+#
+# This file is part of pygimplib.
+#
+# Copyright (C) 2014-2016 khalim19 <khalim19@gmail.com>
+#
+# pygimplib is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pygimplib is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pygimplib.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+This module provides a cache of image files decoded into NumPy arrays, allowing
+tests to decode images (e.g. expected results) only once.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+str = unicode
+
+import errno
+import hashlib
+import os
+import tempfile
+
+import numpy
+
+#===============================================================================
+
+
+class PixelCache(object):
+  
+  """
+  This class caches pixels of image files decoded into NumPy arrays in memory
+  and optionally on disk. Entries are keyed by the hash of the file contents,
+  hence modified files are decoded again and identical files are decoded only
+  once.
+  
+  Attributes:
+  
+  * `decode_func` - Function accepting a file path and returning the decoded
+    pixels as a NumPy array.
+  
+  * `cache_dirpath` - Directory storing decoded pixels across runs. If None, the
+    pixels are cached in memory only.
+  
+  * `num_decoded` - Number of files decoded by `decode_func` so far.
+  """
+  
+  def __init__(self, decode_func, cache_dirpath=None):
+    self.decode_func = decode_func
+    self.cache_dirpath = cache_dirpath
+    
+    self.num_decoded = 0
+    
+    # key: (file path, modification time, size); value: hash of file contents
+    self._file_hashes = {}
+    # key: hash of file contents; value: NumPy array
+    self._pixels = {}
+  
+  def get(self, filepath):
+    """
+    Return pixels of the specified image file. The returned array is read-only
+    as it is shared by all callers.
+    """
+    
+    file_hash = self._get_file_hash(filepath)
+    
+    if file_hash in self._pixels:
+      return self._pixels[file_hash]
+    
+    pixels = self._load_from_disk(file_hash)
+    if pixels is None:
+      pixels = self.decode_func(filepath)
+      self.num_decoded += 1
+      self._save_to_disk(file_hash, pixels)
+    
+    pixels.flags.writeable = False
+    self._pixels[file_hash] = pixels
+    
+    return pixels
+  
+  def clear(self):
+    """
+    Clear the in-memory cache. The on-disk cache is preserved.
+    """
+    
+    self._file_hashes.clear()
+    self._pixels.clear()
+  
+  def _get_file_hash(self, filepath):
+    file_stat = os.stat(filepath)
+    file_key = (os.path.abspath(filepath), file_stat.st_mtime, file_stat.st_size)
+    
+    if file_key not in self._file_hashes:
+      with open(filepath, "rb") as file_:
+        self._file_hashes[file_key] = hashlib.sha1(file_.read()).hexdigest()
+    
+    return self._file_hashes[file_key]
+  
+  def _get_cache_filepath(self, file_hash):
+    return os.path.join(self.cache_dirpath, file_hash + ".npy")
+  
+  def _load_from_disk(self, file_hash):
+    if self.cache_dirpath is None:
+      return None
+    
+    try:
+      return numpy.load(self._get_cache_filepath(file_hash))
+    except (IOError, OSError, ValueError):
+      return None
+  
+  def _save_to_disk(self, file_hash, pixels):
+    if self.cache_dirpath is None:
+      return
+    
+    try:
+      os.makedirs(self.cache_dirpath)
+    except OSError as e:
+      if e.errno != errno.EEXIST:
+        return
+    
+    # Write to a temporary file first so that concurrently running tests never
+    # read a partially written file.
+    temp_file_descriptor, temp_filepath = tempfile.mkstemp(suffix=".npy", dir=self.cache_dirpath)
+    try:
+      with os.fdopen(temp_file_descriptor, "wb") as temp_file:
+        numpy.save(temp_file, pixels)
+      os.rename(temp_filepath, self._get_cache_filepath(file_hash))
+    except (IOError, OSError):
+      if os.path.exists(temp_filepath):
+        os.remove(temp_filepath)
@@ -0,0 +1,210 @@
+#
+# This file is part of pygimplib.
+#
+# Copyright (C) 2014-2016 khalim19 <khalim19@gmail.com>
+#
+# pygimplib is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pygimplib is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pygimplib.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+str = unicode
+
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import unittest
+import zlib
+
+try:
+  import numpy
+except ImportError:
+  numpy = None
+  gimpfake = None
+else:
+  from . import gimpfake
+
+#===============================================================================
+
+
+def _create_layer(image, name, color, width, height, offsets=(0, 0)):
+  layer = gimpfake.FakeLayer(image, name, width, height)
+  layer.pixels[...] = color
+  layer.set_offsets(*offsets)
+  return layer
+
+
+@unittest.skipIf(numpy is None, "NumPy is not installed")
+class TestFakePdb(unittest.TestCase):
+  
+  def setUp(self):
+    self.pdb = gimpfake.FakePdb()
+    self.image = self.pdb.gimp_image_new(10, 10, gimpfake.gimpenums.RGB)
+  
+  def test_merge_visible_layers_composites_layers(self):
+    bottom_layer = _create_layer(self.image, "bottom", [0, 0, 255, 255], 4, 4)
+    top_layer = _create_layer(self.image, "top", [255, 0, 0, 255], 2, 2, offsets=(3, 3))
+    top_layer.opacity = 50.0
+    hidden_layer = _create_layer(self.image, "hidden", [0, 255, 0, 255], 10, 10)
+    hidden_layer.visible = False
+    
+    self.pdb.gimp_image_insert_layer(self.image, hidden_layer, None, 0)
+    self.pdb.gimp_image_insert_layer(self.image, bottom_layer, None, 0)
+    self.pdb.gimp_image_insert_layer(self.image, top_layer, None, 0)
+    
+    merged_layer = self.pdb.gimp_image_merge_visible_layers(self.image, gimpfake.gimpenums.EXPAND_AS_NECESSARY)
+    
+    self.assertEqual(self.image.layers, [merged_layer, hidden_layer])
+    self.assertEqual(merged_layer.name, b"bottom")
+    self.assertEqual((merged_layer.offsets, merged_layer.width, merged_layer.height), ((0, 0), 5, 5))
+    self.assertEqual(merged_layer.pixels[0, 0].tolist(), [0, 0, 255, 255])
+    self.assertEqual(merged_layer.pixels[3, 3].tolist(), [128, 0, 128, 255])
+    self.assertEqual(merged_layer.pixels[4, 4].tolist(), [255, 0, 0, 128])
+    self.assertEqual(merged_layer.pixels[0, 4].tolist(), [0, 0, 0, 0])
+    self.assertFalse(top_layer.valid)
+    self.assertFalse(bottom_layer.valid)
+  
+  def test_merge_visible_layers_clip_to_image(self):
+    layer = _create_layer(self.image, "layer", [0, 0, 255, 255], 20, 20, offsets=(-5, -5))
+    self.pdb.gimp_image_insert_layer(self.image, layer, None, 0)
+    
+    merged_layer = self.pdb.gimp_image_merge_visible_layers(self.image, gimpfake.gimpenums.CLIP_TO_IMAGE)
+    
+    self.assertEqual((merged_layer.offsets, merged_layer.width, merged_layer.height), ((0, 0), 10, 10))
+  
+  def test_layer_group_bounds_and_offsets(self):
+    group = gimpfake.FakeLayerGroup(self.image, "group")
+    self.pdb.gimp_image_insert_layer(self.image, group, None, 0)
+    self.pdb.gimp_image_insert_layer(self.image, _create_layer(self.image, "a", 0, 2, 2, (1, 1)), group, 0)
+    self.pdb.gimp_image_insert_layer(self.image, _create_layer(self.image, "b", 0, 2, 3, (4, 2)), group, 0)
+    
+    self.assertEqual((group.offsets, group.width, group.height), ((1, 1), 5, 4))
+    
+    group.set_offsets(0, 0)
+    self.assertEqual([layer.offsets for layer in group.children], [(3, 1), (0, 0)])
+  
+  def test_autocrop_layer(self):
+    layer = _create_layer(self.image, "layer", 0, 6, 6, offsets=(2, 2))
+    layer.pixels[1:3, 2:5] = [255, 255, 255, 255]
+    
+    self.pdb.plug_in_autocrop_layer(self.image, layer)
+    
+    self.assertEqual((layer.offsets, layer.width, layer.height), ((4, 3), 3, 2))
+  
+  def test_resize_image_and_layer_to_image_size(self):
+    layer = _create_layer(self.image, "layer", [255, 255, 255, 255], 4, 4, offsets=(2, 2))
+    self.pdb.gimp_image_insert_layer(self.image, layer, None, 0)
+    
+    self.pdb.gimp_image_resize(self.image, 4, 4, -3, -3)
+    self.pdb.gimp_layer_resize_to_image_size(layer)
+    
+    self.assertEqual((layer.offsets, layer.width, layer.height), ((0, 0), 4, 4))
+    self.assertEqual(layer.pixels[..., 3].tolist(), [[255] * 3 + [0]] * 3 + [[0] * 4])
+  
+  def test_scale_image(self):
+    layer = _create_layer(self.image, "layer", [255, 255, 255, 255], 4, 2, offsets=(2, 2))
+    self.pdb.gimp_image_insert_layer(self.image, layer, None, 0)
+    
+    self.pdb.gimp_image_scale(self.image, 5, 20)
+    
+    self.assertEqual((self.image.width, self.image.height), (5, 20))
+    self.assertEqual((layer.offsets, layer.width, layer.height), ((1, 4), 2, 4))
+  
+  def test_pixel_region(self):
+    layer = _create_layer(self.image, "layer", [1, 2, 3, 4], 3, 2)
+    pixel_region = layer.get_pixel_rgn(0, 0, layer.width, layer.height, False, False)
+    
+    self.assertEqual(pixel_region[0:3, 0:2], b"\x01\x02\x03\x04" * 6)
+    
+    pixel_region[1:2, 1:2] = b"\x05\x06\x07\x08"
+    self.assertEqual(layer.pixels[1, 1].tolist(), [5, 6, 7, 8])
+  
+  def test_unimplemented_procedure_raises_error(self):
+    with self.assertRaises(AttributeError):
+      self.pdb.gimp_unimplemented_procedure()
+
+
+@unittest.skipIf(numpy is None, "NumPy is not installed")
+class TestPng(unittest.TestCase):
+  
+  def setUp(self):
+    self.temp_dirname = tempfile.mkdtemp()
+    self.addCleanup(shutil.rmtree, self.temp_dirname)
+    self.filename = os.path.join(self.temp_dirname, "image.png").encode()
+  
+  def test_save_and_load(self):
+    pdb = gimpfake.FakePdb()
+    image = gimpfake.create_image(32, 32, 3, seed=1)
+    layer = image.layers[0]
+    
+    pdb.file_png_save2(image, layer, self.filename, os.path.basename(self.filename), 0, 9, 0, 0, 0, 0, 0, 0, 0)
+    loaded_image = pdb.gimp_file_load(self.filename, os.path.basename(self.filename))
+    
+    self.assertEqual(loaded_image.layers[0].pixels.tolist(), layer.pixels.tolist())
+  
+  def test_save_unsupported_format(self):
+    image = gimpfake.create_image(32, 32, 1)
+    
+    with self.assertRaises(RuntimeError):
+      gimpfake.FakePdb().gimp_file_save(image, image.layers[0], b"image.jpg", b"image.jpg")
+  
+  def test_read_png_with_filters(self):
+    # 2x2 RGB image with "sub" (1), "up" (2), "average" (3) and "Paeth" (4) filters.
+    rows = [
+      (1, [10, 20, 30, 5, 5, 5]),
+      (2, [1, 1, 1, 2, 2, 2]),
+      (3, [0, 0, 0, 0, 0, 0]),
+      (4, [0, 0, 0, 0, 0, 0]),
+    ]
+    
+    for filter_type, row in rows:
+      raw_data = [0, 10, 20, 30, 15, 25, 35] + [filter_type] + row
+      self._write_raw_png(raw_data, 2, 2)
+      
+      pixels = gimpfake.read_png(self.filename)
+      self.assertEqual(pixels.shape, (2, 2, 4))
+      self.assertEqual(pixels[0, 0].tolist(), [10, 20, 30, 255])
+    
+    self.assertEqual(pixels[1].tolist(), [[10, 20, 30, 255], [15, 25, 35, 255]])
+  
+  def _write_raw_png(self, raw_data, width, height):
+    def _chunk(chunk_type, data):
+      return (
+        struct.pack(b">I", len(data)) + chunk_type + data
+        + struct.pack(b">I", zlib.crc32(chunk_type + data) & 0xffffffff))
+    
+    with open(self.filename, "wb") as png_file:
+      png_file.write(b"\x89PNG\r\n\x1a\n")
+      png_file.write(_chunk(b"IHDR", struct.pack(b">IIBBBBB", width, height, 8, 2, 0, 0, 0)))
+      png_file.write(_chunk(b"IDAT", zlib.compress(bytes(bytearray(raw_data)))))
+      png_file.write(_chunk(b"IEND", b""))
+
+
+@unittest.skipIf(numpy is None, "NumPy is not installed")
+class TestInstalled(unittest.TestCase):
+  
+  def test_installed_replaces_and_restores_modules(self):
+    orig_gimp_module = sys.modules.get("gimp")
+    
+    with gimpfake.installed() as gimp:
+      self.assertIs(sys.modules["gimp"], gimp)
+      self.assertIsInstance(gimp.pdb, gimpfake.FakePdb)
+    
+    self.assertIs(sys.modules.get("gimp"), orig_gimp_module)
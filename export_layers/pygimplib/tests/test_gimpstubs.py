@@ -45,3 +45,38 @@ class TestPdbStub(unittest.TestCase):
     self.assertTrue(callable(self.pdb.plug_in_autocrop))
     self.assertEqual(self.pdb.plug_in_autocrop(), b"plug_in_autocrop")
     self.assertEqual(self.pdb.plug_in_autocrop("some random args", 1, 2, 3), b"plug_in_autocrop")
+
+
+class TestCreateImage(unittest.TestCase):
+  
+  def _get_layers(self, parent):
+    layers = []
+    for layer in parent.layers:
+      layers.append(layer)
+      if isinstance(layer, gimpstubs.LayerGroupStub):
+        layers.extend(self._get_layers(layer))
+    
+    return layers
+  
+  def test_create_image(self):
+    image = gimpstubs.create_image(20, depth=3, num_groups_per_parent=2)
+    
+    layers = self._get_layers(image)
+    groups = [layer for layer in layers if isinstance(layer, gimpstubs.LayerGroupStub)]
+    
+    self.assertEqual(len(layers) - len(groups), 20)
+    self.assertEqual(len(groups), 2 + 4)
+    self.assertEqual(len(set(layer.name for layer in layers if layer not in groups)), 20)
+  
+  def test_create_image_with_duplicate_names_and_tags(self):
+    image = gimpstubs.create_image(100, duplicate_name_ratio=0.5, tag_density=1.0, tags_source_name="tags")
+    
+    self.assertLess(len(set(layer.name for layer in image.layers)), 100)
+    self.assertTrue(all(layer.parasite_find("tags") is not None for layer in image.layers))
+  
+  def test_create_image_is_reproducible(self):
+    image = gimpstubs.create_image(50, duplicate_name_ratio=0.5, tag_density=0.5)
+    image_with_same_seed = gimpstubs.create_image(50, duplicate_name_ratio=0.5, tag_density=0.5)
+    
+    self.assertEqual(
+      [layer.name for layer in image.layers], [layer.name for layer in image_with_same_seed.layers])
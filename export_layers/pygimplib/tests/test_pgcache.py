@@ -0,0 +1,105 @@
+#
+# This file is part of pygimplib.
+#
+# Copyright (C) 2014-2016 khalim19 <khalim19@gmail.com>
+#
+# pygimplib is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pygimplib is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pygimplib.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+str = unicode
+
+import unittest
+
+from .. import pgcache
+
+#===============================================================================
+
+
+class TestLruCache(unittest.TestCase):
+  
+  def setUp(self):
+    self.cache = pgcache.LruCache(10, get_size_func=len)
+  
+  def test_get(self):
+    self.cache.add("a", "aaa")
+    
+    self.assertEqual(self.cache.get("a"), "aaa")
+    self.assertEqual(self.cache.get("b"), None)
+    self.assertEqual(self.cache.get("b", "default"), "default")
+    self.assertEqual(self.cache.hits, 1)
+    self.assertEqual(self.cache.misses, 2)
+  
+  def test_add_replaces_existing_value(self):
+    self.cache.add("a", "aaa")
+    self.cache.add("a", "aaaa")
+    
+    self.assertEqual(self.cache.get("a"), "aaaa")
+    self.assertEqual(self.cache.size, 4)
+    self.assertEqual(len(self.cache), 1)
+  
+  def test_add_discards_least_recently_used(self):
+    self.cache.add("a", "aaaa")
+    self.cache.add("b", "bbbb")
+    self.cache.get("a")
+    self.cache.add("c", "cccc")
+    
+    self.assertIn("a", self.cache)
+    self.assertNotIn("b", self.cache)
+    self.assertIn("c", self.cache)
+    self.assertEqual(self.cache.size, 8)
+  
+  def test_add_value_larger_than_max_size(self):
+    self.cache.add("a", "aaa")
+    self.cache.add("a", "a" * 11)
+    
+    self.assertNotIn("a", self.cache)
+    self.assertEqual(self.cache.size, 0)
+  
+  def test_reduce_max_size(self):
+    self.cache.add("a", "aaaa")
+    self.cache.add("b", "bbbb")
+    
+    self.cache.max_size = 5
+    
+    self.assertNotIn("a", self.cache)
+    self.assertIn("b", self.cache)
+    self.assertEqual(self.cache.size, 4)
+  
+  def test_remove_and_clear(self):
+    self.cache.add("a", "aaa")
+    self.cache.add("b", "bbb")
+    
+    self.cache.remove("a")
+    self.cache.remove("nonexistent")
+    self.assertNotIn("a", self.cache)
+    self.assertEqual(self.cache.size, 3)
+    
+    self.cache.clear()
+    self.assertEqual(len(self.cache), 0)
+    self.assertEqual(self.cache.size, 0)
+  
+  def test_default_size_is_number_of_entries(self):
+    cache = pgcache.LruCache(2)
+    cache.add("a", object())
+    cache.add("b", object())
+    cache.add("c", object())
+    
+    self.assertEqual(len(cache), 2)
+    self.assertNotIn("a", cache)
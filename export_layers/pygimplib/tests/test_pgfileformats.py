@@ -0,0 +1,118 @@
+#
+# This file is part of pygimplib.
+#
+# Copyright (C) 2014-2016 khalim19 <khalim19@gmail.com>
+#
+# pygimplib is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pygimplib is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pygimplib.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+str = unicode
+
+import unittest
+
+from ..lib import mock
+
+from .. import pgfileformats
+
+#===============================================================================
+
+LIB_NAME = ".".join(__name__.split(".")[:-2])
+
+#===============================================================================
+
+
+class PdbProcExistsStub(object):
+  
+  def __init__(self, existing_procedure_names):
+    self.existing_procedure_names = existing_procedure_names
+    self.num_calls = 0
+    self.png_save_args = None
+  
+  def file_png_save2(self, *args, **kwargs):
+    self.png_save_args = args
+  
+  def gimp_procedural_db_proc_exists(self, procedure_name):
+    self.num_calls += 1
+    return procedure_name in self.existing_procedure_names
+
+
+class TestGetSaveProcedure(unittest.TestCase):
+  
+  def setUp(self):
+    self.pdb_stub = PdbProcExistsStub(["file-apng-save-defaults"])
+    
+    self.pdb_patcher = mock.patch(LIB_NAME + ".pgfileformats.pdb", new=self.pdb_stub)
+    self.pdb_patcher.start()
+    
+    pgfileformats.refresh_save_procedures()
+    self.num_probed_procedures = self.pdb_stub.num_calls
+  
+  def tearDown(self):
+    self.pdb_patcher.stop()
+    
+    pgfileformats._save_procedures.clear()
+    pgfileformats._available_save_procedures.clear()
+  
+  def test_get_save_procedure(self):
+    self.assertEqual(
+      pgfileformats.get_save_procedure("apng"), pgfileformats.file_formats_dict["apng"].save_procedure_func)
+    self.assertEqual(
+      pgfileformats.get_save_procedure("raw"), pgfileformats.file_formats_dict["raw"].save_procedure_func)
+    self.assertEqual(pgfileformats.get_save_procedure("bmp"), pgfileformats.get_default_save_procedure())
+    self.assertEqual(pgfileformats.get_save_procedure("unknown"), pgfileformats.get_default_save_procedure())
+  
+  def test_get_save_procedure_with_save_parameters(self):
+    save_procedure = pgfileformats.get_save_procedure("png", {'compression': 3, 'interlace': True})
+    save_procedure(0, "image", "layer", b"image.png", b"image.png")
+    
+    self.assertEqual(self.pdb_stub.png_save_args[:6], ("image", "layer", b"image.png", b"image.png", True, 3))
+    
+    png_save_parameters = pgfileformats.file_formats_dict["png"].save_procedure_func_args
+    self.assertEqual(
+      self.pdb_stub.png_save_args[6:], tuple(parameter.default_value for parameter in png_save_parameters[2:]))
+  
+  def test_get_save_procedure_does_not_query_pdb_again(self):
+    for _unused in range(3):
+      pgfileformats.get_save_procedure("apng")
+      pgfileformats.get_save_procedure("webp")
+      pgfileformats.get_save_procedure("png")
+    
+    self.assertEqual(self.pdb_stub.num_calls, self.num_probed_procedures)
+  
+  def test_is_installed(self):
+    self.assertTrue(pgfileformats.file_formats_dict["png"].is_installed())
+    self.assertTrue(pgfileformats.file_formats_dict["apng"].is_installed())
+    self.assertFalse(pgfileformats.file_formats_dict["webp"].is_installed())
+    
+    self.assertEqual(self.pdb_stub.num_calls, self.num_probed_procedures)
+  
+  def test_refresh_save_procedures(self):
+    self.pdb_stub.existing_procedure_names.remove("file-apng-save-defaults")
+    pgfileformats.refresh_save_procedures()
+    
+    self.assertEqual(pgfileformats.get_save_procedure("apng"), pgfileformats.get_default_save_procedure())
+    
+    self.pdb_stub.existing_procedure_names.append("file-apng-save-defaults")
+    self.assertFalse(pgfileformats.file_formats_dict["apng"].is_installed())
+    
+    pgfileformats.refresh_save_procedures()
+    
+    self.assertTrue(pgfileformats.file_formats_dict["apng"].is_installed())
+    self.assertEqual(
+      pgfileformats.get_save_procedure("apng"), pgfileformats.file_formats_dict["apng"].save_procedure_func)
@@ -122,7 +122,9 @@ def _parse_layers(layer_tree_string):
 @mock.patch(LIB_NAME + ".pgitemtree.pdb", new=gimpstubs.PdbStub())
 @mock.patch(LIB_NAME + ".pgitemtree.gimp.GroupLayer", new=gimpstubs.LayerGroupStub)
 class TestLayerTree(unittest.TestCase):
-
+  
+  compact = False
+  
   @mock.patch(LIB_NAME + ".pgitemtree.pdb", new=gimpstubs.PdbStub())
   @mock.patch(LIB_NAME + ".pgitemtree.gimp.GroupLayer", new=gimpstubs.LayerGroupStub)
   def setUp(self):
@@ -157,7 +159,7 @@ class TestLayerTree(unittest.TestCase):
     """
     
     image = _parse_layers(layers_string)
-    self.layer_tree = pgitemtree.LayerTree(image)
+    self.layer_tree = pgitemtree.LayerTree(image, compact=self.compact)
   
   def test_get_orig_name_get_parents_get_children(self):
     layer_elem_tree = collections.OrderedDict([
@@ -378,6 +380,179 @@ class TestLayerTree(unittest.TestCase):
     
     self.assertEqual(self.layer_tree['Corners'].name, "Corners")
     self.assertEqual(self.layer_tree['Corners:'].name, "Corners:")
+  
+  def test_reset_item_elements_subset(self):
+    for layer_elem in self.layer_tree:
+      self.layer_tree.validate_name(layer_elem)
+      self.layer_tree.uniquify_name(layer_elem, include_item_path=True)
+    
+    self.layer_tree.reset_item_elements(self.layer_tree['Corners'].children)
+    
+    self.assertFalse(self.layer_tree.is_name_uniquified(self.layer_tree['top-left-corner:']))
+    self.assertEqual(self.layer_tree['top-left-corner:'].name, "top-left-corner:")
+    self.assertTrue(self.layer_tree.is_name_uniquified(self.layer_tree['Corners:']))
+    self.assertEqual(self.layer_tree['Corners:'].name, "Corners (1)")
+    
+    for layer_elem in self.layer_tree:
+      self.layer_tree.validate_name(layer_elem)
+      self.layer_tree.uniquify_name(layer_elem, include_item_path=True)
+    
+    self.assertEqual(self.layer_tree['top-left-corner'].name, "top-left-corner")
+    self.assertEqual(self.layer_tree['top-left-corner:'].name, "top-left-corner (1)")
+    self.assertEqual(self.layer_tree['top-left-corner::'].name, "top-left-corner (2)")
+    self.assertEqual(self.layer_tree['Corners:'].name, "Corners (1)")
+  
+  def test_refresh_without_changes(self):
+    layer_elems = list(self.layer_tree)
+    
+    self.assertEqual(self.layer_tree.refresh(), ([], [], []))
+    self.assertEqual(
+      [layer_elem.item.ID for layer_elem in self.layer_tree], [layer_elem.item.ID for layer_elem in layer_elems])
+    if not self.compact:
+      for orig_layer_elem, layer_elem in zip(layer_elems, self.layer_tree):
+        self.assertIs(orig_layer_elem, layer_elem)
+  
+  @mock.patch(LIB_NAME + ".pgitemtree.gimp", new=gimpstubs.GimpModuleStub())
+  def test_refresh(self):
+    image = self.layer_tree.image
+    
+    frames_layer = self.layer_tree['Frames'].item
+    new_layer = gimpstubs.LayerStub("bottom-frame")
+    frames_layer.layers.append(new_layer)
+    
+    overlay_layer = self.layer_tree['Overlay'].item
+    image.layers.remove(overlay_layer)
+    
+    self.layer_tree['main-background.jpg'].item.visible = False
+    self.layer_tree['top-left-corner::::'].item.name = b"top-left-corner-renamed"
+    
+    top_frame_elem = self.layer_tree['top-frame']
+    top_frame_elem.add_tag("background")
+    
+    added_ids, removed_ids, changed_ids = self.layer_tree.refresh()
+    
+    self.assertEqual(added_ids, [new_layer.ID])
+    self.assertEqual(removed_ids, [overlay_layer.ID])
+    self.assertEqual(
+      set(changed_ids),
+      set([self.layer_tree['Frames'].item.ID, self.layer_tree['main-background.jpg'].item.ID,
+           self.layer_tree['top-left-corner-renamed'].item.ID]))
+    
+    self.assertNotIn(overlay_layer.ID, self.layer_tree)
+    self.assertNotIn('top-left-corner::::', self.layer_tree)
+    self.assertEqual(self.layer_tree['bottom-frame'].parent, self.layer_tree['Frames'])
+    self.assertEqual(
+      [layer_elem.orig_name for layer_elem in self.layer_tree['Frames'].children], ["top-frame", "bottom-frame"])
+    self.assertFalse(self.layer_tree['main-background.jpg'].path_visible)
+    self.assertIn("background", self.layer_tree['top-frame'].tags)
+    if not self.compact:
+      self.assertIs(self.layer_tree['top-frame'], top_frame_elem)
+  
+  def test_refresh_moved_layer(self):
+    top_frame_layer = self.layer_tree['top-frame'].item
+    self.layer_tree['Frames'].item.layers.remove(top_frame_layer)
+    self.layer_tree['Overlay'].item.layers.append(top_frame_layer)
+    
+    added_ids, removed_ids, changed_ids = self.layer_tree.refresh()
+    
+    self.assertEqual(added_ids, [])
+    self.assertEqual(removed_ids, [])
+    self.assertEqual(
+      set(changed_ids),
+      set([top_frame_layer.ID, self.layer_tree['Frames'].item.ID, self.layer_tree['Overlay'].item.ID]))
+    
+    self.assertEqual(self.layer_tree['top-frame'].parent, self.layer_tree['Overlay'])
+    self.assertEqual(self.layer_tree['top-frame'].depth, 1)
+    self.assertEqual(self.layer_tree['Overlay'].item_type, pgitemtree._ItemTreeElement.NONEMPTY_GROUP)
+    self.assertEqual(self.layer_tree['Frames'].item_type, pgitemtree._ItemTreeElement.EMPTY_GROUP)
+  
+  def test_get_path_components_after_parent_name_changes(self):
+    layer_elem = self.layer_tree['bottom-right-corner']
+    
+    self.assertEqual(layer_elem.get_path_components(), ["Corners", "top-left-corner::"])
+    
+    self.layer_tree['Corners'].name = "Corners.png"
+    self.layer_tree.validate_name(layer_elem)
+    self.assertEqual(layer_elem.get_path_components(), ["Corners.png", "top-left-corner"])
+    
+    self.layer_tree.reset_name(self.layer_tree['top-left-corner::'])
+    self.assertEqual(layer_elem.get_path_components(), ["Corners.png", "top-left-corner::"])
+    
+    self.layer_tree.reset_item_elements()
+    self.assertEqual(layer_elem.get_path_components(), ["Corners", "top-left-corner::"])
+  
+  def test_path_visible(self):
+    self.layer_tree['top-left-corner::'].item.visible = False
+    self.layer_tree.refresh_attributes([self.layer_tree['top-left-corner::']])
+    
+    self.assertFalse(self.layer_tree['top-left-corner::'].path_visible)
+    self.assertFalse(self.layer_tree['bottom-left-corner'].path_visible)
+    self.assertTrue(self.layer_tree['top-left-corner'].path_visible)
+    self.assertTrue(self.layer_tree['Corners'].path_visible)
+  
+  def test_prefetched_attributes(self):
+    layer_elem = self.layer_tree['top-frame']
+    
+    self.assertEqual(set(layer_elem.attributes.keys()), {'visible', 'opacity'})
+    self.assertEqual(layer_elem.attributes['visible'], True)
+    self.assertIsNone(layer_elem.attributes['opacity'])
+  
+  def test_refresh_attributes(self):
+    self.layer_tree['Corners'].item.visible = False
+    self.layer_tree['top-frame'].item.visible = False
+    
+    self.assertTrue(self.layer_tree['Corners'].attributes['visible'])
+    self.assertTrue(self.layer_tree['top-left-corner'].path_visible)
+    
+    self.layer_tree.refresh_attributes([self.layer_tree['Corners']])
+    
+    self.assertFalse(self.layer_tree['Corners'].attributes['visible'])
+    self.assertFalse(self.layer_tree['top-left-corner'].path_visible)
+    self.assertTrue(self.layer_tree['top-frame'].attributes['visible'])
+    
+    self.layer_tree.refresh_attributes()
+    
+    self.assertFalse(self.layer_tree['top-frame'].attributes['visible'])
+    self.assertFalse(self.layer_tree['top-frame'].path_visible)
+
+
+@mock.patch(LIB_NAME + ".pgitemtree.pdb", new=gimpstubs.PdbStub())
+@mock.patch(LIB_NAME + ".pgitemtree.gimp.GroupLayer", new=gimpstubs.LayerGroupStub)
+class TestCompactLayerTree(TestLayerTree):
+  
+  compact = True
+  
+  def test_elements_have_no_instance_dict(self):
+    for layer_elem in self.layer_tree:
+      self.assertFalse(hasattr(layer_elem, "__dict__"))
+  
+  def test_depth_parent_and_path_visible(self):
+    self.layer_tree['top-left-corner::'].item.visible = False
+    self.layer_tree.refresh_attributes([self.layer_tree['top-left-corner::']])
+    
+    layer_elem = self.layer_tree['bottom-left-corner']
+    
+    self.assertEqual(layer_elem.depth, 2)
+    self.assertEqual(layer_elem.parent, self.layer_tree['top-left-corner::'])
+    self.assertFalse(layer_elem.path_visible)
+    self.assertTrue(self.layer_tree['top-left-corner'].path_visible)
+    self.assertIsNone(self.layer_tree['Corners'].parent)
+  
+  def test_item_types(self):
+    self.assertEqual(self.layer_tree['Corners'].item_type, pgitemtree._ItemTreeElement.NONEMPTY_GROUP)
+    self.assertEqual(self.layer_tree['Overlay'].item_type, pgitemtree._ItemTreeElement.EMPTY_GROUP)
+    self.assertEqual(self.layer_tree['top-frame'].item_type, pgitemtree._ItemTreeElement.ITEM)
+  
+  @mock.patch(LIB_NAME + ".pgitemtree.gimp", new=gimpstubs.GimpModuleStub())
+  def test_add_remove_tag(self):
+    layer_elem = self.layer_tree['top-frame']
+    
+    layer_elem.add_tag("background")
+    self.assertIn("background", layer_elem.tags)
+    self.assertIn("background", pickle.loads(layer_elem.item.parasite_find(layer_elem.tags_source_name).data))
+    
+    layer_elem.remove_tag("background")
+    self.assertNotIn("background", layer_elem.tags)
 
 
 @mock.patch(LIB_NAME + ".pgitemtree.pdb", new=gimpstubs.PdbStub())
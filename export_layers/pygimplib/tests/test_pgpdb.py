@@ -0,0 +1,109 @@
+#
+# This file is part of pygimplib.
+#
+# Copyright (C) 2014-2016 khalim19 <khalim19@gmail.com>
+#
+# pygimplib is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pygimplib is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pygimplib.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+str = unicode
+
+import importlib
+import os
+import shutil
+import tempfile
+import unittest
+
+try:
+  import numpy
+except ImportError:
+  numpy = None
+  gimpfake = None
+else:
+  from . import gimpfake
+
+#===============================================================================
+
+LIB_NAME = ".".join(__name__.split(".")[:-2])
+
+#===============================================================================
+
+
+@unittest.skipIf(numpy is None, "NumPy is not installed")
+class TestCompareLayers(unittest.TestCase):
+  
+  def setUp(self):
+    gimp_fake_context = gimpfake.installed()
+    gimp = gimp_fake_context.__enter__()
+    self.addCleanup(gimp_fake_context.__exit__, None, None, None)
+    
+    self.pgpdb = importlib.import_module(LIB_NAME + ".pgpdb")
+    
+    self.image = gimp.pdb.gimp_image_new(4, 4, gimpfake.gimpenums.RGB)
+    self.layer = self._create_layer([10, 20, 30, 255])
+    self.other_layer = self._create_layer([10, 20, 30, 255])
+  
+  def _create_layer(self, color, width=4, height=4):
+    layer = gimpfake.FakeLayer(self.image, "layer", width, height)
+    layer.pixels[...] = color
+    return layer
+  
+  def test_identical_layers(self):
+    self.assertTrue(self.pgpdb.compare_layers([self.layer, self.other_layer]))
+  
+  def test_layers_with_different_sizes(self):
+    self.assertFalse(self.pgpdb.compare_layers([self.layer, self._create_layer([10, 20, 30, 255], 4, 3)]))
+  
+  def test_different_layers(self):
+    self.other_layer.pixels[1, 2] = [10, 25, 30, 255]
+    
+    self.assertFalse(self.pgpdb.compare_layers([self.layer, self.other_layer]))
+    self.assertFalse(self.pgpdb.compare_layers([self.layer, self.other_layer], tolerance=4))
+    self.assertTrue(self.pgpdb.compare_layers([self.layer, self.other_layer], tolerance=5))
+  
+  def test_colors_of_transparent_pixels_are_ignored(self):
+    self.layer.pixels[0, 0] = [0, 0, 0, 0]
+    self.other_layer.pixels[0, 0] = [255, 255, 255, 0]
+    
+    self.assertTrue(self.pgpdb.compare_layers([self.layer, self.other_layer]))
+  
+  def test_compare_alpha_channels(self):
+    self.other_layer.pixels[0, 0] = [10, 20, 30, 254]
+    
+    self.assertFalse(self.pgpdb.compare_layers([self.layer, self.other_layer]))
+    self.assertTrue(self.pgpdb.compare_layers([self.layer, self.other_layer], compare_alpha_channels=False))
+  
+  def test_save_diff_image_if_layers_differ(self):
+    temp_dirname = tempfile.mkdtemp()
+    self.addCleanup(shutil.rmtree, temp_dirname)
+    diff_image_filepath = os.path.join(temp_dirname, "diff.png")
+    
+    self.assertTrue(
+      self.pgpdb.compare_layers([self.layer, self.other_layer], diff_image_filepath=diff_image_filepath))
+    self.assertFalse(os.path.exists(diff_image_filepath))
+    
+    self.other_layer.pixels[1, 2] = [10, 25, 30, 255]
+    
+    self.assertFalse(
+      self.pgpdb.compare_layers([self.layer, self.other_layer], diff_image_filepath=diff_image_filepath))
+    
+    diff_pixels = gimpfake.read_png(diff_image_filepath.encode())
+    self.assertEqual(diff_pixels[1, 2].tolist(), [0, 5, 0, 255])
+    self.assertEqual(diff_pixels[..., 3].sum(), 255)
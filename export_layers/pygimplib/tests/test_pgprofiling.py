@@ -0,0 +1,152 @@
+#
+# This file is part of pygimplib.
+#
+# Copyright (C) 2014-2016 khalim19 <khalim19@gmail.com>
+#
+# pygimplib is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pygimplib is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pygimplib.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+str = unicode
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from ..lib import mock
+
+from .. import constants
+from .. import pgprofiling
+
+#===============================================================================
+
+LIB_NAME = ".".join(__name__.split(".")[:-2])
+
+#===============================================================================
+
+
+def _procedure(*args):
+  return sum(args)
+
+
+def _failing_procedure(*args):
+  raise ValueError("procedure failed")
+
+
+class TestProfile(unittest.TestCase):
+  
+  def setUp(self):
+    self.temp_dirname = tempfile.mkdtemp()
+    self.addCleanup(shutil.rmtree, self.temp_dirname)
+    
+    self.log_dirname = os.path.join(self.temp_dirname, "logs")
+    self.log_filepath = os.path.join(self.log_dirname, "plugin_profile.log")
+    self.stats_filepath = os.path.join(self.log_dirname, "plugin.prof")
+  
+  def _profile(self, procedure, profile_mode, log_path_dirnames=None):
+    if log_path_dirnames is None:
+      log_path_dirnames = [self.log_dirname]
+    
+    return pgprofiling.profile(
+      procedure, [1, 2], profile_mode, log_path_dirnames, "plugin_profile.log", "plugin.prof", "Plug-in")
+  
+  def test_profile_none(self):
+    self.assertEqual(self._profile(_procedure, constants.PROFILE_NONE), 3)
+    self.assertFalse(os.path.exists(self.log_dirname))
+  
+  def test_profile_cpu(self):
+    self.assertEqual(self._profile(_procedure, constants.PROFILE_CPU), 3)
+    
+    with open(self.log_filepath, "r") as log_file:
+      log_contents = log_file.read()
+    
+    self.assertIn("Plug-in", log_contents)
+    self.assertIn("_procedure", log_contents)
+    self.assertTrue(os.path.isfile(self.stats_filepath))
+  
+  def test_profile_writes_results_if_procedure_fails(self):
+    with self.assertRaises(ValueError):
+      self._profile(_failing_procedure, constants.PROFILE_CPU)
+    
+    self.assertTrue(os.path.isfile(self.log_filepath))
+    self.assertTrue(os.path.isfile(self.stats_filepath))
+  
+  def test_profile_uses_next_directory_if_first_cannot_be_created(self):
+    invalid_dirname_parent = os.path.join(self.temp_dirname, "file")
+    with open(invalid_dirname_parent, "w"):
+      pass
+    
+    self._profile(
+      _procedure, constants.PROFILE_CPU,
+      log_path_dirnames=[os.path.join(invalid_dirname_parent, "logs"), self.log_dirname])
+    
+    self.assertTrue(os.path.isfile(self.log_filepath))
+  
+  @mock.patch(LIB_NAME + ".pgprofiling.tracemalloc", new=None)
+  def test_profile_cpu_and_memory_without_tracemalloc(self):
+    def _procedure_tracing_memory(*args):
+      with pgprofiling.trace_memory("procedure"):
+        return _procedure(*args)
+    
+    self.assertEqual(self._profile(_procedure_tracing_memory, constants.PROFILE_CPU_AND_MEMORY), 3)
+    
+    with open(self.log_filepath, "r") as log_file:
+      log_contents = log_file.read()
+    
+    self.assertIn("tracemalloc is not available", log_contents)
+    self.assertIn("Memory usage in procedure:", log_contents)
+    self.assertIn("objects tracked by the garbage collector", log_contents)
+    if pgprofiling.resource is not None:
+      self.assertIn("maximum resident set size:", log_contents)
+  
+  @mock.patch(LIB_NAME + ".pgprofiling.tracemalloc", new=None)
+  @mock.patch(LIB_NAME + ".pgprofiling.resource", new=None)
+  def test_profile_cpu_and_memory_without_tracemalloc_and_resource(self):
+    def _procedure_tracing_memory(*args):
+      with pgprofiling.trace_memory("procedure"):
+        return _procedure(*args)
+    
+    self._profile(_procedure_tracing_memory, constants.PROFILE_CPU_AND_MEMORY)
+    
+    with open(self.log_filepath, "r") as log_file:
+      log_contents = log_file.read()
+    
+    self.assertIn("resource is not available", log_contents)
+    self.assertIn("objects tracked by the garbage collector", log_contents)
+  
+  def test_trace_memory_outside_profile_does_nothing(self):
+    with pgprofiling.trace_memory("procedure"):
+      result = _procedure(1, 2)
+    
+    self.assertEqual(result, 3)
+
+
+class TestGetProfileMode(unittest.TestCase):
+  
+  def test_get_profile_mode_from_environment_variable(self):
+    with mock.patch.dict("os.environ", {pgprofiling.PROFILE_MODE_ENVIRONMENT_VARIABLE: "cpu"}):
+      self.assertEqual(pgprofiling.get_profile_mode(constants.PROFILE_NONE), constants.PROFILE_CPU)
+  
+  def test_get_profile_mode_invalid_or_missing_environment_variable(self):
+    with mock.patch.dict("os.environ", {pgprofiling.PROFILE_MODE_ENVIRONMENT_VARIABLE: "invalid"}):
+      self.assertEqual(pgprofiling.get_profile_mode(constants.PROFILE_CPU), constants.PROFILE_CPU)
+    
+    with mock.patch.dict("os.environ", clear=True):
+      self.assertEqual(pgprofiling.get_profile_mode(constants.PROFILE_NONE), constants.PROFILE_NONE)
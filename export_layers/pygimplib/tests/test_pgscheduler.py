@@ -0,0 +1,263 @@
+#
+# This file is part of pygimplib.
+#
+# Copyright (C) 2014-2016 khalim19 <khalim19@gmail.com>
+#
+# pygimplib is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pygimplib is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pygimplib.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+str = unicode
+
+import unittest
+
+from ..lib import mock
+
+from .. import pgscheduler
+
+#===============================================================================
+
+LIB_NAME = ".".join(__name__.split(".")[:-2])
+
+#===============================================================================
+
+
+class GobjectStub(object):
+  
+  """
+  This class simulates the GTK main loop. Timeouts are invoked when calling
+  `run`, regardless of their interval.
+  """
+  
+  PRIORITY_DEFAULT_IDLE = 200
+  
+  def __init__(self):
+    self._sources = {}
+    self._source_id_counter = 0
+    
+    gobject_stub = self
+    
+    class MainLoopStub(object):
+      
+      def __init__(self):
+        self._is_running = False
+      
+      def run(self):
+        self._is_running = True
+        while self._is_running and gobject_stub._sources:
+          gobject_stub.run_iteration()
+      
+      def quit(self):
+        self._is_running = False
+    
+    self.MainLoop = MainLoopStub
+  
+  def timeout_add(self, interval, callback, *callback_args):
+    return self._add_source(callback, callback_args)
+  
+  def idle_add(self, callback, *callback_args, **kwargs):
+    return self._add_source(callback, callback_args)
+  
+  def source_remove(self, source_id):
+    del self._sources[source_id]
+  
+  def run_iteration(self):
+    for source_id, (callback, callback_args) in sorted(self._sources.items()):
+      if source_id in self._sources:
+        if not callback(*callback_args):
+          self._sources.pop(source_id, None)
+  
+  def run(self):
+    while self._sources:
+      self.run_iteration()
+  
+  def _add_source(self, callback, callback_args):
+    self._source_id_counter += 1
+    self._sources[self._source_id_counter] = (callback, callback_args)
+    return self._source_id_counter
+
+
+#===============================================================================
+
+
+class TestUpdateScheduler(unittest.TestCase):
+  
+  def setUp(self):
+    self.gobject_stub = GobjectStub()
+    patcher = mock.patch(LIB_NAME + ".pgscheduler.gobject", new=self.gobject_stub)
+    patcher.start()
+    self.addCleanup(patcher.stop)
+    
+    self.scheduler = pgscheduler.UpdateScheduler()
+    self.invoked_updates = []
+  
+  def _update_names(self, value=None):
+    self.invoked_updates.append(("names", value))
+  
+  def _update_image(self, value=None):
+    self.invoked_updates.append(("image", value))
+  
+  def _update_image_in_chunks(self, value=None):
+    for chunk_index in range(3):
+      self.invoked_updates.append(("image", value, chunk_index))
+      yield
+  
+  def test_schedule_coalesces_updates(self):
+    self.scheduler.schedule(0, self._update_names, 1)
+    self.scheduler.schedule(0, self._update_names, 2)
+    self.scheduler.schedule(0, self._update_names, value=3)
+    self.gobject_stub.run()
+    
+    self.assertEqual(self.invoked_updates, [("names", 3)])
+    self.assertEqual(self.scheduler.timings[self._update_names].num_updates, 1)
+    self.assertEqual(self.scheduler.timings[self._update_names].num_coalesced, 2)
+  
+  def test_schedule_invokes_updates_by_priority(self):
+    self.scheduler.set_priority(self._update_names, -1)
+    
+    self.scheduler.schedule(0, self._update_image)
+    self.scheduler.schedule(0, self._update_names)
+    self.gobject_stub.run()
+    
+    self.assertEqual(self.invoked_updates, [("names", None), ("image", None)])
+  
+  def test_cancel(self):
+    self.scheduler.schedule(0, self._update_names)
+    self.scheduler.schedule(0, self._update_image)
+    self.scheduler.cancel(self._update_names)
+    self.gobject_stub.run()
+    
+    self.assertEqual(self.invoked_updates, [("image", None)])
+    self.assertFalse(self.scheduler.is_scheduled(self._update_names))
+    self.assertEqual(self.scheduler.timings[self._update_names].num_canceled, 1)
+  
+  def test_chunked_update(self):
+    self.scheduler.schedule(0, self._update_image_in_chunks)
+    self.gobject_stub.run()
+    
+    self.assertEqual(
+      self.invoked_updates, [("image", None, 0), ("image", None, 1), ("image", None, 2)])
+    self.assertEqual(self.scheduler.timings[self._update_image_in_chunks].num_updates, 1)
+  
+  def test_scheduling_discards_remaining_chunks_of_stale_update(self):
+    self.scheduler.schedule(0, self._update_image_in_chunks, 1)
+    
+    # Invoke the timeout, start the update and perform the first chunk.
+    self.gobject_stub.run_iteration()
+    self.gobject_stub.run_iteration()
+    self.gobject_stub.run_iteration()
+    self.assertTrue(self.scheduler.is_scheduled(self._update_image_in_chunks))
+    
+    self.scheduler.schedule(0, self._update_image_in_chunks, 2)
+    self.gobject_stub.run()
+    
+    self.assertEqual(
+      self.invoked_updates, [("image", 1, 0), ("image", 2, 0), ("image", 2, 1), ("image", 2, 2)])
+    self.assertEqual(self.scheduler.timings[self._update_image_in_chunks].num_updates, 1)
+    self.assertEqual(self.scheduler.timings[self._update_image_in_chunks].num_canceled, 1)
+  
+  def test_scheduling_from_within_chunk_discards_chunks_after_chunk_is_finished(self):
+    def _update_image_in_chunks_scheduling_update(value):
+      self.invoked_updates.append(("image", value, 0))
+      if value == 1:
+        # Simulate a GTK event handler invoked from within the chunk.
+        self.scheduler.schedule(0, _update_image_in_chunks_scheduling_update, 2)
+      yield
+      self.invoked_updates.append(("image", value, 1))
+    
+    self.scheduler.schedule(0, _update_image_in_chunks_scheduling_update, 1)
+    
+    # Invoke the timeout, start the update and perform the first chunk.
+    self.gobject_stub.run_iteration()
+    self.gobject_stub.run_iteration()
+    self.gobject_stub.run_iteration()
+    self.gobject_stub.run()
+    
+    self.assertEqual(self.invoked_updates, [("image", 1, 0), ("image", 2, 0), ("image", 2, 1)])
+    self.assertEqual(self.scheduler.timings[_update_image_in_chunks_scheduling_update].num_updates, 1)
+    self.assertEqual(self.scheduler.timings[_update_image_in_chunks_scheduling_update].num_canceled, 1)
+  
+  def test_cancel_all(self):
+    self.scheduler.schedule(0, self._update_names)
+    self.scheduler.schedule(0, self._update_image_in_chunks)
+    self.gobject_stub.run_iteration()
+    self.gobject_stub.run_iteration()
+    
+    self.scheduler.cancel_all()
+    self.gobject_stub.run()
+    
+    self.assertEqual(self.invoked_updates, [("names", None)])
+    self.assertFalse(self.scheduler.is_scheduled(self._update_image_in_chunks))
+
+
+class TestStepRunner(unittest.TestCase):
+  
+  def setUp(self):
+    self.gobject_stub = GobjectStub()
+    patcher = mock.patch(LIB_NAME + ".pgscheduler.gobject", new=self.gobject_stub)
+    patcher.start()
+    self.addCleanup(patcher.stop)
+    
+    self.performed_steps = []
+    self.is_cleaned_up = False
+  
+  def _steps(self, num_steps, step_to_fail=None):
+    try:
+      for step_index in range(num_steps):
+        if step_index == step_to_fail:
+          raise ValueError("step failed")
+        self.performed_steps.append(step_index)
+        yield
+    finally:
+      self.is_cleaned_up = True
+  
+  def test_run(self):
+    step_runner = pgscheduler.StepRunner(self._steps(5), time_budget_milliseconds=0)
+    step_runner.run()
+    
+    self.assertEqual(self.performed_steps, [0, 1, 2, 3, 4])
+    self.assertTrue(self.is_cleaned_up)
+    self.assertFalse(step_runner.is_running)
+  
+  def test_run_reraises_exception_from_step(self):
+    step_runner = pgscheduler.StepRunner(self._steps(5, step_to_fail=2), time_budget_milliseconds=0)
+    
+    with self.assertRaises(ValueError):
+      step_runner.run()
+    
+    self.assertEqual(self.performed_steps, [0, 1])
+    self.assertTrue(self.is_cleaned_up)
+  
+  def test_stop(self):
+    step_runner = pgscheduler.StepRunner(self._steps(5), time_budget_milliseconds=0)
+    
+    def _stop_after_two_steps():
+      if len(self.performed_steps) == 2:
+        step_runner.stop()
+        return False
+      else:
+        return True
+    
+    self.gobject_stub.idle_add(_stop_after_two_steps)
+    
+    step_runner.run()
+    
+    self.assertEqual(self.performed_steps, [0, 1])
+    self.assertTrue(self.is_cleaned_up)
+    self.assertFalse(step_runner.is_running)
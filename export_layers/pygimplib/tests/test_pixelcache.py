@@ -0,0 +1,116 @@
+#
+# This file is part of pygimplib.
+#
+# Copyright (C) 2014-2016 khalim19 <khalim19@gmail.com>
+#
+# pygimplib is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pygimplib is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pygimplib.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+str = unicode
+
+import os
+import shutil
+import tempfile
+import unittest
+
+try:
+  import numpy
+except ImportError:
+  numpy = None
+  pixelcache = None
+else:
+  from . import pixelcache
+
+#===============================================================================
+
+
+def _decode(filepath):
+  with open(filepath, "rb") as file_:
+    return numpy.frombuffer(file_.read(), dtype=numpy.uint8).copy()
+
+
+@unittest.skipIf(numpy is None, "NumPy is not installed")
+class TestPixelCache(unittest.TestCase):
+  
+  def setUp(self):
+    self.temp_dirname = tempfile.mkdtemp()
+    self.addCleanup(shutil.rmtree, self.temp_dirname)
+    
+    self.cache_dirpath = os.path.join(self.temp_dirname, "cache")
+    self.filepath = self._write_file("image", b"\x01\x02\x03")
+  
+  def _write_file(self, filename, contents):
+    filepath = os.path.join(self.temp_dirname, filename)
+    with open(filepath, "wb") as file_:
+      file_.write(contents)
+    return filepath
+  
+  def test_get_decodes_file_once(self):
+    cache = pixelcache.PixelCache(_decode)
+    
+    self.assertEqual(cache.get(self.filepath).tolist(), [1, 2, 3])
+    self.assertIs(cache.get(self.filepath), cache.get(self.filepath))
+    self.assertEqual(cache.num_decoded, 1)
+  
+  def test_get_files_with_identical_contents(self):
+    cache = pixelcache.PixelCache(_decode)
+    
+    cache.get(self.filepath)
+    cache.get(self._write_file("image_copy", b"\x01\x02\x03"))
+    
+    self.assertEqual(cache.num_decoded, 1)
+  
+  def test_get_modified_file(self):
+    cache = pixelcache.PixelCache(_decode)
+    cache.get(self.filepath)
+    
+    self._write_file("image", b"\x04\x05")
+    cache.clear()
+    
+    self.assertEqual(cache.get(self.filepath).tolist(), [4, 5])
+    self.assertEqual(cache.num_decoded, 2)
+  
+  def test_pixels_are_read_only(self):
+    cache = pixelcache.PixelCache(_decode)
+    
+    with self.assertRaises(ValueError):
+      cache.get(self.filepath)[0] = 0
+  
+  def test_get_from_disk_cache(self):
+    pixelcache.PixelCache(_decode, self.cache_dirpath).get(self.filepath)
+    
+    cache = pixelcache.PixelCache(_decode, self.cache_dirpath)
+    
+    self.assertEqual(cache.get(self.filepath).tolist(), [1, 2, 3])
+    self.assertEqual(cache.num_decoded, 0)
+    self.assertEqual(len(os.listdir(self.cache_dirpath)), 1)
+  
+  def test_corrupted_disk_cache_file_is_ignored(self):
+    cache = pixelcache.PixelCache(_decode, self.cache_dirpath)
+    cache.get(self.filepath)
+    
+    cache_filepath = os.path.join(self.cache_dirpath, os.listdir(self.cache_dirpath)[0])
+    with open(cache_filepath, "wb") as cache_file:
+      cache_file.write(b"corrupted")
+    
+    cache = pixelcache.PixelCache(_decode, self.cache_dirpath)
+    
+    self.assertEqual(cache.get(self.filepath).tolist(), [1, 2, 3])
+    self.assertEqual(cache.num_decoded, 1)
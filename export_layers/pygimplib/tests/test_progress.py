@@ -26,10 +26,16 @@ str = unicode
 
 import unittest
 
+from ..lib import mock
+
 from .. import progress
 
 #===============================================================================
 
+LIB_NAME = ".".join(__name__.split(".")[:-2])
+
+#===============================================================================
+
 
 class ProgressBarStub(object):
   
@@ -40,7 +46,7 @@ class ProgressBarStub(object):
 
 class ProgressUpdaterStub(progress.ProgressUpdater):
   
-  def _update_progress_bar(self):
+  def _fill_progress_bar(self):
     self.progress_bar.fraction = self._num_finished_tasks / self.num_total_tasks
   
   def _set_text_progress_bar(self, text):
@@ -86,3 +92,59 @@ class TestProgressUpdater(unittest.TestCase):
     
     self.assertEqual(self.progress_updater.num_finished_tasks, 0)
     self.assertEqual(self.progress_updater.progress_bar.text, "")
+
+
+@mock.patch(LIB_NAME + ".progress.time")
+class TestProgressUpdaterWithMinUpdateInterval(unittest.TestCase):
+  
+  def setUp(self):
+    self.num_total_tasks = 10
+    
+    self.progress_bar = ProgressBarStub()
+    self.progress_updater = ProgressUpdaterStub(
+      self.progress_bar, num_total_tasks=self.num_total_tasks, min_update_interval_milliseconds=100)
+  
+  def test_update_tasks_within_interval(self, mock_time):
+    mock_time.time.return_value = 1.0
+    self.progress_updater.update_tasks()
+    self.assertEqual(self.progress_bar.fraction, 0.1)
+    
+    mock_time.time.return_value = 1.05
+    self.progress_updater.update_tasks()
+    self.progress_updater.update_text("Hi there")
+    self.assertEqual(self.progress_bar.fraction, 0.1)
+    self.assertEqual(self.progress_bar.text, "")
+    
+    mock_time.time.return_value = 1.1
+    self.progress_updater.update_tasks()
+    self.assertEqual(self.progress_bar.fraction, 0.3)
+    self.assertEqual(self.progress_bar.text, "Hi there")
+  
+  def test_update_tasks_displays_final_state(self, mock_time):
+    mock_time.time.return_value = 1.0
+    self.progress_updater.update_tasks(self.num_total_tasks - 1)
+    self.progress_updater.update_tasks()
+    
+    self.assertEqual(self.progress_bar.fraction, 1.0)
+  
+  def test_flush(self, mock_time):
+    mock_time.time.return_value = 1.0
+    self.progress_updater.update_tasks()
+    self.progress_updater.update_tasks()
+    self.progress_updater.update_text("Hi there")
+    self.progress_updater.flush()
+    
+    self.assertEqual(self.progress_bar.fraction, 0.2)
+    self.assertEqual(self.progress_bar.text, "Hi there")
+  
+  def test_throughput_and_estimated_remaining_time(self, mock_time):
+    mock_time.time.return_value = 1.0
+    self.progress_updater.reset()
+    self.assertEqual(self.progress_updater.throughput, None)
+    self.assertEqual(self.progress_updater.estimated_remaining_time, None)
+    
+    mock_time.time.return_value = 3.0
+    self.progress_updater.update_tasks(4)
+    self.assertEqual(self.progress_updater.elapsed_time, 2.0)
+    self.assertEqual(self.progress_updater.throughput, 2.0)
+    self.assertEqual(self.progress_updater.estimated_remaining_time, 3.0)
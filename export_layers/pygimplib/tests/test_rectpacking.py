@@ -0,0 +1,100 @@
+#
+# This file is part of pygimplib.
+#
+# Copyright (C) 2014-2016 khalim19 <khalim19@gmail.com>
+#
+# pygimplib is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pygimplib is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pygimplib.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+str = unicode
+
+import itertools
+import unittest
+
+from .. import rectpacking
+
+#===============================================================================
+
+
+def _overlap(rect1, rect2, padding=0):
+  return not (
+    rect2.x >= rect1.x + rect1.width + padding or rect2.x + rect2.width + padding <= rect1.x
+    or rect2.y >= rect1.y + rect1.height + padding or rect2.y + rect2.height + padding <= rect1.y)
+
+
+class TestPack(unittest.TestCase):
+  
+  def assert_valid_bin(self, bin_, padding=0):
+    for rect in bin_.rectangles:
+      self.assertGreaterEqual(rect.x, 0)
+      self.assertGreaterEqual(rect.y, 0)
+      self.assertLessEqual(rect.x + rect.width, bin_.max_width)
+      self.assertLessEqual(rect.y + rect.height, bin_.max_height)
+    
+    for rect1, rect2 in itertools.combinations(bin_.rectangles, 2):
+      self.assertFalse(_overlap(rect1, rect2, padding), msg="{0} overlaps {1}".format(rect1, rect2))
+  
+  def test_pack_single_bin(self):
+    rectangles = [("a", 32, 32), ("b", 32, 32), ("c", 32, 32), ("d", 32, 32)]
+    bins = rectpacking.pack(rectangles, 64, 64)
+    
+    self.assertEqual(len(bins), 1)
+    self.assertEqual(len(bins[0].rectangles), 4)
+    self.assertEqual((bins[0].width, bins[0].height), (64, 64))
+    self.assert_valid_bin(bins[0])
+  
+  def test_pack_multiple_bins(self):
+    rectangles = [(str(i), 40, 40) for i in range(5)]
+    bins = rectpacking.pack(rectangles, 64, 64)
+    
+    self.assertEqual(len(bins), 5)
+    for bin_ in bins:
+      self.assert_valid_bin(bin_)
+  
+  def test_pack_keeps_all_keys(self):
+    rectangles = [(str(i), 5 + (i * 7) % 23, 3 + (i * 11) % 19) for i in range(60)]
+    bins = rectpacking.pack(rectangles, 64, 64)
+    
+    packed_keys = [rect.key for bin_ in bins for rect in bin_.rectangles]
+    self.assertEqual(sorted(packed_keys), sorted(key for key, _unused, _unused in rectangles))
+    for bin_ in bins:
+      self.assert_valid_bin(bin_)
+  
+  def test_pack_with_padding(self):
+    rectangles = [("a", 30, 30), ("b", 30, 30), ("c", 30, 30), ("d", 30, 30)]
+    bins = rectpacking.pack(rectangles, 64, 64, padding=4)
+    
+    self.assertEqual(len(bins), 1)
+    self.assert_valid_bin(bins[0], padding=4)
+  
+  def test_pack_with_padding_not_fitting(self):
+    rectangles = [("a", 32, 32), ("b", 32, 32)]
+    bins = rectpacking.pack(rectangles, 64, 32, padding=1)
+    
+    self.assertEqual(len(bins), 2)
+  
+  def test_pack_rectangle_too_large(self):
+    with self.assertRaises(rectpacking.RectangleTooLargeError) as cm:
+      rectpacking.pack([("a", 10, 10), ("b", 65, 10)], 64, 64)
+    
+    self.assertEqual(cm.exception.key, "b")
+  
+  def test_pack_empty(self):
+    self.assertEqual(rectpacking.pack([], 64, 64), [])
@@ -0,0 +1,147 @@
+#
+# This file is part of pygimplib.
+#
+# Copyright (C) 2014-2016 khalim19 <khalim19@gmail.com>
+#
+# pygimplib is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pygimplib is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with pygimplib.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+str = unicode
+
+import io
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from .. import runtests
+
+#===============================================================================
+
+TEST_PACKAGE_NAME = "runtests_test_package"
+
+TEST_MODULES = {
+  "__init__": "",
+  "test_passing": """
+import unittest
+
+class TestPassing(unittest.TestCase):
+  
+  def test_passing(self):
+    pass
+  
+  @unittest.skip("skipped")
+  def test_skipped(self):
+    pass
+""",
+  "test_failing": """
+import unittest
+
+class TestFailing(unittest.TestCase):
+  
+  def test_failing(self):
+    self.fail("failed")
+""",
+  "test_requiring_gimp": """
+import gimp
+""",
+  "test_failing_import": """
+import nonexistent_module
+""",
+  "helper": """
+raise ValueError("non-test modules must not be imported")
+""",
+}
+
+#===============================================================================
+
+
+class TestRunTestsInParallel(unittest.TestCase):
+  
+  def setUp(self):
+    self.path = tempfile.mkdtemp()
+    self.addCleanup(shutil.rmtree, self.path)
+    
+    os.mkdir(os.path.join(self.path, TEST_PACKAGE_NAME))
+    for module_name, contents in TEST_MODULES.items():
+      with io.open(
+             os.path.join(self.path, TEST_PACKAGE_NAME, module_name + ".py"), "w", encoding="utf-8") as f:
+        f.write(contents)
+    
+    self.addCleanup(self._remove_test_package)
+    
+    self.output_stream = io.StringIO()
+  
+  def _remove_test_package(self):
+    if self.path in sys.path:
+      sys.path.remove(self.path)
+    
+    for module_name in list(sys.modules):
+      if module_name.startswith(TEST_PACKAGE_NAME):
+        del sys.modules[module_name]
+  
+  def _run_tests(self, **kwargs):
+    module_results = runtests.run_tests_in_parallel(
+      self.path, num_processes=2, gimp_executable=os.path.join(self.path, "nonexistent_gimp"),
+      num_slowest_tests=2, output_stream=self.output_stream, **kwargs)
+    
+    return {module_result["module"]: module_result for module_result in module_results}
+  
+  def test_results_are_aggregated(self):
+    module_results = self._run_tests()
+    
+    self.assertEqual(
+      sorted(module_results),
+      [TEST_PACKAGE_NAME + ".test_failing", TEST_PACKAGE_NAME + ".test_failing_import",
+       TEST_PACKAGE_NAME + ".test_passing", TEST_PACKAGE_NAME + ".test_requiring_gimp"])
+    
+    self.assertEqual(
+      sorted(test["outcome"] for test in module_results[TEST_PACKAGE_NAME + ".test_passing"]["tests"]),
+      ["skipped", "success"])
+    
+    failing_test = module_results[TEST_PACKAGE_NAME + ".test_failing"]["tests"][0]
+    self.assertEqual(failing_test["outcome"], "failure")
+    self.assertIn("failed", failing_test["details"])
+    self.assertGreaterEqual(failing_test["duration"], 0.0)
+    
+    self.assertFalse(module_results[TEST_PACKAGE_NAME + ".test_failing_import"]["requires_gimp"])
+    self.assertIn("nonexistent_module", module_results[TEST_PACKAGE_NAME + ".test_failing_import"]["error"])
+    
+    self.assertFalse(runtests.is_successful(module_results.values()))
+    
+    output = self.output_stream.getvalue()
+    self.assertIn("Slowest tests:", output)
+    self.assertIn("Ran 3 tests in 4 modules", output)
+    self.assertIn("FAILED (failures=1, module errors=2, skipped=1)", output)
+  
+  def test_modules_requiring_gimp_are_run_in_gimp(self):
+    module_results = self._run_tests(gimp_modules=[TEST_PACKAGE_NAME + ".test_passing"])
+    
+    for module_name in ["test_requiring_gimp", "test_passing"]:
+      module_result = module_results[TEST_PACKAGE_NAME + "." + module_name]
+      self.assertTrue(module_result["requires_gimp"])
+      self.assertIn("could not be run", module_result["error"])
+  
+  def test_only_successful_modules(self):
+    module_results = self._run_tests(modules=[TEST_PACKAGE_NAME + ".test_passing"])
+    
+    self.assertTrue(runtests.is_successful(module_results.values()))
+    self.assertIn("OK (skipped=1)", self.output_stream.getvalue())
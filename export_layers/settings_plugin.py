@@ -37,6 +37,7 @@ import gimpenums
 import export_layers.pygimplib as pygimplib
 
 from export_layers.pygimplib import overwrite
+from export_layers.pygimplib import pgfileformats
 from export_layers.pygimplib import pgpath
 from export_layers.pygimplib import pgsetting
 from export_layers.pygimplib import pgsettinggroup
@@ -85,7 +86,8 @@ def create_settings():
       'type': pgsetting.SettingTypes.file_extension,
       'name': 'file_extension',
       'default_value': "png",
-      'display_name': "File extension"
+      'display_name': "File extension",
+      'description': _("File extension (multiple file extensions can be separated by commas)")
     },
     {
       'type': pgsetting.SettingTypes.string,
@@ -216,6 +218,27 @@ def create_settings():
       'default_value': False,
       'display_name': _("Use file extensions in layer names")
     },
+    {
+      'type': pgsetting.SettingTypes.boolean,
+      'name': 'export_as_atlas',
+      'default_value': False,
+      'display_name': _("Export layers as atlas"),
+      # The atlas settings would be of no use in the non-interactive run mode
+      # without this setting.
+      'pdb_type': pgsetting.SettingPdbTypes.automatic
+    },
+    {
+      'type': pgsetting.SettingTypes.boolean,
+      'name': 'deduplicate_layers',
+      'default_value': False,
+      'display_name': _("Reuse files of identical layers")
+    },
+    {
+      'type': pgsetting.SettingTypes.boolean,
+      'name': 'write_manifest',
+      'default_value': False,
+      'display_name': _("Write export manifest")
+    },
   ], pdb_type=None, setting_sources=[pygimplib.config.SOURCE_SESSION, pygimplib.config.SOURCE_PERSISTENT])
   
   more_filters_settings = pgsettinggroup.SettingGroup('more_filters', [
@@ -239,7 +262,60 @@ def create_settings():
     },
   ], pdb_type=None, setting_sources=[pygimplib.config.SOURCE_SESSION, pygimplib.config.SOURCE_PERSISTENT])
   
-  main_settings.add([more_operations_settings, more_filters_settings])
+  atlas_settings = pgsettinggroup.SettingGroup('atlas', [
+    {
+      'type': pgsetting.SettingTypes.integer,
+      'name': 'max_width',
+      'default_value': 2048,
+      'min_value': 1,
+      'display_name': _("Maximum atlas width")
+    },
+    {
+      'type': pgsetting.SettingTypes.integer,
+      'name': 'max_height',
+      'default_value': 2048,
+      'min_value': 1,
+      'display_name': _("Maximum atlas height")
+    },
+    {
+      'type': pgsetting.SettingTypes.integer,
+      'name': 'padding',
+      'default_value': 0,
+      'min_value': 0,
+      'display_name': _("Padding between layers in atlas")
+    },
+  ], setting_sources=[pygimplib.config.SOURCE_SESSION, pygimplib.config.SOURCE_PERSISTENT])
+  
+  scales_settings = pgsettinggroup.SettingGroup('scales', [
+    {
+      'type': pgsetting.SettingTypes.string,
+      'name': 'scale_factors',
+      'default_value': "",
+      'display_name': _("Scale factors (separated by commas)")
+    },
+    {
+      'type': pgsetting.SettingTypes.enumerated,
+      'name': 'scaled_filename_mode',
+      'default_value': 'suffix',
+      'items': [('suffix', _("Append to filename")),
+                ('folder', _("Create folder"))],
+      'display_name': _("Naming of scaled images")
+    },
+    {
+      'type': pgsetting.SettingTypes.string,
+      'name': 'scaled_filename_format',
+      'default_value': "@{scale}x",
+      'display_name': _("Filename suffix or folder name of scaled images")
+    },
+  ], setting_sources=[pygimplib.config.SOURCE_SESSION, pygimplib.config.SOURCE_PERSISTENT])
+  
+  # Parameters of file save procedures used in the non-interactive run mode
+  save_parameters_settings = pgsettinggroup.SettingGroup(
+    'save_parameters', _create_save_parameters_setting_groups())
+  
+  main_settings.add([
+    more_operations_settings, more_filters_settings, atlas_settings, scales_settings,
+    save_parameters_settings])
   
   #-----------------------------------------------------------------------------
   
@@ -294,6 +370,38 @@ def create_settings():
   return settings
 
 
+def _create_save_parameters_setting_groups():
+  setting_groups = []
+  
+  for file_format in pgfileformats.file_formats:
+    if not file_format.save_procedure_func_args:
+      continue
+    
+    setting_dicts = []
+    for save_parameter in file_format.save_procedure_func_args:
+      setting_dict = {
+        'type': getattr(pgsetting.SettingTypes, save_parameter.type),
+        'name': save_parameter.name,
+        'default_value': save_parameter.default_value,
+        'display_name': _(save_parameter.display_name),
+        # Parameter names alone do not indicate the file format in the PDB.
+        'description': "{0} - {1}".format(file_format.description, _(save_parameter.display_name))
+      }
+      
+      if save_parameter.min_value is not None:
+        setting_dict['min_value'] = save_parameter.min_value
+      if save_parameter.max_value is not None:
+        setting_dict['max_value'] = save_parameter.max_value
+      
+      setting_dicts.append(setting_dict)
+    
+    setting_groups.append(pgsettinggroup.SettingGroup(
+      file_format.file_extensions[0], setting_dicts,
+      setting_sources=[pygimplib.config.SOURCE_SESSION, pygimplib.config.SOURCE_PERSISTENT]))
+  
+  return setting_groups
+
+
 #===============================================================================
 
 
@@ -0,0 +1,128 @@
+#
+# This file is part of Export Layers.
+#
+# Copyright (C) 2013-2016 khalim19 <khalim19@gmail.com>
+#
+# Export Layers is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Export Layers is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Export Layers.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+This module contains benchmarks of the export of layers, run via
+`pygimplib.runbenchmarks`.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+str = unicode
+
+import importlib
+import shutil
+import tempfile
+
+import gimpenums
+
+from ..pygimplib.lib import mock
+
+from .. import pygimplib
+from .. import config
+reload(config)
+
+pygimplib.init()
+
+from ..pygimplib.tests import gimpstubs
+
+try:
+  from ..pygimplib.tests import gimpfake
+except ImportError:
+  # NumPy is not installed.
+  gimpfake = None
+
+from .. import exportlayers
+from .. import settings_plugin
+
+#===============================================================================
+
+PLUGIN_PACKAGE_NAME = __name__.split(".")[0]
+
+#===============================================================================
+
+
+def get_benchmarks(num_layers, depth, duplicate_name_ratio, tag_density, **kwargs):
+  """
+  Return a benchmark of the export performing only operations on layer names
+  (as done for the name preview in the GUI), with tagged layers processed as
+  background/foreground.
+  
+  If NumPy is installed, also return a benchmark of the full export (including
+  layer contents and saving to PNG) using the pixel-backed fake of the GIMP
+  API.
+  """
+  
+  image = gimpstubs.create_image(
+    num_layers, depth=depth, duplicate_name_ratio=duplicate_name_ratio, tag_density=tag_density,
+    tags_source_name=pygimplib.config.SOURCE_PERSISTENT_NAME)
+  
+  settings = settings_plugin.create_settings()
+  settings['main/layer_groups_as_folders'].set_value(True)
+  settings['main/process_tagged_layers'].set_value(True)
+  
+  @mock.patch(PLUGIN_PACKAGE_NAME + ".pygimplib.pgitemtree.pdb", new=gimpstubs.PdbStub())
+  @mock.patch(PLUGIN_PACKAGE_NAME + ".pygimplib.pgitemtree.gimp.GroupLayer", new=gimpstubs.LayerGroupStub)
+  def _export_layer_names():
+    layer_exporter = exportlayers.LayerExporter(gimpenums.RUN_NONINTERACTIVE, image, settings['main'])
+    layer_exporter.export_layers(operations=['layer_name'])
+  
+  benchmarks = {
+    "export_layers_layer_name": _export_layer_names,
+  }
+  
+  if gimpfake is not None:
+    benchmarks["export_layers_pixels"] = _get_export_layers_pixels_benchmark(num_layers, depth)
+  
+  return benchmarks
+
+
+def _get_export_layers_pixels_benchmark(num_layers, depth):
+  # The plug-in modules are imported with the fake only once. The objects
+  # created here keep referring to the fake after leaving the `with` block.
+  with gimpfake.installed():
+    fake_pygimplib = importlib.import_module(PLUGIN_PACKAGE_NAME + ".pygimplib")
+    importlib.import_module(PLUGIN_PACKAGE_NAME + ".config")
+    fake_pygimplib.init()
+    
+    fake_exportlayers = importlib.import_module(PLUGIN_PACKAGE_NAME + ".exportlayers")
+    fake_settings_plugin = importlib.import_module(PLUGIN_PACKAGE_NAME + ".settings_plugin")
+    
+    fake_settings = fake_settings_plugin.create_settings()
+  
+  image = gimpfake.create_image(512, 512, num_layers, depth=depth)
+  
+  fake_settings['main/layer_groups_as_folders'].set_value(True)
+  fake_settings['main/more_operations/autocrop'].set_value(True)
+  
+  def _export_layers():
+    output_directory = tempfile.mkdtemp()
+    fake_settings['main/output_directory'].set_value(output_directory)
+    
+    try:
+      layer_exporter = fake_exportlayers.LayerExporter(
+        gimpfake.gimpenums.RUN_NONINTERACTIVE, image, fake_settings['main'])
+      layer_exporter.export_layers()
+    finally:
+      shutil.rmtree(output_directory)
+  
+  return _export_layers
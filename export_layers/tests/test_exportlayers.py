@@ -28,6 +28,7 @@ str = unicode
 import inspect
 import os
 import shutil
+import tempfile
 import unittest
 
 import gimp
@@ -48,6 +49,11 @@ from ..pygimplib import pgsettinggroup
 from .. import exportlayers
 from .. import settings_plugin
 
+if pgpdb.numpy is not None:
+  from ..pygimplib.tests import pixelcache
+else:
+  pixelcache = None
+
 #===============================================================================
 
 _current_module_dir = os.path.dirname(inspect.getfile(inspect.currentframe()))
@@ -56,6 +62,30 @@ TEST_IMAGES_DIR = os.path.join(RESOURCES_DIR, "Test images")
 
 EXPECTED_RESULTS_DIR = os.path.join(TEST_IMAGES_DIR, "Expected results")
 OUTPUT_DIR = os.path.join(TEST_IMAGES_DIR, "Temp output")
+# Images highlighting differences between processed and expected layers are
+# saved here if the layers are not identical.
+DIFF_OUTPUT_DIR = os.path.join(TEST_IMAGES_DIR, "Temp diffs")
+# Expected results decoded into arrays are stored here to speed up subsequent
+# test runs.
+EXPECTED_RESULTS_CACHE_DIR = os.path.join(tempfile.gettempdir(), "export_layers_expected_results_cache")
+
+#===============================================================================
+
+
+def _load_layer_pixels(filepath):
+  image = pdb.gimp_file_load(filepath, os.path.basename(filepath))
+  try:
+    return pgpdb.get_layer_pixels(image.layers[0])
+  finally:
+    pdb.gimp_image_delete(image)
+
+
+# Expected results are decoded only once and shared across all tests. If NumPy
+# is not available, expected results are loaded as layers per test class.
+if pixelcache is not None:
+  expected_results_cache = pixelcache.PixelCache(_load_layer_pixels, EXPECTED_RESULTS_CACHE_DIR)
+else:
+  expected_results_cache = None
 
 #===============================================================================
 
@@ -87,6 +117,9 @@ class TestExportLayersCompareLayerContents(unittest.TestCase):
     
     pdb.gimp_context_pop()
     pdb.gimp_progress_end()
+    
+    if os.path.exists(DIFF_OUTPUT_DIR) and not os.listdir(DIFF_OUTPUT_DIR):
+      os.rmdir(DIFF_OUTPUT_DIR)
   
   def setUp(self):
     self.image_with_results = None
@@ -200,29 +233,64 @@ class TestExportLayersCompareLayerContents(unittest.TestCase):
     if expected_results_dir is None:
       expected_results_dir = self.default_expected_layers_dir
     
-    if expected_results_dir not in self.expected_images:
-      self.expected_images[expected_results_dir], expected_layers = (
-        self._load_layers_from_dir(expected_results_dir))
-    else:
-      expected_layers = {layer.name: layer for layer in self.expected_images[expected_results_dir].layers}
+    if expected_results_cache is None and expected_results_dir not in self.expected_images:
+      self.expected_images[expected_results_dir], _unused = self._load_layers_from_dir(expected_results_dir)
     
     param_values = pgsettinggroup.PdbParamCreator.list_param_values([settings])
     pdb.plug_in_export_layers(*param_values)
     
-    self.image_with_results, layers = self._load_layers_from_dir(self.output_directory)
-    
+    # key: processed layer name; value: expected layer name
+    expected_layer_names = {}
     if different_results_and_expected_layers is not None:
-      for layer_name, expected_layer_name in different_results_and_expected_layers:
-        expected_layers[layer_name] = expected_layers[expected_layer_name]
+      expected_layer_names.update(different_results_and_expected_layers)
+    
+    if expected_results_cache is not None:
+      self._compare_with_cached_expected_results(expected_results_dir, expected_layer_names)
+    else:
+      self._compare_with_expected_layers(expected_results_dir, expected_layer_names)
+  
+  def _compare_with_cached_expected_results(self, expected_results_dir, expected_layer_names):
+    expected_filepaths = {
+      os.path.splitext(os.path.basename(filepath))[0]: filepath
+      for filepath in self._list_layers_files(expected_results_dir)}
+    
+    for filepath in self._list_layers_files(self.output_directory):
+      layer_name = os.path.splitext(os.path.basename(filepath))[0]
+      expected_layer_name = expected_layer_names.get(layer_name, layer_name)
+      
+      diff_image_filepath = self._get_diff_image_filepath(layer_name)
+      
+      self.assertEqual(
+        pgpdb.compare_layer_pixels(
+          [_load_layer_pixels(filepath), expected_results_cache.get(expected_filepaths[expected_layer_name])],
+          diff_image_filepath=diff_image_filepath),
+        True,
+        msg=self._get_layers_not_identical_message(layer_name, expected_layer_name, diff_image_filepath))
+  
+  def _compare_with_expected_layers(self, expected_results_dir, expected_layer_names):
+    expected_layers = {layer.name: layer for layer in self.expected_images[expected_results_dir].layers}
+    
+    self.image_with_results, layers = self._load_layers_from_dir(self.output_directory)
     
     for layer in layers.values():
-      self._compare_layers(layer, expected_layers[layer.name])
+      self._compare_layers(layer, expected_layers[expected_layer_names.get(layer.name, layer.name)])
   
   def _compare_layers(self, layer, expected_layer):
-    self.assertEqual(pgpdb.compare_layers([layer, expected_layer]), True,
-      msg=(
-        "Layers are not identical:\nprocessed layer: {0}\nexpected layer: {1}".format(
-          layer.name, expected_layer.name)))
+    diff_image_filepath = self._get_diff_image_filepath(layer.name)
+    
+    self.assertEqual(pgpdb.compare_layers([layer, expected_layer], diff_image_filepath=diff_image_filepath), True,
+      msg=self._get_layers_not_identical_message(layer.name, expected_layer.name, diff_image_filepath))
+  
+  def _get_diff_image_filepath(self, layer_name):
+    if not os.path.exists(DIFF_OUTPUT_DIR):
+      os.makedirs(DIFF_OUTPUT_DIR)
+    
+    return os.path.join(DIFF_OUTPUT_DIR, "{0}_{1}.png".format(self.id().split(".")[-1], layer_name))
+  
+  def _get_layers_not_identical_message(self, layer_name, expected_layer_name, diff_image_filepath):
+    return (
+      "Layers are not identical:\nprocessed layer: {0}\nexpected layer: {1}\n"
+      "differences (if NumPy is available): {2}".format(layer_name, expected_layer_name, diff_image_filepath))
   
   @classmethod
   def _load_image(cls):
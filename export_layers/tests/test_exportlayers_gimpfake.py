@@ -0,0 +1,387 @@
+#
+# This file is part of Export Layers.
+#
+# Copyright (C) 2013-2016 khalim19 <khalim19@gmail.com>
+#
+# Export Layers is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Export Layers is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Export Layers.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""
+This module tests the export of layers end-to-end outside GIMP using the
+pixel-backed fake of the GIMP API (`pygimplib.tests.gimpfake`).
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+str = unicode
+
+import contextlib
+import importlib
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from ..pygimplib.lib import mock
+
+try:
+  import numpy
+except ImportError:
+  numpy = None
+  gimpfake = None
+else:
+  from ..pygimplib.tests import gimpfake
+
+#===============================================================================
+
+PLUGIN_PACKAGE_NAME = __name__.split(".")[0]
+
+#===============================================================================
+
+
+def import_plugin_modules():
+  """
+  Import and initialize modules required to run the export. Return the
+  `exportlayers` and `settings_plugin` modules.
+  """
+  
+  pygimplib = importlib.import_module(PLUGIN_PACKAGE_NAME + ".pygimplib")
+  importlib.import_module(PLUGIN_PACKAGE_NAME + ".config")
+  pygimplib.init()
+  
+  return (
+    importlib.import_module(PLUGIN_PACKAGE_NAME + ".exportlayers"),
+    importlib.import_module(PLUGIN_PACKAGE_NAME + ".settings_plugin"))
+
+
+#===============================================================================
+
+
+@unittest.skipIf(numpy is None, "NumPy is not installed")
+class TestExportLayersWithGimpFake(unittest.TestCase):
+  
+  def setUp(self):
+    self.output_directory = tempfile.mkdtemp()
+    self.addCleanup(shutil.rmtree, self.output_directory)
+  
+  def _export(self, image, settings_values=None, **layer_exporter_kwargs):
+    with gimpfake.installed():
+      exportlayers, settings_plugin = import_plugin_modules()
+      
+      settings = settings_plugin.create_settings()
+      settings['main/output_directory'].set_value(self.output_directory)
+      for setting_name, value in (settings_values or {}).items():
+        settings['main/' + setting_name].set_value(value)
+      
+      self.layer_exporter = exportlayers.LayerExporter(
+        gimpfake.gimpenums.RUN_NONINTERACTIVE, image, settings['main'], **layer_exporter_kwargs)
+      self.layer_exporter.export_layers()
+    
+    return self.layer_exporter
+  
+  def _read_manifest(self):
+    with open(os.path.join(self.output_directory, "image_manifest.jsonl")) as manifest_file:
+      return [json.loads(line) for line in manifest_file]
+  
+  def _read_output(self, *path_components):
+    return gimpfake.read_png(os.path.join(self.output_directory, *path_components))
+  
+  def test_export_layers(self):
+    image = gimpfake.create_image(64, 64, 5, layer_size_range=(8, 16), seed=2)
+    
+    self._export(image)
+    
+    self.assertEqual(
+      sorted(os.listdir(self.output_directory)), ["layer {0}.png".format(index) for index in range(5)])
+    
+    for layer in image.layers:
+      numpy.testing.assert_array_equal(self._read_output(layer.name.decode() + ".png"), layer.pixels)
+  
+  def test_export_layers_with_groups_as_folders_and_autocrop(self):
+    image = gimpfake.create_image(64, 64, 8, layer_size_range=(8, 16), depth=2, num_groups_per_parent=2, seed=3)
+    
+    self._export(image, {'layer_groups_as_folders': True, 'more_operations/autocrop': True})
+    
+    self.assertEqual(sorted(os.listdir(self.output_directory)), ["group 0-0-0", "group 0-0-1"])
+    
+    for group in image.layers:
+      for layer in group.children:
+        output_pixels = self._read_output(group.name.decode(), layer.name.decode() + ".png")
+        self.assertTrue(output_pixels[0, :, 3].any() and output_pixels[:, 0, 3].any())
+  
+  def test_deduplicate_layers(self):
+    image = gimpfake.create_image(64, 64, 3, layer_size_range=(8, 16), seed=2)
+    image.layers[2].pixels = image.layers[0].pixels.copy()
+    
+    layer_exporter = self._export(image, {'more_operations/deduplicate_layers': True})
+    
+    self.assertEqual(layer_exporter.num_deduplicated_layers, 1)
+    numpy.testing.assert_array_equal(self._read_output("layer 2.png"), image.layers[0].pixels)
+  
+  def test_number_of_deduplicated_layers_is_displayed_in_progress(self):
+    image = gimpfake.create_image(64, 64, 3, layer_size_range=(8, 16), seed=2)
+    image.layers[2].pixels = image.layers[0].pixels.copy()
+    
+    progress_updater = mock.Mock(num_total_tasks=0)
+    
+    self._export(image, {'more_operations/deduplicate_layers': True}, progress_updater=progress_updater)
+    
+    self.assertIn("1 layer(s)", progress_updater.update_text.call_args[0][0])
+  
+  def test_export_layers_in_steps_keeps_image_copy(self):
+    image = gimpfake.create_image(64, 64, 3, layer_size_range=(8, 16), seed=2)
+    
+    with gimpfake.installed():
+      exportlayers, settings_plugin = import_plugin_modules()
+      
+      settings = settings_plugin.create_settings()
+      settings['main/output_directory'].set_value(self.output_directory)
+      
+      layer_exporter = exportlayers.LayerExporter(
+        gimpfake.gimpenums.RUN_NONINTERACTIVE, image, settings['main'])
+      
+      export_steps = layer_exporter.export_layers_in_steps(keep_exported_layers=True)
+      next(export_steps)
+      export_steps.close()
+      
+      self.assertIsNone(layer_exporter.kept_image_copy)
+      
+      for _unused in layer_exporter.export_layers_in_steps(keep_exported_layers=True):
+        pass
+    
+    self.assertIsNotNone(layer_exporter.kept_image_copy)
+    self.assertEqual(len(layer_exporter.kept_image_copy.layers), 3)
+  
+  def test_export_layers_as_atlas(self):
+    image = gimpfake.create_image(64, 64, 4, layer_size_range=(8, 16), seed=2)
+    
+    self._export(image, {'more_operations/export_as_atlas': True, 'atlas/padding': 2})
+    
+    self.assertEqual(sorted(os.listdir(self.output_directory)), ["image.json", "image.png"])
+    
+    with open(os.path.join(self.output_directory, "image.json")) as atlas_data_file:
+      atlas_data = json.load(atlas_data_file)
+    
+    atlas_pixels = self._read_output("image.png")
+    
+    self.assertEqual(atlas_data["image"], "image.png")
+    self.assertEqual(atlas_pixels.shape[:2], (atlas_data["height"], atlas_data["width"]))
+    self.assertEqual(sorted(atlas_data["layers"]), ["layer {0}".format(index) for index in range(4)])
+    
+    for layer in image.layers:
+      rectangle = atlas_data["layers"][layer.name.decode()]
+      self.assertEqual((rectangle["width"], rectangle["height"]), (layer.width, layer.height))
+      numpy.testing.assert_array_equal(
+        atlas_pixels[
+          rectangle["y"]:rectangle["y"] + rectangle["height"], rectangle["x"]:rectangle["x"] + rectangle["width"]],
+        layer.pixels)
+    
+    self.assertEqual(
+      sorted(layer.name for layer in self.layer_exporter.exported_layers),
+      sorted(layer.name for layer in image.layers))
+  
+  def test_layers_in_skipped_atlas_are_not_exported(self):
+    image = gimpfake.create_image(64, 64, 2, layer_size_range=(8, 16), seed=2)
+    with open(os.path.join(self.output_directory, "image.png"), "wb"):
+      pass
+    
+    # Overwrite mode 1 is "skip".
+    layer_exporter = self._export(image, {'more_operations/export_as_atlas': True, 'overwrite_mode': 1})
+    
+    self.assertEqual(layer_exporter.exported_layers, [])
+    self.assertFalse(os.path.exists(os.path.join(self.output_directory, "image.json")))
+  
+  def test_export_layers_as_atlas_in_multiple_scales_is_not_supported(self):
+    image = gimpfake.create_image(64, 64, 2, seed=2)
+    
+    # The exception class is defined in the plug-in modules imported with the
+    # fake, hence the class name is compared.
+    with self.assertRaises(Exception) as context_manager:
+      self._export(image, {'more_operations/export_as_atlas': True, 'scales/scale_factors': "1, 0.5"})
+    
+    self.assertEqual(type(context_manager.exception).__name__, "ExportLayersError")
+    self.assertEqual(os.listdir(self.output_directory), [])
+  
+  def test_export_layers_in_multiple_file_formats(self):
+    image = gimpfake.create_image(64, 64, 2, layer_size_range=(8, 16), seed=2)
+    
+    self._export(image, {'file_extension': "png, raw"})
+    
+    self.assertEqual(
+      sorted(os.listdir(self.output_directory)),
+      ["layer 0.png", "layer 0.raw", "layer 1.png", "layer 1.raw"])
+    
+    for layer in image.layers:
+      numpy.testing.assert_array_equal(self._read_output(layer.name.decode() + ".png"), layer.pixels)
+      with open(os.path.join(self.output_directory, layer.name.decode() + ".raw"), "rb") as raw_file:
+        self.assertEqual(raw_file.read(), layer.pixels.tostring())
+  
+  def test_export_layers_in_multiple_file_formats_with_file_extensions_in_layer_names(self):
+    image = gimpfake.create_image(64, 64, 2, layer_size_range=(8, 16), seed=2)
+    image.layers[0].name = b"layer 0.data"
+    
+    self._export(
+      image, {'file_extension': "png, raw", 'more_operations/use_file_extensions_in_layer_names': True})
+    
+    self.assertEqual(
+      sorted(os.listdir(self.output_directory)),
+      ["layer 0.data", "layer 0.png", "layer 0.raw", "layer 1.png", "layer 1.raw"])
+  
+  def test_export_layers_in_multiple_scales(self):
+    image = gimpfake.create_image(64, 64, 1, layer_size_range=(16, 16), seed=2)
+    
+    self._export(image, {'file_extension': "png, raw", 'scales/scale_factors': "1, 0.5"})
+    
+    self.assertEqual(
+      sorted(os.listdir(self.output_directory)),
+      ["layer 0@0.5x.png", "layer 0@0.5x.raw", "layer 0@1x.png", "layer 0@1x.raw"])
+    
+    numpy.testing.assert_array_equal(self._read_output("layer 0@1x.png"), image.layers[0].pixels)
+    self.assertEqual(self._read_output("layer 0@0.5x.png").shape, (8, 8, 4))
+  
+  def test_export_layers_in_multiple_scales_to_folders_with_invalid_characters(self):
+    image = gimpfake.create_image(64, 64, 1, layer_size_range=(16, 16), seed=2)
+    
+    self._export(
+      image,
+      {'scales/scale_factors': "1, 0.5",
+       # 'folder' item
+       'scales/scaled_filename_mode': 1,
+       'scales/scaled_filename_format': "x/{scale}?"})
+    
+    self.assertEqual(sorted(os.listdir(self.output_directory)), ["x0.5", "x1"])
+    self.assertEqual(os.listdir(os.path.join(self.output_directory, "x0.5")), ["layer 0.png"])
+  
+  def test_invalid_scaled_filename_format(self):
+    image = gimpfake.create_image(64, 64, 1, seed=2)
+    
+    for scaled_filename_format in ["{foo}", "{", "{0}"]:
+      with self.assertRaises(Exception) as context_manager:
+        self._export(
+          image, {'scales/scale_factors': "1, 0.5", 'scales/scaled_filename_format': scaled_filename_format})
+      
+      self.assertEqual(type(context_manager.exception).__name__, "ExportLayersError")
+    
+    self.assertEqual(os.listdir(self.output_directory), [])
+  
+  def test_write_manifest(self):
+    image = gimpfake.create_image(64, 64, 3, layer_size_range=(8, 16), seed=2)
+    image.layers[2].pixels = image.layers[0].pixels.copy()
+    
+    layer_exporter = self._export(
+      image, {'more_operations/write_manifest': True, 'more_operations/deduplicate_layers': True})
+    
+    manifest_entries = self._read_manifest()
+    
+    self.assertEqual(layer_exporter.manifest_filename, os.path.join(self.output_directory, "image_manifest.jsonl"))
+    self.assertEqual(
+      [(entry["layer_id"], entry["layer_path"], os.path.basename(entry["output_path"]), entry["format"])
+       for entry in manifest_entries],
+      [(layer.ID, layer.name.decode(), layer.name.decode() + ".png", "png") for layer in image.layers])
+    
+    for entry, layer in zip(manifest_entries, image.layers):
+      self.assertEqual((entry["width"], entry["height"]), (layer.width, layer.height))
+      self.assertEqual(entry["size"], os.path.getsize(entry["output_path"]))
+    
+    self.assertNotIn("duplicate_of", manifest_entries[0])
+    self.assertNotIn("duplicate_of", manifest_entries[1])
+    self.assertEqual(manifest_entries[2]["duplicate_of"], manifest_entries[0]["output_path"])
+    self.assertEqual(manifest_entries[2]["hash"], manifest_entries[0]["hash"])
+    self.assertNotEqual(manifest_entries[1]["hash"], manifest_entries[0]["hash"])
+  
+  def test_write_manifest_with_hashes_without_deduplication(self):
+    image = gimpfake.create_image(64, 64, 3, layer_size_range=(8, 16), seed=2)
+    image.layers[2].pixels = image.layers[0].pixels.copy()
+    
+    self._export(image, {'more_operations/write_manifest': True})
+    
+    manifest_entries = self._read_manifest()
+    
+    self.assertTrue(all(entry["hash"] is not None for entry in manifest_entries))
+    self.assertEqual(manifest_entries[2]["hash"], manifest_entries[0]["hash"])
+    self.assertNotEqual(manifest_entries[1]["hash"], manifest_entries[0]["hash"])
+    self.assertNotIn("duplicate_of", manifest_entries[2])
+  
+  def test_write_manifest_for_atlas(self):
+    image = gimpfake.create_image(64, 64, 2, layer_size_range=(8, 16), seed=2)
+    
+    self._export(image, {'more_operations/write_manifest': True, 'more_operations/export_as_atlas': True})
+    
+    manifest_entries = self._read_manifest()
+    
+    self.assertEqual(len(manifest_entries), 1)
+    self.assertEqual(os.path.basename(manifest_entries[0]["output_path"]), "image.png")
+    self.assertIsNone(manifest_entries[0]["layer_id"])
+    self.assertIsNotNone(manifest_entries[0]["hash"])
+  
+  def test_manifest_is_closed_on_error(self):
+    image = gimpfake.create_image(64, 64, 2, layer_size_range=(8, 16), seed=2)
+    
+    # The fake cannot save TGA images, hence the export fails after saving the
+    # first layer as PNG.
+    with self.assertRaises(Exception) as context_manager:
+      self._export(image, {'file_extension': "png, tga", 'more_operations/write_manifest': True})
+    
+    self.assertEqual(type(context_manager.exception).__name__, "ExportLayersError")
+    self.assertIsNone(self.layer_exporter._manifest_file)
+    self.assertEqual(
+      [os.path.basename(entry["output_path"]) for entry in self._read_manifest()], ["layer 0.png"])
+  
+  def test_manifest_is_closed_on_cancel(self):
+    image = gimpfake.create_image(64, 64, 2, layer_size_range=(8, 16), seed=2)
+    
+    @contextlib.contextmanager
+    def _stop_after_export(*args):
+      yield
+      self.layer_exporter.should_stop = True
+    
+    with self.assertRaises(Exception) as context_manager:
+      self._export(
+        image, {'more_operations/write_manifest': True}, export_context_manager=_stop_after_export)
+    
+    self.assertEqual(type(context_manager.exception).__name__, "ExportLayersCancelError")
+    self.assertIsNone(self.layer_exporter._manifest_file)
+    self.assertEqual(
+      [os.path.basename(entry["output_path"]) for entry in self._read_manifest()], ["layer 0.png"])
+  
+  def test_names_computed_again_only_for_reset_layers(self):
+    image = gimpfake.create_image(64, 64, 8, layer_size_range=(8, 16), depth=2, num_groups_per_parent=2, seed=3)
+    
+    with gimpfake.installed():
+      exportlayers, settings_plugin = import_plugin_modules()
+      
+      settings = settings_plugin.create_settings()
+      settings['main/layer_groups_as_folders'].set_value(True)
+      # Identical names make layers depend on each other through uniquification.
+      settings['main/layer_filename_pattern'].set_value("image")
+      
+      layer_exporter = exportlayers.LayerExporter(
+        gimpfake.gimpenums.RUN_NONINTERACTIVE, image, settings['main'])
+      layer_exporter.export_layers(operations=['layer_name'])
+      
+      layer_tree = layer_exporter.layer_tree
+      orig_names = {layer_elem.item.ID: layer_elem.name for layer_elem in layer_tree}
+      
+      layer_tree.reset_item_elements(layer_tree[image.layers[0].ID].children)
+      
+      self.assertEqual(layer_tree[image.layers[0].children[1].ID].name, image.layers[0].children[1].name.decode())
+      
+      layer_exporter.export_layers(operations=['layer_name'], layer_tree=layer_tree)
+    
+    self.assertEqual({layer_elem.item.ID: layer_elem.name for layer_elem in layer_tree}, orig_names)
+    self.assertEqual(layer_tree[image.layers[1].children[1].ID].name, "image (1).png")
@@ -0,0 +1,115 @@
+#
+# This file is part of Export Layers.
+#
+# Copyright (C) 2013-2016 khalim19 <khalim19@gmail.com>
+#
+# Export Layers is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Export Layers is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Export Layers.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+str = unicode
+
+import contextlib
+import importlib
+import time
+import unittest
+
+try:
+  import gimp
+except ImportError:
+  gimp = None
+
+try:
+  import numpy
+except ImportError:
+  numpy = None
+  gimpfake = None
+else:
+  from ..pygimplib.tests import gimpfake
+
+from ..pygimplib.tests import importtime
+
+#===============================================================================
+
+PLUGIN_PACKAGE_NAME = __name__.split(".")[0]
+
+# Maximum time to import the modules required by non-interactive runs of the
+# plug-in and to create the plug-in settings.
+IMPORT_TIME_BUDGET_SECONDS = 1.0
+
+GUI_MODULE_NAMES = [
+  PLUGIN_PACKAGE_NAME + ".gui_plugin",
+  PLUGIN_PACKAGE_NAME + ".gui_previews",
+  PLUGIN_PACKAGE_NAME + ".pygimplib.pggui",
+  PLUGIN_PACKAGE_NAME + ".pygimplib.pggui_entries",
+  PLUGIN_PACKAGE_NAME + ".pygimplib.pgsettingpresenters_gtk",
+]
+
+#===============================================================================
+
+
+def _import_noninteractive_modules():
+  """
+  Import modules and create settings the same way the plug-in does for
+  non-interactive runs.
+  """
+  
+  pygimplib = importlib.import_module(PLUGIN_PACKAGE_NAME + ".pygimplib")
+  importlib.import_module(PLUGIN_PACKAGE_NAME + ".config")
+  pygimplib.init()
+  
+  importlib.import_module(PLUGIN_PACKAGE_NAME + ".exportlayers")
+  settings_plugin = importlib.import_module(PLUGIN_PACKAGE_NAME + ".settings_plugin")
+  settings_plugin.create_settings()
+
+
+@contextlib.contextmanager
+def _gimp_modules():
+  """
+  Provide GIMP modules required by the plug-in. Outside GIMP, the pixel-backed
+  fake of the GIMP API is installed.
+  """
+  
+  if gimp is not None:
+    yield
+  else:
+    with gimpfake.installed():
+      yield
+
+
+#===============================================================================
+
+
+@unittest.skipIf(
+  gimp is None and numpy is None, "GIMP modules are not available and NumPy is not installed")
+class TestNonInteractiveImports(unittest.TestCase):
+  
+  def test_gui_modules_are_not_imported(self):
+    with _gimp_modules(), importtime.isolated_imports([PLUGIN_PACKAGE_NAME]) as imported_module_names:
+      _import_noninteractive_modules()
+    
+    for module_name in GUI_MODULE_NAMES:
+      self.assertNotIn(module_name, imported_module_names)
+  
+  def test_import_time_within_budget(self):
+    with _gimp_modules(), importtime.isolated_imports([PLUGIN_PACKAGE_NAME]):
+      start_time = time.time()
+      _import_noninteractive_modules()
+      import_time = time.time() - start_time
+    
+    self.assertLessEqual(import_time, IMPORT_TIME_BUDGET_SECONDS)